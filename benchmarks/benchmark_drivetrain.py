@@ -0,0 +1,404 @@
+#  Benchmarks for the kinematics and PWM hot paths of SimpleDrivetrain.
+#
+#  Run the suite and write the results as JSON:
+#    $ python benchmarks/benchmark_drivetrain.py run --output results.json
+#  Compare a run against a stored baseline, exiting with status 1 if any benchmark regressed:
+#    $ python benchmarks/benchmark_drivetrain.py compare baseline.json results.json --threshold 0.15
+import argparse
+import compileall
+import importlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import vectorutils as vutils  # noqa: E402
+from simple_drivetrain import SimpleDrivetrain  # noqa: E402
+from drivetrain_fleet import DrivetrainFleet  # noqa: E402
+from drivetrain_library import iter_drivetrains  # noqa: E402
+from flight_recorder import FlightRecorder  # noqa: E402
+from replay import replay_command_log  # noqa: E402
+
+MOTOR_COUNTS = (4, 6, 16, 128, 1024)
+BATCH_SIZES = (1, 16, 256, 4096)
+FLEET_SIZES = (16, 256, 4096)
+PWM_BOUNDS = (1100, 1500, 1900)
+
+
+def random_motor_geometry(motor_count, seed=0):
+    rng = np.random.RandomState(seed)
+    positions = rng.uniform(-1.0, 1.0, (motor_count, 3))
+    directions = rng.uniform(-1.0, 1.0, (motor_count, 3))
+    inverted = rng.uniform(0.0, 1.0, motor_count) < 0.5
+    return positions, directions, inverted
+
+
+def make_drivetrain(motor_count, seed=0):
+    drivetrain = SimpleDrivetrain(orientation=(0.1, -0.2, 0.7))
+    positions, directions, inverted = random_motor_geometry(motor_count, seed)
+    for i in range(0, motor_count):
+        drivetrain.add_new_motor('motor_' + str(i), positions[i], directions[i], bool(inverted[i]), PWM_BOUNDS)
+    return drivetrain
+
+
+def write_drivetrain_xml(filepath, motor_count, seed=0):
+    positions, directions, inverted = random_motor_geometry(motor_count, seed)
+    lines = ['<SimpleDrivetrain>', '    <orientation pitch="0" roll="0" yaw="0" />']
+    for i in range(0, motor_count):
+        lines.append('    <motor name="motor_%d" inverted="%s">' % (i, bool(inverted[i])))
+        lines.append('        <position x="%.17g" y="%.17g" z="%.17g" />' % tuple(positions[i]))
+        lines.append('        <direction x="%.17g" y="%.17g" z="%.17g" />' % tuple(directions[i]))
+        lines.append('        <pwm_bounds reverse="%d" stop="%d" forward="%d" />' % PWM_BOUNDS)
+        lines.append('    </motor>')
+    lines.append('</SimpleDrivetrain>')
+
+    with open(filepath, 'w') as fh:
+        fh.write('\n'.join(lines))
+
+
+#  calls func repeatedly for about min_time seconds (and at least min_calls times), timing every call
+def measure(func, samples_per_call=1, min_time=0.2, min_calls=20, max_calls=200000):
+    func()  # warm up any caches
+
+    latencies = []
+    timer = time.perf_counter
+    start = timer()
+    while (timer() - start < min_time or len(latencies) < min_calls) and len(latencies) < max_calls:
+        call_start = timer()
+        func()
+        latencies.append(timer() - call_start)
+    latencies = np.array(latencies)
+
+    calls_per_second = len(latencies) / latencies.sum()
+    return {'calls': len(latencies),
+            'samples_per_call': samples_per_call,
+            'calls_per_second': calls_per_second,
+            'samples_per_second': calls_per_second * samples_per_call,
+            'latency_us': {'mean': float(latencies.mean() * 1e6),
+                           'p50': float(np.percentile(latencies, 50) * 1e6),
+                           'p90': float(np.percentile(latencies, 90) * 1e6),
+                           'p99': float(np.percentile(latencies, 99) * 1e6),
+                           'max': float(latencies.max() * 1e6)}}
+
+
+#  each benchmark is a (name, samples per call, zero-argument callable) triple
+def single_command_benchmarks(motor_counts):
+    translation = (0.3, -0.5, 0.2)
+    rotation = (0.0, 0.1, -0.4)
+
+    for motor_count in motor_counts:
+        drivetrain = make_drivetrain(motor_count)
+        for mode, force_local_oriented in (('field', False), ('local', True)):
+            suffix = '[motors=%d,%s]' % (motor_count, mode)
+            yield ('get_motor_vels' + suffix, 1,
+                   lambda d=drivetrain, f=force_local_oriented: d.get_motor_vels(translation, rotation, f))
+            yield ('get_motor_vels_scaled' + suffix, 1,
+                   lambda d=drivetrain, f=force_local_oriented: d.get_motor_vels_scaled(translation, rotation, f))
+            motor_vels = drivetrain.get_motor_vels(translation, rotation, force_local_oriented)
+            yield ('estimate_twist' + suffix, 1,
+                   lambda d=drivetrain, v=motor_vels, f=force_local_oriented: d.estimate_twist(v, f))
+
+
+#  the orientation changes every tick, as read from an IMU at 1 kHz, while the command changes every
+#  command_interval ticks, as read from a joystick at 50 Hz
+def mixed_rate_benchmarks(motor_counts, ticks=1000, command_interval=20):
+    rng = np.random.RandomState(5)
+    yaws = rng.uniform(-np.pi, np.pi, ticks)
+    translations = rng.uniform(-1.0, 1.0, (ticks, 3))
+    rotations = rng.uniform(-1.0, 1.0, (ticks, 3))
+
+    def run_ticks(drivetrain, tilt, interval):
+        for i in range(0, ticks):
+            drivetrain.orientation = (tilt, 0.0, yaws[i])
+            command = i - i % interval
+            drivetrain.get_motor_vels(translations[command], rotations[command])
+
+    for motor_count in motor_counts:
+        drivetrain = make_drivetrain(motor_count)
+        drivetrain.reuse_buffers = True
+        for mode, tilt in (('yaw', 0.0), ('tilted', 0.1)):
+            for rate, interval in (('mixed_rate', command_interval), ('same_rate', 1)):
+                yield ('get_motor_vels[motors=%d,%s,%s]' % (motor_count, rate, mode), ticks,
+                       lambda d=drivetrain, t=tilt, n=interval: run_ticks(d, t, n))
+
+
+#  reads from the control thread while a supervisor thread swaps the pwm bounds of a motor every swap_interval
+#  seconds, which should cost the reads no more than the occasional recompilation
+def hot_swap_benchmarks(motor_counts, swap_interval=0.01):
+    translation = (0.3, -0.5, 0.2)
+    rotation = (0.0, 0.1, -0.4)
+
+    for motor_count in motor_counts:
+        drivetrain = make_drivetrain(motor_count)
+        motor = drivetrain.get_motor_by_index(0)
+        stop = threading.Event()
+
+        def swap(motor=motor, stop=stop):
+            swaps = 0
+            while not stop.wait(swap_interval):
+                motor.pwm_bounds = (PWM_BOUNDS, (1000, 1450, 2000))[swaps % 2]
+                swaps += 1
+
+        writer = threading.Thread(target=swap, daemon=True)
+        writer.start()
+        try:
+            yield ('get_motor_vels_scaled[motors=%d,hot_swapped]' % motor_count, 1,
+                   lambda d=drivetrain: d.get_motor_vels_scaled(translation, rotation))
+        finally:
+            stop.set()
+            writer.join()
+
+
+def batch_benchmarks(motor_counts, batch_sizes):
+    rng = np.random.RandomState(1)
+
+    for motor_count in motor_counts:
+        drivetrain = make_drivetrain(motor_count)
+        for batch_size in batch_sizes:
+            translations = rng.uniform(-1.0, 1.0, (batch_size, 3))
+            rotations = rng.uniform(-1.0, 1.0, (batch_size, 3))
+            orientations = rng.uniform(-np.pi, np.pi, (batch_size, 3))
+
+            suffix = '[motors=%d,batch=%d' % (motor_count, batch_size)
+            yield ('get_motor_vels_batch' + suffix + ',field]', batch_size,
+                   lambda d=drivetrain, t=translations, r=rotations: d.get_motor_vels_batch(t, r))
+            yield ('get_motor_vels_batch' + suffix + ',local]', batch_size,
+                   lambda d=drivetrain, t=translations, r=rotations: d.get_motor_vels_batch(t, r, None, True))
+            yield ('get_motor_vels_batch' + suffix + ',per_row_orientation]', batch_size,
+                   lambda d=drivetrain, t=translations, r=rotations, o=orientations: d.get_motor_vels_batch(t, r, o))
+            motor_vels = drivetrain.get_motor_vels_batch(translations, rotations)
+            yield ('estimate_twist_batch' + suffix + ',field]', batch_size,
+                   lambda d=drivetrain, v=motor_vels: d.estimate_twist_batch(v))
+            yield ('get_motor_vels_scaled_batch' + suffix + ',field]', batch_size,
+                   lambda d=drivetrain, t=translations, r=rotations: d.get_motor_vels_scaled_batch(t, r))
+
+
+def fleet_benchmarks(fleet_sizes, motor_count=8):
+    rng = np.random.RandomState(2)
+
+    for fleet_size in fleet_sizes:
+        fleet = DrivetrainFleet([make_drivetrain(motor_count, seed) for seed in range(0, fleet_size)])
+        translations = rng.uniform(-1.0, 1.0, (fleet_size, 3))
+        rotations = rng.uniform(-1.0, 1.0, (fleet_size, 3))
+
+        suffix = '[drivetrains=%d,motors=%d]' % (fleet_size, motor_count)
+        yield ('fleet_get_motor_vels' + suffix, fleet_size,
+               lambda f=fleet, t=translations, r=rotations: f.get_motor_vels(t, r))
+        yield ('fleet_get_motor_vels_scaled' + suffix, fleet_size,
+               lambda f=fleet, t=translations, r=rotations: f.get_motor_vels_scaled(t, r))
+
+
+#  a slow calibration curve, as an ESC fit with clamping would be
+def calibration_curve(velocity):
+    pwm = PWM_BOUNDS[1] + 380 * velocity + 40 * velocity ** 3
+    return int(min(max(pwm, PWM_BOUNDS[0]), PWM_BOUNDS[2]))
+
+
+def pwm_lookup_benchmarks(motor_count=16, batch_size=256):
+    rng = np.random.RandomState(3)
+    translations = rng.uniform(-1.0, 1.0, (batch_size, 3))
+    rotations = rng.uniform(-1.0, 1.0, (batch_size, 3))
+
+    for mode in ('func', 'lookup'):
+        drivetrain = SimpleDrivetrain()
+        positions, directions, inverted = random_motor_geometry(motor_count)
+        for i in range(0, motor_count):
+            drivetrain.add_new_motor('motor_' + str(i), positions[i], directions[i], bool(inverted[i]), PWM_BOUNDS,
+                                     calibration_curve)
+        if mode == 'lookup':
+            drivetrain.use_pwm_lookup_tables(1025, max_error=1.0)
+
+        suffix = '[motors=%d,calibrated,%s]' % (motor_count, mode)
+        yield ('get_motor_vels_scaled' + suffix, 1,
+               lambda d=drivetrain: d.get_motor_vels_scaled(translations[0], rotations[0]))
+        yield ('get_motor_vels_scaled_batch' + suffix[:-1] + ',batch=%d]' % batch_size, batch_size,
+               lambda d=drivetrain: d.get_motor_vels_scaled_batch(translations, rotations))
+
+
+def vectorutils_benchmarks():
+    yield ('rotate_vector', 1, lambda: vutils.rotate_vector((0.3, -0.5, 0.2), 0.1, -0.2, 0.7))
+
+    rng = np.random.RandomState(4)
+    vectors = rng.uniform(-1.0, 1.0, (1024, 3))
+    orientations = rng.uniform(-np.pi, np.pi, (1024, 3))
+    yield ('rotate_vectors[vectors=1024]', 1024, lambda: vutils.rotate_vectors(vectors, orientations))
+    yield ('calculate_angle_directions[vectors=1024]', 1024,
+           lambda: vutils.calculate_angle_directions(vectors[:, 0], vectors[:, 1]))
+
+
+def load_benchmarks(motor_counts, directory):
+    for motor_count in motor_counts:
+        filepath = os.path.join(directory, 'drivetrain_%d.xml' % motor_count)
+        write_drivetrain_xml(filepath, motor_count)
+        yield ('load_drivetrain_from_file[motors=%d,xml]' % motor_count, 1,
+               lambda f=filepath: SimpleDrivetrain().load_drivetrain_from_file(f, use_compiled=False))
+
+        #  the first load writes the compiled snapshot which every measured load reads
+        SimpleDrivetrain().load_drivetrain_from_file(filepath, use_compiled=True)
+        yield ('load_drivetrain_from_file[motors=%d,compiled]' % motor_count, 1,
+               lambda f=filepath: SimpleDrivetrain().load_drivetrain_from_file(f, use_compiled=True))
+
+
+def library_benchmarks(directory, drivetrain_count=256, motor_count=6):
+    filepath = os.path.join(directory, 'drivetrain_%d.xml' % motor_count)
+    write_drivetrain_xml(filepath, motor_count)
+    with open(filepath) as fh:
+        drivetrain_xml = fh.read()
+
+    library_path = os.path.join(directory, 'library_%d.xml' % drivetrain_count)
+    with open(library_path, 'w') as fh:
+        fh.write('<SimpleDrivetrainLibrary>\n' + '\n'.join([drivetrain_xml] * drivetrain_count)
+                 + '\n</SimpleDrivetrainLibrary>')
+
+    yield ('iter_drivetrains[drivetrains=%d,motors=%d]' % (drivetrain_count, motor_count), drivetrain_count,
+           lambda: sum(1 for drivetrain in iter_drivetrains(library_path)))
+
+
+def recorder_benchmarks(motor_counts, directory):
+    translation, rotation = (0.3, -0.5, 0.2), (0.1, 0.0, -0.4)
+    for motor_count in motor_counts:
+        drivetrain = make_drivetrain(motor_count)
+        drivetrain.reuse_buffers = True
+        drivetrain.recorder = FlightRecorder(os.path.join(directory, 'flight_%d.rec' % motor_count), motor_count,
+                                             capacity=4096)
+        motor_vels = drivetrain.get_motor_vels(translation, rotation)
+        motor_pwms = drivetrain.get_motor_vels_scaled(translation, rotation)
+        yield ('get_motor_vels_scaled[motors=%d,recorded]' % motor_count, 1,
+               lambda d=drivetrain: d.get_motor_vels_scaled(translation, rotation))
+        yield ('FlightRecorder.record[motors=%d]' % motor_count, 1,
+               lambda r=drivetrain.recorder, v=motor_vels, p=motor_pwms: r.record(translation, rotation,
+                                                                                  (0.1, -0.2, 0.7), v, p))
+
+
+def replay_benchmarks(motor_counts, directory, command_count=65536):
+    rng = np.random.RandomState(0)
+    log_path = os.path.join(directory, 'commands.npy')
+    np.save(log_path, rng.uniform(-1.0, 1.0, (command_count, 9)))
+
+    output_path = os.path.join(directory, 'replayed_pwm_values.npy')
+    for motor_count in motor_counts:
+        drivetrain = make_drivetrain(motor_count)
+        yield ('replay_command_log[motors=%d,commands=%d]' % (motor_count, command_count), command_count,
+               lambda d=drivetrain: replay_command_log(d, log_path, output_path))
+
+
+#  the package is imported from a copy with compiled bytecode, and its modules are removed from sys.modules after
+#  every call so that each call imports them again; numpy and the standard library stay imported, so this measures
+#  the package's own modules
+def import_benchmarks(directory):
+    package_directory = os.path.join(directory, 'simpledrivetrain')
+    shutil.copytree(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'release', 'simpledrivetrain',
+                                 'simpledrivetrain'), package_directory)
+    compileall.compile_dir(package_directory, quiet=1)
+    sys.path.insert(0, directory)
+
+    def import_package(attribute=None):
+        try:
+            package = importlib.import_module('simpledrivetrain')
+            if attribute is not None:
+                getattr(package, attribute)
+        finally:
+            for name in [name for name in sys.modules if name.split('.')[0] == 'simpledrivetrain']:
+                del sys.modules[name]
+
+    yield ('import[simpledrivetrain]', 1, import_package)
+    yield ('import[simpledrivetrain,SimpleDrivetrain]', 1, lambda: import_package('SimpleDrivetrain'))
+
+
+def run(args):
+    motor_counts = MOTOR_COUNTS[:3] if args.quick else MOTOR_COUNTS
+    batch_sizes = BATCH_SIZES[:3] if args.quick else BATCH_SIZES
+    fleet_sizes = FLEET_SIZES[:2] if args.quick else FLEET_SIZES
+    min_time = 0.05 if args.quick else args.min_time
+
+    directory = tempfile.mkdtemp(prefix='simpledrivetrain_bench_')
+    try:
+        benchmarks = [single_command_benchmarks(motor_counts), hot_swap_benchmarks(motor_counts),
+                      mixed_rate_benchmarks(motor_counts),
+                      batch_benchmarks(motor_counts, batch_sizes),
+                      fleet_benchmarks(fleet_sizes), pwm_lookup_benchmarks(), vectorutils_benchmarks(),
+                      load_benchmarks(motor_counts, directory), library_benchmarks(directory),
+                      recorder_benchmarks(motor_counts, directory), replay_benchmarks(motor_counts, directory),
+                      import_benchmarks(directory)]
+
+        results = {}
+        for group in benchmarks:
+            for name, samples_per_call, func in group:
+                if args.filter and args.filter not in name:
+                    continue
+                results[name] = measure(func, samples_per_call, min_time)
+                print('%-72s %14.1f calls/s  p50 %10.2f us  p99 %10.2f us'
+                      % (name, results[name]['calls_per_second'], results[name]['latency_us']['p50'],
+                         results[name]['latency_us']['p99']))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {'metadata': {'python': platform.python_version(),
+                           'numpy': np.__version__,
+                           'platform': platform.platform(),
+                           'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)['results']
+    with open(args.current) as fh:
+        current = json.load(fh)['results']
+
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        ratio = current[name]['calls_per_second'] / baseline[name]['calls_per_second']
+        flag = ''
+        if ratio < 1.0 - args.threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        print('%-72s %8.2fx %s' % (name, ratio, flag))
+
+    for name in sorted(set(baseline) - set(current)):
+        print('%-72s missing from current results' % name)
+
+    if regressions:
+        print('\n%d benchmark(s) regressed by more than %d%%' % (len(regressions), args.threshold * 100))
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the SimpleDrivetrain hot paths.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='run the benchmark suite')
+    run_parser.add_argument('--output', help='path of the JSON file to write the results to')
+    run_parser.add_argument('--filter', help='only run benchmarks whose name contains this string')
+    run_parser.add_argument('--min-time', type=float, default=0.2, help='seconds to spend on each benchmark')
+    run_parser.add_argument('--quick', action='store_true', help='run a reduced suite with shorter timings')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='compare results against a baseline')
+    compare_parser.add_argument('baseline', help='path of the baseline JSON results')
+    compare_parser.add_argument('current', help='path of the current JSON results')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='fractional throughput loss which counts as a regression')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
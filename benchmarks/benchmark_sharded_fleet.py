@@ -0,0 +1,85 @@
+#  Measures how the tick throughput of a ShardedDrivetrainFleet scales with its worker count.
+#
+#  Run the scaling curve for 4096 drivetrains with up to every available core and write it as JSON:
+#    $ python benchmarks/benchmark_sharded_fleet.py --drivetrains 4096 --output scaling.json
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from benchmark_drivetrain import make_drivetrain, measure  # noqa: E402
+from drivetrain_fleet import DrivetrainFleet  # noqa: E402
+from sharded_fleet import ShardedDrivetrainFleet  # noqa: E402
+
+
+#  1, 2, 4, ... up to max_workers, always ending with max_workers
+def worker_counts(max_workers):
+    counts = []
+    count = 1
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the tick throughput of a sharded drivetrain fleet.')
+    parser.add_argument('--drivetrains', type=int, default=4096, help='number of drivetrains in the fleet')
+    parser.add_argument('--motors', type=int, default=8, help='number of motors per drivetrain')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='largest worker count to run')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to spend on each worker count')
+    parser.add_argument('--output', help='path of the JSON file to write the scaling curve to')
+    args = parser.parse_args(argv)
+
+    fleet = DrivetrainFleet([make_drivetrain(args.motors, seed) for seed in range(0, args.drivetrains)])
+    rng = np.random.RandomState(7)
+    translations = rng.uniform(-1.0, 1.0, (args.drivetrains, 3))
+    rotations = rng.uniform(-1.0, 1.0, (args.drivetrains, 3))
+
+    #  the single-process fleet is the baseline every worker count is compared against
+    baseline = measure(lambda: fleet.get_motor_vels_scaled(translations, rotations), args.drivetrains,
+                       args.min_time)
+    print('%-24s %12.1f ticks/s  p50 %10.2f us  p99 %10.2f us'
+          % ('single process', baseline['calls_per_second'], baseline['latency_us']['p50'],
+             baseline['latency_us']['p99']))
+
+    curve = []
+    for worker_count in worker_counts(args.max_workers):
+        with ShardedDrivetrainFleet(fleet, worker_count) as sharded_fleet:
+            sharded_fleet.translations[:] = translations
+            sharded_fleet.rotations[:] = rotations
+            result = measure(sharded_fleet.step, args.drivetrains, args.min_time)
+
+        result['workers'] = worker_count
+        result['speedup'] = result['calls_per_second'] / baseline['calls_per_second']
+        result['efficiency'] = result['speedup'] / worker_count
+        curve.append(result)
+        print('%-24s %12.1f ticks/s  p50 %10.2f us  p99 %10.2f us  speedup %6.2fx  efficiency %5.1f%%'
+              % ('workers=%d' % worker_count, result['calls_per_second'], result['latency_us']['p50'],
+                 result['latency_us']['p99'], result['speedup'], result['efficiency'] * 100))
+
+    report = {'metadata': {'python': platform.python_version(),
+                           'numpy': np.__version__,
+                           'platform': platform.platform(),
+                           'cpu_count': os.cpu_count(),
+                           'drivetrains': args.drivetrains,
+                           'motors': args.motors,
+                           'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'baseline': baseline,
+              'curve': curve}
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
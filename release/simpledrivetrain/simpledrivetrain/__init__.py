@@ -1,3 +1,40 @@
-import vectorutils
-import motor
-from simple_drivetrain import SimpleDrivetrain
+import sys
+
+#  Submodules, and the classes re-exported from them, are imported on first access rather than with the package,
+#  so that a program only pays for the modules it uses; e.g. control_loop imports asyncio and drivetrain_library
+#  imports concurrent.futures.
+_SUBMODULES = ('vectorutils', 'motor', 'motor_bank', 'simple_drivetrain', 'drivetrain_fleet', 'sharded_fleet',
+               'control_loop', 'motion_profile', 'pwm_lookup', 'motor_allocation', 'drivetrain_library',
+               'flight_recorder', 'replay')
+_CLASSES = {'SimpleDrivetrain': 'simple_drivetrain',
+            'DrivetrainFleet': 'drivetrain_fleet',
+            'ShardedDrivetrainFleet': 'sharded_fleet'}
+
+__all__ = list(_SUBMODULES) + list(_CLASSES)
+
+
+def __getattr__(name):
+    if name in _CLASSES:
+        value = getattr(_import_submodule(_CLASSES[name]), name)
+    elif name in _SUBMODULES:
+        value = _import_submodule(name)
+    else:
+        raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+    globals()[name] = value
+    return value
+
+
+def _import_submodule(name):
+    full_name = __name__ + '.' + name
+    __import__(full_name)
+    return sys.modules[full_name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+#  module __getattr__ is only called from Python 3.7, so older versions import everything with the package
+if sys.version_info < (3, 7):
+    for _name in __all__:
+        __getattr__(_name)
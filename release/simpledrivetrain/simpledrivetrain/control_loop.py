@@ -0,0 +1,273 @@
+import asyncio
+import bisect
+import inspect
+import threading
+import time
+
+
+#  Counters describing the timing of a control loop's ticks. Jitter is how late a tick started relative to
+#  its scheduled start time, and compute time is how long the tick took from its start to the end of its
+#  output callback. Both are also counted into histograms whose bins are bounded by histogram_edges, in
+#  seconds; bin i counts values in [edges[i - 1], edges[i]), with the first and last bins open-ended.
+class LoopStatistics(object):
+    def __init__(self, period, histogram_edges=None):
+        if histogram_edges is None:
+            histogram_edges = [period * fraction for fraction in (0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)]
+
+        self.__period = period
+        self.__histogram_edges = sorted(histogram_edges)
+        self.__lock = threading.Lock()
+        self.reset()
+
+    #  records one tick; deadline_missed is True if the tick ended after its deadline, and skipped_ticks is
+    #  the number of scheduled ticks that were dropped because the tick overran them
+    def record(self, jitter, compute_time, deadline_missed, skipped_ticks=0):
+        with self.__lock:
+            self.__ticks += 1
+            self.__deadline_misses += int(deadline_missed)
+            self.__skipped_ticks += skipped_ticks
+
+            self.__last_jitter = jitter
+            self.__total_jitter += jitter
+            self.__max_jitter = max(self.__max_jitter, jitter)
+            self.__jitter_counts[bisect.bisect_right(self.__histogram_edges, jitter)] += 1
+
+            self.__last_compute_time = compute_time
+            self.__total_compute_time += compute_time
+            self.__max_compute_time = max(self.__max_compute_time, compute_time)
+            self.__compute_time_counts[bisect.bisect_right(self.__histogram_edges, compute_time)] += 1
+
+    def reset(self):
+        with self.__lock:
+            self.__ticks = 0
+            self.__deadline_misses = 0
+            self.__skipped_ticks = 0
+            self.__last_jitter = 0.0
+            self.__total_jitter = 0.0
+            self.__max_jitter = 0.0
+            self.__last_compute_time = 0.0
+            self.__total_compute_time = 0.0
+            self.__max_compute_time = 0.0
+            self.__jitter_counts = [0] * (len(self.__histogram_edges) + 1)
+            self.__compute_time_counts = [0] * (len(self.__histogram_edges) + 1)
+
+    #  returns a consistent copy of every counter as a dictionary of plain Python values
+    def snapshot(self):
+        with self.__lock:
+            ticks = max(self.__ticks, 1)
+            return {'period': self.__period,
+                    'ticks': self.__ticks,
+                    'deadline_misses': self.__deadline_misses,
+                    'skipped_ticks': self.__skipped_ticks,
+                    'jitter': {'last': self.__last_jitter,
+                               'mean': self.__total_jitter / ticks,
+                               'max': self.__max_jitter},
+                    'compute_time': {'last': self.__last_compute_time,
+                                     'mean': self.__total_compute_time / ticks,
+                                     'max': self.__max_compute_time},
+                    'histogram_edges': list(self.__histogram_edges),
+                    'jitter_histogram': list(self.__jitter_counts),
+                    'compute_time_histogram': list(self.__compute_time_counts)}
+
+    @property
+    def period(self):
+        return self.__period
+
+    @property
+    def ticks(self):
+        return self.__ticks
+
+    @property
+    def deadline_misses(self):
+        return self.__deadline_misses
+
+    @property
+    def skipped_ticks(self):
+        return self.__skipped_ticks
+
+    @property
+    def histogram_edges(self):
+        return list(self.__histogram_edges)
+
+    @property
+    def jitter_histogram(self):
+        return list(self.__jitter_counts)
+
+    @property
+    def compute_time_histogram(self):
+        return list(self.__compute_time_counts)
+
+
+#  Shared scheduling and computation of ControlLoop and AsyncControlLoop.
+#
+#  drivetrain = the SimpleDrivetrain whose motor pwm values are computed every tick
+#  input_func = callback taking no arguments and returning a (translation, rotation) command
+#  output_func = callback taking the integer numpy array of motor pwm values; the array is reused every tick until
+#    the drivetrain's motors change
+#  rate = number of ticks per second
+#  force_local_oriented is a boolean value, as in SimpleDrivetrain.get_motor_vels
+#  deadline = seconds after its scheduled start by which a tick must end, defaults to the period
+#  histogram_edges = optional bin edges, in seconds, of the jitter and compute time histograms
+class _ControlLoopBase(object):
+    def __init__(self, drivetrain, input_func, output_func, rate, force_local_oriented=False, deadline=None,
+                 histogram_edges=None):
+        if rate <= 0:
+            raise ValueError('Control loop rates must be positive. A rate of ' + str(rate)
+                             + ' was passed instead.')
+
+        self._drivetrain = drivetrain
+        self._input_func = input_func
+        self._output_func = output_func
+        self._period = 1.0 / rate
+        self._deadline = self._period if deadline is None else deadline
+        self._force_local_oriented = force_local_oriented
+        self._statistics = LoopStatistics(self._period, histogram_edges)
+
+    #  the pwm values are computed into the loop thread's buffer of the drivetrain, which always fits the motors
+    #  they were computed for, so that adding or removing motors while the loop runs never fails a tick
+    def _compute(self, command):
+        translation, rotation = command
+        return self._drivetrain._get_motor_vels_scaled_reused(translation, rotation, self._force_local_oriented)
+
+    #  records the tick scheduled at scheduled and run from start to end, and returns the start time of the
+    #  next tick; ticks whose start time has already passed are skipped rather than run late in a burst
+    def _finish_tick(self, scheduled, start, end):
+        skipped_ticks = int((end - scheduled) // self._period)
+        self._statistics.record(start - scheduled, end - start, end - scheduled > self._deadline, skipped_ticks)
+        return scheduled + (skipped_ticks + 1) * self._period
+
+    @property
+    def drivetrain(self):
+        return self._drivetrain
+
+    @property
+    def rate(self):
+        return 1.0 / self._period
+
+    @property
+    def period(self):
+        return self._period
+
+    @property
+    def statistics(self):
+        return self._statistics
+
+
+#  Runs a fixed-rate control loop on a thread: every tick calls input_func, computes the drivetrain's motor pwm
+#  values, and passes them to output_func. Accepts the parameters of _ControlLoopBase, as well as
+#  spin_time = seconds before each tick during which the loop busy-waits instead of sleeping, trading CPU
+#    time for a lower jitter
+class ControlLoop(_ControlLoopBase):
+    def __init__(self, drivetrain, input_func, output_func, rate, force_local_oriented=False, deadline=None,
+                 histogram_edges=None, spin_time=0.0):
+        _ControlLoopBase.__init__(self, drivetrain, input_func, output_func, rate, force_local_oriented, deadline,
+                                  histogram_edges)
+        self.__spin_time = spin_time
+        self.__stop_event = threading.Event()
+        self.__thread = None
+        self.__error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    #  runs the loop on a background thread until stop is called
+    def start(self):
+        if self.running:
+            raise RuntimeError('Attempted to start a control loop which is already running.')
+
+        self.__stop_event.clear()
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__run_background, name='ControlLoop', daemon=True)
+        self.__thread.start()
+
+    #  stops the background thread, re-raising any exception raised by a tick
+    def stop(self):
+        self.__stop_event.set()
+        if self.__thread is not None and self.__thread is not threading.current_thread():
+            self.__thread.join()
+            self.__thread = None
+
+        error = self.__error
+        self.__error = None
+        if error is not None:
+            raise error
+
+    #  runs the loop on the calling thread for the given number of ticks, or until stop is called
+    def run(self, ticks=None):
+        self.__stop_event.clear()
+        self.__run(ticks)
+
+    def __run_background(self):
+        try:
+            self.__run(None)
+        except BaseException as error:
+            self.__error = error
+
+    def __run(self, ticks):
+        timer = time.perf_counter
+        scheduled = timer()
+        tick = 0
+        while (ticks is None or tick < ticks) and not self.__stop_event.is_set():
+            self.__wait_until(scheduled)
+            if self.__stop_event.is_set():
+                break
+
+            start = timer()
+            self._output_func(self._compute(self._input_func()))
+            scheduled = self._finish_tick(scheduled, start, timer())
+            tick += 1
+
+    def __wait_until(self, target):
+        timer = time.perf_counter
+        remaining = target - timer() - self.__spin_time
+        if remaining > 0:
+            self.__stop_event.wait(remaining)
+        while timer() < target:
+            pass
+
+    @property
+    def running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+
+#  Runs a fixed-rate control loop as an asyncio coroutine: every tick calls input_func, computes the
+#  drivetrain's motor pwm values, and passes them to output_func. Accepts the parameters of _ControlLoopBase;
+#  input_func and output_func may also be coroutine functions, which are awaited.
+class AsyncControlLoop(_ControlLoopBase):
+    def __init__(self, drivetrain, input_func, output_func, rate, force_local_oriented=False, deadline=None,
+                 histogram_edges=None):
+        _ControlLoopBase.__init__(self, drivetrain, input_func, output_func, rate, force_local_oriented, deadline,
+                                  histogram_edges)
+        self.__stopped = False
+
+    #  runs the loop for the given number of ticks, or until stop is called
+    async def run(self, ticks=None):
+        self.__stopped = False
+
+        timer = time.perf_counter
+        scheduled = timer()
+        tick = 0
+        while (ticks is None or tick < ticks) and not self.__stopped:
+            remaining = scheduled - timer()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            if self.__stopped:
+                break
+
+            start = timer()
+            command = self._input_func()
+            if inspect.isawaitable(command):
+                command = await command
+            result = self._output_func(self._compute(command))
+            if inspect.isawaitable(result):
+                await result
+            scheduled = self._finish_tick(scheduled, start, timer())
+            tick += 1
+
+    #  stops the loop after its current tick
+    def stop(self):
+        self.__stopped = True
@@ -0,0 +1,70 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+if __package__:
+    from .simple_drivetrain import SimpleDrivetrain, _get_etree
+    from .drivetrain_fleet import pack_drivetrain
+else:
+    from simple_drivetrain import SimpleDrivetrain, _get_etree
+    from drivetrain_fleet import pack_drivetrain
+
+#  tag of the elements which each define one drivetrain
+DRIVETRAIN_TAG = 'SimpleDrivetrain'
+
+
+#  Streams the drivetrains of an xml file holding any number of <SimpleDrivetrain> elements, such as a library
+#  whose root element wraps thousands of drivetrain definitions, or a single drivetrain file. Each element is
+#  loaded once its end tag has been parsed and is then cleared along with every element before it, so memory
+#  stays flat however large the file is.
+#
+#  source = path or binary file object of the xml file
+#  yields a SimpleDrivetrain for each <SimpleDrivetrain> element, in document order
+def iter_drivetrains(source):
+    for element in _iter_drivetrain_elements(source):
+        drivetrain = SimpleDrivetrain()
+        drivetrain.load_drivetrain_from_element(element)
+        yield drivetrain
+
+
+#  source = path or binary file object of the xml file, as in iter_drivetrains
+#  yields a (mixing_matrix, stops, forward_spans, reverse_spans, orientation) tuple for each <SimpleDrivetrain>
+#  element, as returned by drivetrain_fleet.pack_drivetrain, so that callers packing fleet geometry of their own
+#  never hold more than one SimpleDrivetrain at a time
+def iter_fleet_rows(source):
+    for drivetrain in iter_drivetrains(source):
+        yield pack_drivetrain(drivetrain) + (drivetrain.orientation,)
+
+
+#  directory = directory of drivetrain xml files, one drivetrain per file
+#  pattern = glob pattern of the files to load within directory
+#  worker_count = optional number of threads loading files concurrently, defaults to the ThreadPoolExecutor
+#    default
+#  use_compiled is a boolean value, as in SimpleDrivetrain.load_drivetrain_from_file
+#  returns a dictionary of the loaded SimpleDrivetrain objects keyed by file path, in sorted path order
+def load_drivetrain_directory(directory, pattern='*.xml', worker_count=None, use_compiled=False):
+    filepaths = sorted(glob.glob(os.path.join(directory, pattern)))
+
+    def load(filepath):
+        drivetrain = SimpleDrivetrain()
+        drivetrain.load_drivetrain_from_file(filepath, use_compiled)
+        return drivetrain
+
+    #  file reads, hashing, and lxml parsing release the GIL, so the threads overlap most of each load
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        return dict(zip(filepaths, executor.map(load, filepaths)))
+
+
+def _iter_drivetrain_elements(source):
+    root = None
+    for event, element in _get_etree().iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = element
+        if event != 'end' or element.tag != DRIVETRAIN_TAG:
+            continue
+
+        yield element
+
+        #  clearing the root drops every element parsed so far; a single drivetrain file is its own root
+        element.clear()
+        if element is not root:
+            root.clear()
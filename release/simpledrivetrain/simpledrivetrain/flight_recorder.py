@@ -0,0 +1,181 @@
+import time
+import numpy as np
+
+#  identifies flight recorder files and the version of their layout
+RECORDER_MAGIC = b'SDFLTREC'
+RECORDER_VERSION = 1
+
+#  The file starts with a HEADER_SIZE byte header followed by capacity records of 11 + 2 N little-endian
+#  float64 values each: sequence, time, translation (3), rotation (3), orientation (3), then the N motor
+#  velocities and the N motor pwm values. count, the number of records ever written, is updated after every
+#  record, so record i is stored in row i % capacity.
+HEADER_SIZE = 64
+_HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('motor_count', '<u4'), ('capacity', '<u8'),
+                          ('count', '<u8'), ('reserved', 'V32')])
+_COUNT_OFFSET = _HEADER_DTYPE.fields['count'][1]
+_INPUT_COLUMNS = 11
+
+
+#  returns the column slice of each field of a record of motor_count motors
+def record_fields(motor_count):
+    return {'sequence': slice(0, 1),
+            'time': slice(1, 2),
+            'translation': slice(2, 5),
+            'rotation': slice(5, 8),
+            'orientation': slice(8, 11),
+            'motor_vels': slice(_INPUT_COLUMNS, _INPUT_COLUMNS + motor_count),
+            'motor_pwms': slice(_INPUT_COLUMNS + motor_count, _INPUT_COLUMNS + 2 * motor_count)}
+
+
+#  Black-box recorder of every command of a drivetrain and the motor velocities and pwm values computed from
+#  it, written into a fixed-size ring buffer file through np.memmap. Once the file holds capacity records,
+#  every new record overwrites the oldest. Recording a tick writes a single row with one numpy call and takes
+#  no locks; only one process or thread may write to a recorder, while any number of FlightRecording
+#  readers may read the file concurrently.
+#
+#  path = path of the recorder file, which is created or overwritten
+#  motor_count = number of motors of the recorded drivetrain
+#  capacity = number of most recent records kept in the file
+class FlightRecorder(object):
+    def __init__(self, path, motor_count, capacity=65536):
+        if capacity < 1:
+            raise ValueError('Flight recorders require a capacity of at least 1. A capacity of ' + str(capacity)
+                             + ' was passed instead.')
+
+        width = _INPUT_COLUMNS + 2 * motor_count
+        self.__path = path
+        self.__motor_count = motor_count
+        self.__capacity = capacity
+        self.__count = 0
+        self.__timer = time.time
+        self.__head = np.zeros(2)  # sequence and time of the next record
+
+        self.__buffer = np.memmap(path, dtype=np.uint8, mode='w+', shape=(HEADER_SIZE + capacity * width * 8,))
+        header = self.__buffer[:HEADER_SIZE].view(_HEADER_DTYPE)
+        header['magic'] = RECORDER_MAGIC
+        header['version'] = RECORDER_VERSION
+        header['motor_count'] = motor_count
+        header['capacity'] = capacity
+        header['count'] = 0
+
+        #  plain ndarray views of the mapping skip the per-index overhead of the np.memmap subclass
+        mapping = self.__buffer.view(np.ndarray)
+        self.__count_view = mapping[_COUNT_OFFSET:_COUNT_OFFSET + 8].view('<u8')
+        self.__records = mapping[HEADER_SIZE:].view('<f8').reshape(capacity, width)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    #  translation, rotation, and orientation = 3D vectors of the command
+    #  motor_vels and motor_pwms = arrays of shape (N,) computed from the command
+    def record(self, translation, rotation, orientation, motor_vels, motor_pwms):
+        count = self.__count
+        head = self.__head
+        head[0] = count
+        head[1] = self.__timer()
+        np.concatenate((head, translation, rotation, orientation, motor_vels, motor_pwms),
+                       out=self.__records[count % self.__capacity])
+
+        #  the record is complete before the count which publishes it to readers is incremented
+        self.__count = count + 1
+        self.__count_view[0] = count + 1
+
+    #  writes the records to disk; records reach concurrent readers through the page cache without flushing
+    def flush(self):
+        if self.__buffer is not None:
+            self.__buffer.flush()
+
+    def close(self):
+        if self.__buffer is not None:
+            self.__buffer.flush()
+            self.__count_view = self.__records = self.__buffer = None
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def motor_count(self):
+        return self.__motor_count
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    #  number of records ever written, including those since overwritten
+    @property
+    def count(self):
+        return self.__count
+
+
+#  Reads a file written by a FlightRecorder, which may still be recording in another process, without copying
+#  it into memory.
+#
+#  path = path of the recorder file
+class FlightRecording(object):
+    def __init__(self, path):
+        buffer = np.memmap(path, dtype=np.uint8, mode='r').view(np.ndarray)
+        if len(buffer) < HEADER_SIZE:
+            raise ValueError('Attempted to read a flight recording from a file which is too short to hold one.')
+
+        header = buffer[:HEADER_SIZE].view(_HEADER_DTYPE)[0]
+        if header['magic'] != RECORDER_MAGIC or header['version'] != RECORDER_VERSION:
+            raise ValueError('Attempted to read a flight recording from a file which is not a version '
+                             + str(RECORDER_VERSION) + ' flight recording.')
+
+        self.__motor_count = int(header['motor_count'])
+        self.__capacity = int(header['capacity'])
+        self.__fields = record_fields(self.__motor_count)
+        self.__count_view = buffer[_COUNT_OFFSET:_COUNT_OFFSET + 8].view('<u8')
+        width = _INPUT_COLUMNS + 2 * self.__motor_count
+        self.__records = buffer[HEADER_SIZE:HEADER_SIZE + self.__capacity * width * 8].view('<f8').reshape(
+            self.__capacity, width)
+
+    #  name = one of the fields of record_fields
+    #  returns a read-only view of the field of every row of the ring buffer, in row order rather than
+    #  chronological order; rows at and after count % capacity are the oldest once the buffer has wrapped
+    def field(self, name):
+        if name not in self.__fields:
+            raise KeyError('Attempted to read the unknown flight recording field ' + str(name) + '.')
+        return self.__records[:, self.__fields[name]]
+
+    #  returns a dictionary of every field of the retained records copied in chronological order, leaving out
+    #  records which a concurrent writer overwrote while they were being copied; once the buffer has wrapped, the
+    #  oldest row is always left out since the writer may be overwriting it
+    def snapshot(self):
+        first_count = int(self.__count_view[0])
+        rows = np.array(self.__records[:min(first_count, self.__capacity)])
+        last_count = int(self.__count_view[0])
+
+        #  the writer may have been writing record last_count into the row of record last_count - capacity
+        first = max(0, last_count - self.__capacity + 1)
+        sequences = np.arange(first, first_count)
+        rows = rows[sequences % self.__capacity]
+        rows = rows[rows[:, 0] == sequences]
+
+        snapshot = dict((name, rows[:, columns]) for name, columns in self.__fields.items())
+        snapshot['sequence'] = rows[:, 0].astype(np.int64)
+        snapshot['time'] = rows[:, 1]
+        snapshot['motor_pwms'] = snapshot['motor_pwms'].astype(int)
+        return snapshot
+
+    @property
+    def motor_count(self):
+        return self.__motor_count
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    #  number of records ever written, read live from the file
+    @property
+    def count(self):
+        return int(self.__count_view[0])
+
+    #  read-only capacity x (11 + 2 N) view of the ring buffer
+    @property
+    def records(self):
+        return self.__records
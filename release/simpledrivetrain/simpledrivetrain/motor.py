@@ -1,42 +1,50 @@
 import numpy as np
-import vectorutils as vutil
+if __package__:
+    from .motor_bank import MotorBank
+else:
+    from motor_bank import MotorBank
 
 
+#  A view onto a single row of a MotorBank. Motors created directly own a bank of their own, while motors
+#  added to a SimpleDrivetrain view a row of the drivetrain's bank. Getters return copies of the row's values,
+#  since removing a motor moves the rows after it.
 class Motor(object):
-    def __init__(self, name, position, direction, inverted=False, pwm_bounds=(0, 512, 1024), pwm_scaling_func=None):
-        self.name = name
-        self.__position = np.array(position)
-
-        self.__inverted = inverted
-
-        if inverted:
-            self.__direction = -vutil.normalize(np.array(direction))
-        else:
-            self.__direction = vutil.normalize(np.array(direction))
-
-        self.__angle_position = self.__calculate_angle_position()
-        self.__pwm_bounds = pwm_bounds
-        self.__pwm_scaling_func = pwm_scaling_func
-
-        if abs(pwm_bounds[1] - pwm_bounds[0]) == abs(pwm_bounds[2] - pwm_bounds[1]):
-            self.__symmetric = True
-        else:
-            self.__symmetric = False
+    __slots__ = ('_bank', '_index')
+
+    #  pwm_scaling_vectorized is a boolean value
+    #    If set to True, pwm_scaling_func accepts and returns numpy arrays of motor velocities
+    #    If set to False, pwm_scaling_func is called once per motor velocity
+    def __init__(self, name, position, direction, inverted=False, pwm_bounds=(0, 512, 1024), pwm_scaling_func=None,
+                 pwm_scaling_vectorized=False):
+        bank = MotorBank(1)
+        index = bank.append(name, position, direction, inverted, pwm_bounds, pwm_scaling_func,
+                            pwm_scaling_vectorized)
+        bank.attach_view(index, self)
+
+    #  returns the Motor viewing the row at index of bank, creating it if necessary
+    @classmethod
+    def from_bank(cls, bank, index):
+        motor = bank.get_view(index)
+        if motor is None:
+            motor = cls.__new__(cls)
+            bank.attach_view(index, motor)
+        return motor
 
     def __str__(self):
-        strout = 'Name: ' + self.name + '\n' + 'Position: ' + str(self.__position) + '\n' + \
-                 'Direction: ' + str(self.__direction) + '\n' + 'Inverted: ' + str(self.__inverted) + '\n' \
+        pwm_bounds = self.pwm_bounds
+        strout = 'Name: ' + self.name + '\n' + 'Position: ' + str(self.position) + '\n' + \
+                 'Direction: ' + str(self.direction) + '\n' + 'Inverted: ' + str(self.inverted) + '\n' \
                  + 'PWM Bounds:\n'
 
-        if (self.__pwm_bounds is not None) and (len(self.__pwm_bounds) == 3):
-            strout += '\tFull Reverse: ' + str(self.__pwm_bounds[0]) + '\n'
-            strout += '\tFull Stop: ' + str(self.__pwm_bounds[1]) + '\n'
-            strout += '\tFull Forward: ' + str(self.__pwm_bounds[2]) + '\n'
+        if (pwm_bounds is not None) and (len(pwm_bounds) == 3):
+            strout += '\tFull Reverse: ' + str(pwm_bounds[0]) + '\n'
+            strout += '\tFull Stop: ' + str(pwm_bounds[1]) + '\n'
+            strout += '\tFull Forward: ' + str(pwm_bounds[2]) + '\n'
         else:
             strout += '\tNone\n'
 
         strout += 'PWM Scaling Function: '
-        if self.__pwm_scaling_func is None:
+        if self.pwm_scaling_func is None:
             strout += 'Undefined\n'
         else:
             strout += 'Defined\n'
@@ -44,80 +52,78 @@ class Motor(object):
         return strout
 
     def scale_velocity_to_pwm(self, velocity):
-        if not (self.__pwm_scaling_func is None):
-            return self.__pwm_scaling_func(velocity)
+        pwm_scaling_func = self.pwm_scaling_func
+        if not (pwm_scaling_func is None):
+            return pwm_scaling_func(velocity)
         else:  # pwm scaling function is not defined
-            if self.__symmetric or velocity > 0:
-                return int(self.__pwm_bounds[1] + (velocity * abs(self.__pwm_bounds[2] - self.__pwm_bounds[1])))
+            pwm_bounds = self.pwm_bounds
+            symmetric = abs(pwm_bounds[1] - pwm_bounds[0]) == abs(pwm_bounds[2] - pwm_bounds[1])
+            if symmetric or velocity > 0:
+                return int(pwm_bounds[1] + (velocity * abs(pwm_bounds[2] - pwm_bounds[1])))
             elif velocity < 0:
-                return int(self.__pwm_bounds[1] + (velocity * abs(self.__pwm_bounds[1] - self.__pwm_bounds[0])))
+                return int(pwm_bounds[1] + (velocity * abs(pwm_bounds[1] - pwm_bounds[0])))
             else:  # velocity == 0
-                return self.__pwm_bounds[1]
+                return int(pwm_bounds[1])
 
-    def __calculate_angle_position(self):
-        angle_position = [0.0, 0.0, 0.0]
-        x = self.__position[0]
-        y = self.__position[1]
-        z = self.__position[2]
-
-        #  calculate yaw from robot center
-        angle_position[2] = vutil.calculate_angle_direction(x, y)
+    @property
+    def bank(self):
+        return self._bank
 
-        #  calculate roll from robot center
-        angle_position[1] = vutil.calculate_angle_direction(x, z)
+    @property
+    def index(self):
+        return self._index
 
-        #  calculate pitch from robot center
-        angle_position[0] = vutil.calculate_angle_direction(y, z)
+    @property
+    def name(self):
+        return self._bank.get_name(self._index)
 
-        return angle_position
+    @name.setter
+    def name(self, value):
+        self._bank.set_name(self._index, value)
 
     @property
     def direction(self):
-        return self.__direction
+        return self._bank.directions[self._index].copy()
 
     @direction.setter
     def direction(self, value):
-        if len(value) != 3:
-            raise ValueError('Motor directions must be of length 3. A direction of length ' + str(len(value))
-                             + ' was passed instead.')
-
-        self.__direction = vutil.normalize(np.array(value))
-        if self.__inverted:
-            self.__direction = -self.direction
+        self._bank.set_direction(self._index, value)
 
     @property
     def inverted(self):
-        return self.__inverted
+        return bool(self._bank.inverted[self._index])
 
     @inverted.setter
     def inverted(self, value):
-        if (self.__inverted is False and value is True) or (self.__inverted is True and value is False):
-            self.__inverted = not self.__inverted
-            self.__direction = -self.__direction
+        self._bank.set_inverted(self._index, value)
 
     @property
     def position(self):
-        return self.__position
+        return self._bank.positions[self._index].copy()
 
     @position.setter
     def position(self, value):
-        self.__position = value
-        self.__angle_position = self.__calculate_angle_position()
+        self._bank.set_position(self._index, value)
 
     @property
     def pwm_bounds(self):
-        return self.__pwm_bounds
+        return tuple(int(bound) for bound in self._bank.pwm_bounds[self._index])
 
     @pwm_bounds.setter
     def pwm_bounds(self, value):
-        if len(value) != 3:
-            raise ValueError('Motor pwm bounds must be of length 3. A pwm bound list of length ' + str(len(value))
-                             + ' was passed instead.')
-        self.__pwm_bounds = value
+        self._bank.set_pwm_bounds(self._index, value)
+
+    @property
+    def pwm_scaling_func(self):
+        return self._bank.get_pwm_scaling_func(self._index)
+
+    @property
+    def pwm_scaling_vectorized(self):
+        return self._bank.get_pwm_scaling_vectorized(self._index)
 
     @property
     def angle_position(self):
-        return self.__angle_position
+        return [None if np.isnan(angle) else float(angle) for angle in self._bank.angle_positions[self._index]]
 
     # manual setting of angle position is discouraged
     @angle_position.setter
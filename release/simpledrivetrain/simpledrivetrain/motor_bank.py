@@ -0,0 +1,368 @@
+import _thread
+import numpy as np
+if __package__:
+    from . import vectorutils as vutil
+else:
+    import vectorutils as vutil
+
+
+#  Stores the configuration of many motors as contiguous N x 3 and N x 1 numpy arrays, one row per motor
+#  by order of addition. Motor objects are thin views onto a single row of a MotorBank.
+class MotorBank(object):
+    def __init__(self, capacity=8):
+        capacity = max(int(capacity), 1)
+
+        self.__count = 0
+        self.__names = []
+        self.__indices = {}  # motor name -> row index
+        self.__views = []
+        self.__pwm_scaling_funcs = []
+        self.__pwm_scaling_vectorized = []
+
+        self.__positions = np.zeros((capacity, 3))
+        self.__directions = np.zeros((capacity, 3))
+        self.__inverted = np.zeros(capacity, dtype=bool)
+        self.__pwm_bounds = np.zeros((capacity, 3))
+        self.__angle_positions = np.zeros((capacity, 3))
+
+        #  incremented on every change to the stored motors, so that derived data can be cached against it
+        self.__version = 0
+        self.__lock = _thread.RLock()  # threading.RLock, without importing threading
+
+    def __len__(self):
+        return self.__count
+
+    def __contains__(self, name):
+        return name in self.__indices
+
+    def append(self, name, position, direction, inverted=False, pwm_bounds=(0, 512, 1024), pwm_scaling_func=None,
+               pwm_scaling_vectorized=False):
+        self.__check_length(position, 'positions')
+        self.__check_length(direction, 'directions')
+        self.__check_length(pwm_bounds, 'pwm bounds')
+
+        position = np.array(position, dtype=float)
+        direction = vutil.normalize(np.array(direction, dtype=float))
+        if inverted:
+            direction = -direction
+        angle_position = self.__calculate_angle_position(position)
+
+        with self.__lock:
+            if name in self.__indices:
+                raise ValueError('Motor names must be unique. A motor named ' + str(name) + ' already exists.')
+            return self.__append_row(name, position, direction, bool(inverted), pwm_bounds, angle_position,
+                                     pwm_scaling_func, pwm_scaling_vectorized)
+
+    #  appends many motors at once, deriving their directions and angle positions as append does but for every
+    #  motor with a single set of array operations
+    #  names = sequence of M unique motor names
+    #  positions and directions = M x 3 arrays
+    #  inverted = boolean value or array of M boolean values
+    #  pwm_bounds = (reverse, stop, forward) pwm values of every motor, or an M x 3 array of them
+    #  returns the index of the first appended motor
+    def append_many(self, names, positions, directions, inverted=False, pwm_bounds=(0, 512, 1024)):
+        count = len(names)
+        directions = np.array(directions, dtype=float)
+        if directions.shape != (count, 3):
+            raise ValueError('Motor directions must be of shape ' + str((count, 3)) + '. An array of shape '
+                             + str(directions.shape) + ' was passed instead.')
+
+        norms = np.linalg.norm(directions, axis=1)
+        if np.any(norms == 0):
+            raise ZeroDivisionError('Attempted to normalize a vector of length 0.')
+        inverted = np.broadcast_to(np.asarray(inverted, dtype=bool), (count,))
+        directions *= np.where(inverted, -1.0, 1.0)[:, np.newaxis] / norms[:, np.newaxis]
+
+        return self.extend(names, np.asarray(positions, dtype=float), directions, inverted,
+                           np.broadcast_to(np.asarray(pwm_bounds, dtype=float), (count, 3)))
+
+    #  appends motors whose configuration has already been derived, e.g. by a compiled drivetrain snapshot
+    #  names = sequence of M unique motor names
+    #  positions, directions, and angle_positions = M x 3 arrays, with directions normalized and already inverted
+    #    for inverted motors, and angle_positions NaN where an angle is undefined
+    #    If angle_positions is None, they are calculated from the positions
+    #  inverted = array of M boolean values
+    #  pwm_bounds = M x 3 array of (reverse, stop, forward) pwm values
+    #  returns the index of the first appended motor
+    def extend(self, names, positions, directions, inverted, pwm_bounds, angle_positions=None):
+        names = list(names)
+        count = len(names)
+        if angle_positions is None and np.shape(positions) == (count, 3):
+            angle_positions = self.calculate_angle_positions(positions)
+        for values, label in ((positions, 'positions'), (directions, 'directions'), (pwm_bounds, 'pwm bounds'),
+                              (angle_positions, 'angle positions')):
+            if np.shape(values) != (count, 3):
+                raise ValueError('Motor ' + label + ' must be of shape ' + str((count, 3)) + '. An array of shape '
+                                 + str(np.shape(values)) + ' was passed instead.')
+
+        with self.__lock:
+            seen = set(self.__indices)
+            for name in names:
+                if name in seen:
+                    raise ValueError('Motor names must be unique. A motor named ' + str(name) + ' already exists.')
+                seen.add(name)
+
+            first = self.__count
+            if first + count > len(self.__positions):
+                self.__grow(max(2 * len(self.__positions), first + count))
+
+            rows = slice(first, first + count)
+            self.__positions[rows] = positions
+            self.__directions[rows] = directions
+            self.__inverted[rows] = inverted
+            self.__pwm_bounds[rows] = pwm_bounds
+            self.__angle_positions[rows] = angle_positions
+
+            for i in range(0, count):
+                self.__indices[names[i]] = first + i
+            self.__names.extend(names)
+            self.__views.extend([None] * count)
+            self.__pwm_scaling_funcs.extend([None] * count)
+            self.__pwm_scaling_vectorized.extend([False] * count)
+
+            self.__count += count
+            self.__version += 1
+            return first
+
+    def remove(self, index):
+        with self.__lock:
+            self.__check_index(index)
+
+            #  a removed motor keeps its configuration in a bank of its own
+            view = self.__views[index]
+            if view is not None:
+                detached_bank = MotorBank(1)
+                detached_bank.__append_row(self.__names[index], self.__positions[index], self.__directions[index],
+                                           self.__inverted[index], self.__pwm_bounds[index],
+                                           self.__angle_positions[index], self.__pwm_scaling_funcs[index],
+                                           self.__pwm_scaling_vectorized[index])
+                detached_bank.attach_view(0, view)
+
+            #  motors added after the removed motor shift down by one row
+            last = self.__count - 1
+            for array in (self.__positions, self.__directions, self.__inverted, self.__pwm_bounds,
+                          self.__angle_positions):
+                array[index:last] = array[index + 1:self.__count]
+
+            del self.__indices[self.__names[index]]
+            del self.__names[index]
+            del self.__views[index]
+            del self.__pwm_scaling_funcs[index]
+            del self.__pwm_scaling_vectorized[index]
+            self.__count = last
+
+            for i in range(index, self.__count):
+                self.__indices[self.__names[i]] = i
+                if self.__views[i] is not None:
+                    self.__views[i]._index = i
+
+            self.__version += 1
+
+    def index_of(self, name):
+        if name not in self.__indices:
+            raise KeyError('Attempted to access a motor named ' + str(name) + ' which does not exist.')
+        return self.__indices[name]
+
+    #  registers the Motor object which views the motor at index
+    def attach_view(self, index, view):
+        with self.__lock:
+            self.__check_index(index)
+            view._bank = self
+            view._index = index
+            self.__views[index] = view
+
+    def get_view(self, index):
+        self.__check_index(index)
+        return self.__views[index]
+
+    def get_name(self, index):
+        self.__check_index(index)
+        return self.__names[index]
+
+    def get_pwm_scaling_func(self, index):
+        self.__check_index(index)
+        return self.__pwm_scaling_funcs[index]
+
+    def get_pwm_scaling_vectorized(self, index):
+        self.__check_index(index)
+        return self.__pwm_scaling_vectorized[index]
+
+    def set_name(self, index, name):
+        with self.__lock:
+            self.__check_index(index)
+            if name == self.__names[index]:
+                return
+            if name in self.__indices:
+                raise ValueError('Motor names must be unique. A motor named ' + str(name) + ' already exists.')
+
+            del self.__indices[self.__names[index]]
+            self.__names[index] = name
+            self.__indices[name] = index
+            self.__version += 1
+
+    def set_position(self, index, position):
+        with self.__lock:
+            self.__check_index(index)
+            self.__check_length(position, 'positions')
+
+            self.__positions[index] = position
+            self.__angle_positions[index] = self.__calculate_angle_position(self.__positions[index])
+            self.__version += 1
+
+    #  positions = N x 3 array with a new position for every motor
+    def set_positions(self, positions):
+        with self.__lock:
+            count = self.__count
+            if np.shape(positions) != (count, 3):
+                raise ValueError('Motor positions must be of shape ' + str((count, 3)) + '. An array of shape '
+                                 + str(np.shape(positions)) + ' was passed instead.')
+
+            self.__positions[:count] = positions
+            self.__angle_positions[:count] = self.calculate_angle_positions(self.__positions[:count])
+            self.__version += 1
+
+    def set_direction(self, index, direction):
+        with self.__lock:
+            self.__check_index(index)
+            self.__check_length(direction, 'directions')
+
+            direction = vutil.normalize(np.array(direction, dtype=float))
+            if self.__inverted[index]:
+                direction = -direction
+
+            self.__directions[index] = direction
+            self.__version += 1
+
+    def set_inverted(self, index, inverted):
+        with self.__lock:
+            self.__check_index(index)
+            if bool(inverted) != self.__inverted[index]:
+                self.__inverted[index] = bool(inverted)
+                self.__directions[index] = -self.__directions[index]
+                self.__version += 1
+
+    def set_pwm_bounds(self, index, pwm_bounds):
+        with self.__lock:
+            self.__check_index(index)
+            self.__check_length(pwm_bounds, 'pwm bounds')
+
+            self.__pwm_bounds[index] = pwm_bounds
+            self.__version += 1
+
+    @property
+    def version(self):
+        return self.__version
+
+    #  reentrant lock held by every change to the stored motors; hold it to read several properties consistently
+    #  while other threads may change the motors, e.g. to compile derived data from a single version
+    @property
+    def lock(self):
+        return self.__lock
+
+    @property
+    def motors(self):
+        return list(self.__views)
+
+    @property
+    def names(self):
+        return tuple(self.__names)
+
+    @property
+    def positions(self):
+        return self.__read_only(self.__positions)
+
+    @property
+    def directions(self):
+        return self.__read_only(self.__directions)
+
+    @property
+    def inverted(self):
+        return self.__read_only(self.__inverted)
+
+    @property
+    def pwm_bounds(self):
+        return self.__read_only(self.__pwm_bounds)
+
+    #  (pitch, roll, yaw) angle of each motor around the drivetrain center, NaN where it is undefined
+    @property
+    def angle_positions(self):
+        return self.__read_only(self.__angle_positions)
+
+    @property
+    def pwm_scaling_funcs(self):
+        return tuple(self.__pwm_scaling_funcs)
+
+    @property
+    def pwm_scaling_vectorized(self):
+        return tuple(self.__pwm_scaling_vectorized)
+
+    def __append_row(self, name, position, direction, inverted, pwm_bounds, angle_position, pwm_scaling_func,
+                     pwm_scaling_vectorized):
+        if self.__count == len(self.__positions):
+            self.__grow(2 * self.__count)
+
+        index = self.__count
+        self.__positions[index] = position
+        self.__directions[index] = direction
+        self.__inverted[index] = inverted
+        self.__pwm_bounds[index] = pwm_bounds
+        self.__angle_positions[index] = angle_position
+
+        self.__names.append(name)
+        self.__indices[name] = index
+        self.__views.append(None)
+        self.__pwm_scaling_funcs.append(pwm_scaling_func)
+        self.__pwm_scaling_vectorized.append(pwm_scaling_vectorized)
+
+        self.__count += 1
+        self.__version += 1
+        return index
+
+    def __grow(self, capacity):
+        def resized(array):
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.__count] = array[:self.__count]
+            return grown
+
+        self.__positions = resized(self.__positions)
+        self.__directions = resized(self.__directions)
+        self.__inverted = resized(self.__inverted)
+        self.__pwm_bounds = resized(self.__pwm_bounds)
+        self.__angle_positions = resized(self.__angle_positions)
+
+    def __read_only(self, array):
+        view = array[:self.__count]
+        view.flags.writeable = False
+        return view
+
+    def __check_index(self, index):
+        if not (0 <= index < self.__count):
+            raise IndexError('Attempted to access a motor with an index that is out of bounds.')
+
+    @staticmethod
+    def __check_length(value, label):
+        if len(value) != 3:
+            raise ValueError('Motor ' + label + ' must be of length 3. A value of length ' + str(len(value))
+                             + ' was passed instead.')
+
+    #  positions = M x 3 array of motor positions
+    #  returns the M x 3 array of their pitch, roll, and yaw angles from robot center, NaN where undefined
+    @staticmethod
+    def calculate_angle_positions(positions):
+        positions = np.asarray(positions, dtype=float)
+        x = positions[:, 0]
+        y = positions[:, 1]
+        z = positions[:, 2]
+
+        return np.stack((vutil.calculate_angle_directions(y, z),
+                         vutil.calculate_angle_directions(x, z),
+                         vutil.calculate_angle_directions(x, y)), axis=1)
+
+    #  single-motor form of calculate_angle_positions
+    @staticmethod
+    def __calculate_angle_position(position):
+        x, y, z = position.tolist()
+
+        return (vutil.calculate_angle_directions(y, z),
+                vutil.calculate_angle_directions(x, z),
+                vutil.calculate_angle_directions(x, y))
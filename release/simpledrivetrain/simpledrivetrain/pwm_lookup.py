@@ -0,0 +1,85 @@
+import numpy as np
+
+
+#  A pwm scaling function compiled into a dense table of its values at evenly spaced velocities in [-1, 1].
+#  Calling the table linearly interpolates between the two nearest samples, so evaluating it costs the same
+#  for any function and accepts arrays of velocities. Velocities outside of [-1, 1] are clamped.
+#
+#  pwm_scaling_func = function that converts a velocity in [-1, 1] to a pwm value
+#  resolution = number of samples in the table, at least 2
+#  vectorized is a boolean value, True if pwm_scaling_func accepts and returns numpy arrays
+#  max_error = optional largest allowed difference between the table and pwm_scaling_func
+#    The difference is measured halfway between every pair of samples, where linear interpolation is least
+#    accurate, and a ValueError is raised if it exceeds max_error
+class PwmLookupTable(object):
+    def __init__(self, pwm_scaling_func, resolution=1025, vectorized=False, max_error=None):
+        resolution = int(resolution)
+        if resolution < 2:
+            raise ValueError('Pwm lookup tables require a resolution of at least 2. A resolution of '
+                             + str(resolution) + ' was passed instead.')
+
+        self.__pwm_scaling_func = pwm_scaling_func
+        self.__velocities = np.linspace(-1.0, 1.0, resolution)
+        self.__values = self.__evaluate(pwm_scaling_func, self.__velocities, vectorized)
+
+        midpoints = 0.5 * (self.__velocities[:-1] + self.__velocities[1:])
+        errors = np.abs(self.__evaluate(pwm_scaling_func, midpoints, vectorized) - self(midpoints))
+        self.__max_error = float(errors.max())
+        if max_error is not None and self.__max_error > max_error:
+            raise ValueError('A pwm lookup table with a resolution of ' + str(resolution) + ' differs from its pwm '
+                             + 'scaling function by up to ' + str(self.__max_error) + ', which exceeds the '
+                             + 'allowed error of ' + str(max_error) + '.')
+
+        self.__values.flags.writeable = False
+        self.__velocities.flags.writeable = False
+
+    #  velocity = velocity or numpy array of velocities
+    #  returns the interpolated pwm value of each velocity as a float or a float array
+    def __call__(self, velocity):
+        return np.interp(velocity, self.__velocities, self.__values)
+
+    @staticmethod
+    def __evaluate(pwm_scaling_func, velocities, vectorized):
+        if vectorized:
+            return np.array(pwm_scaling_func(velocities), dtype=float).reshape(velocities.shape)
+        return np.array([pwm_scaling_func(velocity) for velocity in velocities], dtype=float)
+
+    @property
+    def pwm_scaling_func(self):
+        return self.__pwm_scaling_func
+
+    @property
+    def resolution(self):
+        return len(self.__velocities)
+
+    @property
+    def velocities(self):
+        return self.__velocities
+
+    @property
+    def values(self):
+        return self.__values
+
+    #  largest difference between the table and its function measured when the table was compiled
+    @property
+    def max_error(self):
+        return self.__max_error
+
+
+#  tables = sequence of K PwmLookupTable objects with equal resolutions
+#  returns a K x resolution array of the tables' values, which evaluate_lookup_tables accepts
+def stack_lookup_tables(tables):
+    return np.vstack([table.values for table in tables])
+
+
+#  values = K x R array of table values sampled at R evenly spaced velocities in [-1, 1]
+#  velocities = array whose last axis holds one velocity for each of the K tables
+#  returns an array of the same shape as velocities with every table evaluated at once
+def evaluate_lookup_tables(values, velocities):
+    last_sample = values.shape[1] - 1
+    positions = (np.clip(velocities, -1.0, 1.0) + 1.0) * (0.5 * last_sample)
+    lower = np.minimum(positions.astype(int), last_sample - 1)
+    fractions = positions - lower
+
+    rows = np.arange(len(values))
+    return values[rows, lower] * (1.0 - fractions) + values[rows, lower + 1] * fractions
@@ -0,0 +1,207 @@
+import numpy as np
+if __package__:
+    from . import vectorutils as vutils
+    from .simple_drivetrain import ORIENTATION_REFERENCE
+else:
+    import vectorutils as vutils
+    from simple_drivetrain import ORIENTATION_REFERENCE
+
+
+#  orientations = R x 3 array of (pitch, roll, yaw) orientations
+#  returns the R x 3 x 3 rotations from the reference orientation to each orientation
+def calculate_orientation_matrices(orientations):
+    orientation_differences = orientations - ORIENTATION_REFERENCE
+    return vutils.rotation_matrices(orientation_differences[:, 0], orientation_differences[:, 1],
+                                    orientation_differences[:, 2])
+
+
+#  mixing_matrices = R x N_max x 6 array of padded drivetrain mixing matrices
+#  translations and rotations = R x 3 arrays with one command per drivetrain
+#  orientation_matrices = R x 3 x 3 array of drivetrain rotations, or None for local-oriented commands
+#  out = R x N_max float array to which the motor velocities are written
+def mix_fleet_commands(mixing_matrices, translations, rotations, orientation_matrices, out):
+    local_translations = translations
+    if orientation_matrices is not None:
+        local_translations = np.einsum('ri,rij->rj', translations, orientation_matrices)
+
+    commands = np.hstack((local_translations, rotations))
+    np.matmul(mixing_matrices, commands[:, :, np.newaxis], out=out[:, :, np.newaxis])
+
+    #  scale each drivetrain's motor velocities by its maximum velocity; padding motors are always 0
+    if out.shape[1] > 0:
+        out /= np.maximum(np.abs(out).max(axis=1), 1.0)[:, np.newaxis]
+
+    return out
+
+
+#  motor_vels = R x N_max array of motor velocities
+#  stops, forward_spans, and reverse_spans = R x N_max arrays of padded pwm bounds, 0 for padding motors
+#  out = R x N_max integer array to which the motor pwm values are written
+def scale_fleet_vels_to_pwm(motor_vels, stops, forward_spans, reverse_spans, out):
+    #  symmetric bounds have equal spans, so only the sign of the velocity selects the span
+    spans = np.where(motor_vels > 0, forward_spans, reverse_spans)
+    np.copyto(out, stops + motor_vels * spans, casting='unsafe')
+    return out
+
+
+#  drivetrain = SimpleDrivetrain with N motors
+#  returns the N x 6 mixing matrix (the allocation matrix of the enabled motors) and the N-length stops,
+#  forward_spans, and reverse_spans of the drivetrain, as packed into one row of a DrivetrainFleet
+def pack_drivetrain(drivetrain):
+    pwm_bounds = drivetrain.motor_bank.pwm_bounds
+    stops = pwm_bounds[:, 1].astype(float)
+    forward_spans = np.abs(pwm_bounds[:, 2] - pwm_bounds[:, 1]).astype(float)
+    reverse_spans = np.abs(pwm_bounds[:, 1] - pwm_bounds[:, 0]).astype(float)
+    return drivetrain.allocation_matrix, stops, forward_spans, reverse_spans
+
+
+#  Packs the motor geometry of many SimpleDrivetrain objects into padded R x N_max tensors, where R is the
+#  number of drivetrains and N_max is the largest motor count, so that every drivetrain's motor velocities
+#  and pwm values for a tick are computed by a single vectorized call. Padding motors are masked out and
+#  always produce a velocity and pwm value of 0.
+#
+#  The fleet holds a packed copy of the drivetrains' motors; call refresh after changing them.
+class DrivetrainFleet(object):
+    def __init__(self, drivetrains):
+        self.__drivetrains = list(drivetrains)
+        self.__orientation_matrices = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.__drivetrains)
+
+    #  repacks the motors and orientations of every drivetrain
+    def refresh(self):
+        drivetrain_count = len(self.__drivetrains)
+        motor_counts = np.array([len(drivetrain.motor_bank) for drivetrain in self.__drivetrains], dtype=int)
+        max_motor_count = int(motor_counts.max()) if drivetrain_count > 0 else 0
+
+        mixing_matrices = np.zeros((drivetrain_count, max_motor_count, 6))
+        stops = np.zeros((drivetrain_count, max_motor_count))
+        forward_spans = np.zeros((drivetrain_count, max_motor_count))
+        reverse_spans = np.zeros((drivetrain_count, max_motor_count))
+        custom_scalers = []
+
+        for i in range(0, drivetrain_count):
+            motor_count = motor_counts[i]
+            if motor_count == 0:
+                continue
+
+            drivetrain = self.__drivetrains[i]
+            mixing_matrices[i, :motor_count], stops[i, :motor_count], forward_spans[i, :motor_count], \
+                reverse_spans[i, :motor_count] = pack_drivetrain(drivetrain)
+
+            pwm_scaling_funcs = drivetrain.motor_bank.pwm_scaling_funcs
+            for j in range(0, motor_count):
+                if pwm_scaling_funcs[j] is not None:
+                    custom_scalers.append((i, j, pwm_scaling_funcs[j]))
+
+        self.__motor_counts = motor_counts
+        self.__mask = np.arange(max_motor_count) < motor_counts[:, np.newaxis]
+        self.__mixing_matrices = mixing_matrices
+        self.__stops = stops
+        self.__forward_spans = forward_spans
+        self.__reverse_spans = reverse_spans
+        self.__custom_scalers = custom_scalers
+        self.orientations = [drivetrain.orientation for drivetrain in self.__drivetrains]
+
+    #  translations = R x 3 array with one translational velocity per drivetrain
+    #  rotations = R x 3 array with one angular velocity per drivetrain
+    #  orientations = optional R x 3 array of (pitch, roll, yaw) orientations, one per drivetrain
+    #    If set to None, the fleet's orientations are used
+    #  force_local_oriented is a boolean value, as in SimpleDrivetrain.get_motor_vels
+    #  out = optional float array of shape (R, N_max) to which the motor velocities are written
+    #  returns an R x N_max array of motor velocities, each row scaled independently into [-1, 1]
+    def get_motor_vels(self, translations, rotations, orientations=None, force_local_oriented=False, out=None):
+        translations = self.__as_fleet_array(translations, 'translations')
+        rotations = self.__as_fleet_array(rotations, 'rotations')
+
+        orientation_matrices = None
+        if not force_local_oriented:
+            if orientations is None:
+                orientation_matrices = self.__orientation_matrices
+            else:
+                orientation_matrices = calculate_orientation_matrices(self.__as_fleet_array(orientations,
+                                                                                            'orientations'))
+
+        if out is None:
+            out = np.empty(self.__mask.shape)
+        elif out.shape != self.__mask.shape:
+            raise ValueError('The out array for fleet motor velocities must be of shape ' + str(self.__mask.shape)
+                             + '. An array of shape ' + str(out.shape) + ' was passed instead.')
+
+        return mix_fleet_commands(self.__mixing_matrices, translations, rotations, orientation_matrices, out)
+
+    #  accepts the same parameters as get_motor_vels
+    #  out = optional integer array of shape (R, N_max) to which the motor pwm values are written
+    #  returns an R x N_max array of motor pwm values, 0 for padding motors
+    def get_motor_vels_scaled(self, translations, rotations, orientations=None, force_local_oriented=False,
+                              out=None):
+        motor_vels = self.get_motor_vels(translations, rotations, orientations, force_local_oriented)
+
+        if out is None:
+            out = np.empty(motor_vels.shape, dtype=int)
+        elif out.shape != motor_vels.shape:
+            raise ValueError('The out array for fleet motor pwm values must be of shape ' + str(motor_vels.shape)
+                             + '. An array of shape ' + str(out.shape) + ' was passed instead.')
+
+        scale_fleet_vels_to_pwm(motor_vels, self.__stops, self.__forward_spans, self.__reverse_spans, out)
+
+        for drivetrain_index, motor_index, pwm_scaling_func in self.__custom_scalers:
+            out[drivetrain_index, motor_index] = pwm_scaling_func(motor_vels[drivetrain_index, motor_index])
+
+        return out
+
+    def __as_fleet_array(self, values, label):
+        values = np.asarray(values, dtype=float)
+        if values.shape != (len(self.__drivetrains), 3):
+            raise ValueError('Fleet ' + label + ' must be of shape ' + str((len(self.__drivetrains), 3))
+                             + '. An array of shape ' + str(values.shape) + ' was passed instead.')
+        return values
+
+    @property
+    def drivetrains(self):
+        return list(self.__drivetrains)
+
+    #  R x 3 array of (pitch, roll, yaw) orientations used when no orientations are passed
+    @property
+    def orientations(self):
+        return self.__orientations
+
+    @orientations.setter
+    def orientations(self, value):
+        orientations = np.array(value, dtype=float).reshape(len(self.__drivetrains), 3)
+        orientations.flags.writeable = False
+        self.__orientations = orientations
+        self.__orientation_matrices = calculate_orientation_matrices(orientations)
+
+    @property
+    def motor_counts(self):
+        return self.__motor_counts
+
+    #  R x N_max boolean array which is True for real motors and False for padding motors
+    @property
+    def mask(self):
+        return self.__mask
+
+    @property
+    def mixing_matrices(self):
+        return self.__mixing_matrices
+
+    #  R x N_max arrays of padded pwm stop values and forward and reverse spans, 0 for padding motors
+    @property
+    def pwm_stops(self):
+        return self.__stops
+
+    @property
+    def pwm_forward_spans(self):
+        return self.__forward_spans
+
+    @property
+    def pwm_reverse_spans(self):
+        return self.__reverse_spans
+
+    #  (drivetrain index, motor index, function) triples of every motor with its own pwm scaling function
+    @property
+    def custom_pwm_scalers(self):
+        return list(self.__custom_scalers)
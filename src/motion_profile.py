@@ -0,0 +1,160 @@
+import numpy as np
+
+#  waypoints have one column per axis: x, y, z translation followed by pitch, roll, yaw rotation
+AXIS_COUNT = 6
+
+
+#  A trajectory sampled once per tick at a fixed rate. velocities holds the average velocity of each axis over
+#  each tick and positions holds the position of each axis at the start of each tick, so that integrating
+#  the velocities over the ticks reaches every waypoint exactly.
+class MotionProfile(object):
+    def __init__(self, start, velocities, rate):
+        self.__rate = float(rate)
+        self.__velocities = velocities
+        self.__positions = np.empty(velocities.shape)
+        self.__positions[0] = start
+        np.cumsum(velocities[:-1] / self.__rate, axis=0, out=self.__positions[1:])
+        self.__positions[1:] += start
+
+    def __len__(self):
+        return len(self.__velocities)
+
+    #  drivetrain = SimpleDrivetrain which follows the profile
+    #  force_local_oriented is a boolean value, as in SimpleDrivetrain.get_motor_vels
+    #  track_orientation is a boolean value
+    #    If set to True, the profile's (pitch, roll, yaw) positions are used as the orientation of every tick
+    #    If set to False, the drivetrain's current orientation is used for every tick
+    #  returns a T x N array of motor velocities, one row per tick
+    def get_motor_vels(self, drivetrain, force_local_oriented=False, track_orientation=False):
+        orientations = self.orientations if track_orientation else None
+        return drivetrain.get_motor_vels_batch(self.translations, self.rotations, orientations,
+                                               force_local_oriented)
+
+    #  accepts the same parameters as get_motor_vels
+    #  returns a T x N array of motor pwm values, a schedule which can be replayed one row per tick
+    def get_motor_vels_scaled(self, drivetrain, force_local_oriented=False, track_orientation=False):
+        orientations = self.orientations if track_orientation else None
+        return drivetrain.get_motor_vels_scaled_batch(self.translations, self.rotations, orientations,
+                                                      force_local_oriented)
+
+    @property
+    def rate(self):
+        return self.__rate
+
+    @property
+    def duration(self):
+        return len(self.__velocities) / self.__rate
+
+    @property
+    def times(self):
+        return np.arange(len(self.__velocities)) / self.__rate
+
+    #  T x 6 arrays, one row per tick
+    @property
+    def positions(self):
+        return self.__positions
+
+    @property
+    def velocities(self):
+        return self.__velocities
+
+    #  T x 3 views of the translational and rotational columns
+    @property
+    def translations(self):
+        return self.__velocities[:, :3]
+
+    @property
+    def rotations(self):
+        return self.__velocities[:, 3:]
+
+    @property
+    def orientations(self):
+        return self.__positions[:, 3:]
+
+
+#  waypoints = W x 6 array of (x, y, z, pitch, roll, yaw) positions visited in order, stopping at each one
+#  max_velocity and max_acceleration = limits for every axis, either a single value or one value per axis
+#  rate = number of ticks per second
+#  returns a MotionProfile which moves along straight segments between the waypoints with trapezoidal
+#  velocity profiles, reaching each waypoint with every axis at rest
+def trapezoidal_profile(waypoints, max_velocity, max_acceleration, rate=1000.0):
+    return _build_profile(waypoints, (max_velocity, max_acceleration), rate, _trapezoidal_speeds)
+
+
+#  accepts the same parameters as trapezoidal_profile, as well as
+#  max_jerk = jerk limit for every axis, either a single value or one value per axis
+#  returns a MotionProfile with jerk-limited (S-curve) velocity profiles, made by averaging each segment's
+#  trapezoidal profile over a window of max_acceleration / max_jerk seconds
+def s_curve_profile(waypoints, max_velocity, max_acceleration, max_jerk, rate=1000.0):
+    return _build_profile(waypoints, (max_velocity, max_acceleration, max_jerk), rate, _s_curve_speeds)
+
+
+#  Each segment is profiled as a single unit-length path parameter s, whose limits are the tightest of the
+#  axes' limits divided by the axes' displacements, so that every axis starts and stops together. The axis
+#  velocities of a segment are then its displacement scaled by the speed of s.
+def _build_profile(waypoints, limits, rate, segment_speeds):
+    waypoints = np.asarray(waypoints, dtype=float)
+    if waypoints.ndim != 2 or waypoints.shape[1] != AXIS_COUNT or len(waypoints) < 2:
+        raise ValueError('Waypoints must be a W x 6 array with at least 2 waypoints. An array of shape '
+                         + str(waypoints.shape) + ' was passed instead.')
+    if rate <= 0:
+        raise ValueError('Motion profile rates must be positive. A rate of ' + str(rate) + ' was passed instead.')
+
+    axis_limits = []
+    for limit in limits:
+        limit = np.broadcast_to(np.asarray(limit, dtype=float), (AXIS_COUNT,))
+        if np.any(limit <= 0):
+            raise ValueError('Motion profile limits must be positive. Limits of ' + str(limit)
+                             + ' were passed instead.')
+        axis_limits.append(limit)
+
+    segments = []
+    for displacement in np.diff(waypoints, axis=0):
+        moving = displacement != 0
+        if not np.any(moving):
+            continue
+
+        distances = np.abs(displacement[moving])
+        segment_limits = [np.min(limit[moving] / distances) for limit in axis_limits]
+        speeds = segment_speeds(rate, *segment_limits)
+        segments.append(speeds[:, np.newaxis] * displacement)
+
+    if not segments:
+        segments.append(np.zeros((1, AXIS_COUNT)))
+
+    return MotionProfile(waypoints[0], np.concatenate(segments), rate)
+
+
+#  returns the average speed of each tick of a trapezoidal profile along a unit-length path
+def _trapezoidal_speeds(rate, max_velocity, max_acceleration):
+    #  a path too short to reach max_velocity has a triangular profile
+    peak_velocity = min(max_velocity, np.sqrt(max_acceleration))
+    acceleration_time = peak_velocity / max_acceleration
+    total_time = 1.0 / peak_velocity + acceleration_time
+
+    tick_count = max(int(np.ceil(total_time * rate - 1e-9)), 1)
+    times = np.minimum(np.arange(tick_count + 1) / rate, total_time)
+    remaining_times = total_time - times
+
+    progress = np.where(times < acceleration_time, 0.5 * max_acceleration * times ** 2,
+                        np.where(remaining_times > acceleration_time,
+                                 peak_velocity * (times - 0.5 * acceleration_time),
+                                 1.0 - 0.5 * max_acceleration * remaining_times ** 2))
+    progress[-1] = 1.0
+
+    return np.diff(progress) * rate
+
+
+#  returns the average speed of each tick of an S-curve profile along a unit-length path
+def _s_curve_speeds(rate, max_velocity, max_acceleration, max_jerk):
+    speeds = _trapezoidal_speeds(rate, max_velocity, max_acceleration)
+
+    #  a moving average over window ticks ramps the acceleration over window / rate seconds, limiting the jerk
+    #  to max_acceleration / (window / rate) <= max_jerk; the full convolution keeps the total distance
+    window = int(np.ceil(max_acceleration / max_jerk * rate - 1e-9))
+    if window <= 1:
+        return speeds
+
+    sums = np.concatenate(([0.0], np.cumsum(np.concatenate((speeds, np.zeros(window - 1))))))
+    ends = np.arange(1, len(sums))
+    return (sums[ends] - sums[np.maximum(ends - window, 0)]) / window
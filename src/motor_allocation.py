@@ -0,0 +1,148 @@
+import numpy as np
+
+#  smallest share of a direction of motion a motor may leave uncovered when disabled before the allocation is
+#  rebuilt from scratch, since the rank-one update becomes ill-conditioned as a motor's leverage approaches 1
+LEVERAGE_TOLERANCE = 1e-8
+
+
+#  Distributes commands over the enabled motors of a drivetrain whose mixing matrix is M (N x 6).
+#
+#  With every motor enabled, the motor velocities of a command c are M c, whose combined effect on the
+#  drivetrain is M^T M c. With motors disabled, the enabled rows M_a are used to reproduce that effect as
+#  closely as possible with the least motor effort: v = M_a (M_a^T M_a)^+ (M^T M) c. The allocation matrix
+#  M_a (M_a^T M_a)^+ (M^T M) and the pseudo-inverse of M_a, both with zero rows or columns for disabled motors,
+#  are kept up to date as motors are disabled and enabled.
+#
+#  The mixing matrix is factorized once as M = B V^T with B = U S from its thin singular value decomposition,
+#  keeping only its r nonzero singular values, so that the r x r gram matrix B_a^T B_a of the enabled motors is
+#  invertible unless disabling a motor lost a direction of motion. Disabling or enabling a motor changes that
+#  gram matrix by a single rank-one term, so its inverse, the allocation matrix, and the pseudo-inverse are
+#  each updated by a rank-one correction (Sherman-Morrison) rather than being rebuilt.
+class MotorAllocation(object):
+    def __init__(self, mixing_matrix, enabled=None):
+        motor_count = len(mixing_matrix)
+        self.__mixing_matrix = mixing_matrix
+        if enabled is None:
+            self.__enabled = np.ones(motor_count, dtype=bool)
+        else:
+            self.__enabled = np.array(enabled, dtype=bool).reshape(motor_count)
+
+        u, singular_values, vt = np.linalg.svd(mixing_matrix, full_matrices=False)
+        tolerance = singular_values.max(initial=0.0) * max(mixing_matrix.shape) * np.finfo(float).eps
+        rank = int(np.sum(singular_values > tolerance))
+
+        self.__coordinates = u[:, :rank] * singular_values[:rank]  # B, N x r
+        self.__basis = vt[:rank].T  # V, 6 x r
+        self.__effect = (singular_values[:rank] ** 2)[:, np.newaxis] * vt[:rank]  # S^2 V^T, r x 6
+
+        self.__rebuild()
+
+    #  index = row of the motor in the mixing matrix
+    def disable(self, index):
+        if not self.__enabled[index]:
+            return
+        self.__enabled[index] = False
+
+        if self.__gram_inverse is None:
+            self.__rebuild()
+            return
+
+        row = self.__coordinates[index]
+        gram_row = np.dot(self.__gram_inverse, row)
+        denominator = 1.0 - np.dot(row, gram_row)
+        if denominator < LEVERAGE_TOLERANCE:
+            #  the motor alone covered a direction of motion, so the enabled motors lost rank
+            self.__rebuild()
+            return
+
+        self.__gram_inverse = self.__gram_inverse + np.outer(gram_row, gram_row) / denominator
+        enabled_gram_rows = np.dot(self.__coordinates, gram_row) * self.__enabled
+
+        allocation_matrix = self.__allocation_matrix.copy()
+        allocation_matrix[index] = 0.0
+        allocation_matrix += np.outer(enabled_gram_rows, np.dot(gram_row, self.__effect) / denominator)
+        self.__allocation_matrix = allocation_matrix
+
+        pseudo_inverse = self.__pseudo_inverse.copy()
+        pseudo_inverse[:, index] = 0.0
+        pseudo_inverse += np.outer(np.dot(self.__basis, gram_row) / denominator, enabled_gram_rows)
+        self.__pseudo_inverse = pseudo_inverse
+
+    #  index = row of the motor in the mixing matrix
+    def enable(self, index):
+        if self.__enabled[index]:
+            return
+        self.__enabled[index] = True
+
+        #  re-enabling every motor restores the exact mixing matrix
+        if self.__gram_inverse is None or self.__enabled.all():
+            self.__rebuild()
+            return
+
+        row = self.__coordinates[index]
+        gram_row = np.dot(self.__gram_inverse, row)
+        denominator = 1.0 + np.dot(row, gram_row)
+
+        self.__gram_inverse = self.__gram_inverse - np.outer(gram_row, gram_row) / denominator
+        enabled_gram_rows = np.dot(self.__coordinates, gram_row) * self.__enabled
+        effect_row = np.dot(gram_row, self.__effect)
+
+        allocation_matrix = self.__allocation_matrix.copy()
+        allocation_matrix[index] = effect_row
+        allocation_matrix -= np.outer(enabled_gram_rows, effect_row / denominator)
+        self.__allocation_matrix = allocation_matrix
+
+        basis_row = np.dot(self.__basis, gram_row)
+        pseudo_inverse = self.__pseudo_inverse.copy()
+        pseudo_inverse[:, index] = basis_row
+        pseudo_inverse -= np.outer(basis_row / denominator, enabled_gram_rows)
+        self.__pseudo_inverse = pseudo_inverse
+
+    #  returns an allocation of the same motors which is disabled and enabled independently of this one
+    #  Updates replace the arrays of an allocation rather than writing to them, so the copy shares them until
+    #  either allocation is next updated.
+    def copy(self):
+        allocation = MotorAllocation.__new__(MotorAllocation)
+        allocation.__dict__.update(self.__dict__)
+        allocation.__enabled = self.__enabled.copy()
+        return allocation
+
+    def __rebuild(self):
+        coordinates = self.__coordinates * self.__enabled[:, np.newaxis]
+        gram = np.dot(coordinates.T, coordinates)
+
+        if np.linalg.matrix_rank(coordinates) == len(gram):
+            self.__gram_inverse = np.linalg.inv(gram)
+            gram_pseudo_inverse = self.__gram_inverse
+        else:
+            self.__gram_inverse = None
+            gram_pseudo_inverse = np.linalg.pinv(gram, hermitian=True)
+
+        if self.__enabled.all():
+            self.__allocation_matrix = self.__mixing_matrix
+        else:
+            self.__allocation_matrix = np.dot(np.dot(coordinates, gram_pseudo_inverse), self.__effect)
+        self.__pseudo_inverse = np.dot(np.dot(self.__basis, gram_pseudo_inverse), coordinates.T)
+
+    @property
+    def mixing_matrix(self):
+        return self.__mixing_matrix
+
+    #  N x 6 matrix mapping a command onto the motor velocities of the enabled motors
+    @property
+    def allocation_matrix(self):
+        return self.__allocation_matrix
+
+    #  6 x N least-squares pseudo-inverse of the enabled motors' rows of the mixing matrix
+    @property
+    def pseudo_inverse(self):
+        return self.__pseudo_inverse
+
+    @property
+    def enabled(self):
+        return self.__enabled.copy()
+
+    #  True if the enabled motors can no longer produce every motion of the full drivetrain
+    @property
+    def degraded(self):
+        return self.__gram_inverse is None
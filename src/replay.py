@@ -0,0 +1,182 @@
+import argparse
+import sys
+import time
+import numpy as np
+if __package__:
+    from .simple_drivetrain import SimpleDrivetrain
+    from .flight_recorder import RECORDER_MAGIC, HEADER_SIZE, FlightRecording, record_fields
+else:
+    from simple_drivetrain import SimpleDrivetrain
+    from flight_recorder import RECORDER_MAGIC, HEADER_SIZE, FlightRecording, record_fields
+
+#  number of commands evaluated together by default; large enough to amortize the per-batch overhead while
+#  keeping each chunk within a few megabytes for typical motor counts
+DEFAULT_CHUNK_SIZE = 65536
+
+
+#  A log of recorded drivetrain commands which is read from disk one chunk at a time, so that logs far larger
+#  than memory are replayed with flat memory use. Two formats are accepted:
+#  - a FlightRecorder file, whose retained records are read in chronological order along with the orientation
+#    recorded with each command; the recorder must have stopped writing to the file
+#  - a .npy file of a K x 6 array of (translation, rotation) rows or a K x 9 array of
+#    (translation, rotation, orientation) rows
+#
+#  path = path of the log
+class CommandLog(object):
+    def __init__(self, path):
+        self.__path = path
+
+        with open(path, 'rb') as fh:
+            magic = fh.read(len(RECORDER_MAGIC))
+            fh.seek(0)
+            if magic == RECORDER_MAGIC:
+                self.__read_recording_layout()
+            else:
+                self.__read_npy_layout(fh)
+
+    def __len__(self):
+        return sum(row_count for offset, row_count in self.__segments)
+
+    #  chunk_size = maximum number of commands per chunk
+    #  yields (translations, rotations, orientations) tuples of K x 3 float arrays in recorded order
+    #    orientations is None for logs which do not hold orientations
+    def chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError('Command log chunk sizes must be at least 1. A chunk size of ' + str(chunk_size)
+                             + ' was passed instead.')
+
+        with open(self.__path, 'rb') as fh:
+            for offset, row_count in self.__segments:
+                fh.seek(offset)
+                for start in range(0, row_count, chunk_size):
+                    count = min(chunk_size, row_count - start)
+                    rows = np.fromfile(fh, dtype=self.__dtype, count=count * self.__width)
+                    if len(rows) != count * self.__width:
+                        raise ValueError('Attempted to read past the end of the command log ' + str(self.__path)
+                                         + '.')
+                    rows = rows.reshape(count, self.__width).astype(float, copy=False)
+
+                    orientations = None
+                    if self.__orientation_columns is not None:
+                        orientations = rows[:, self.__orientation_columns]
+                    yield rows[:, self.__translation_columns], rows[:, self.__rotation_columns], orientations
+
+    @property
+    def has_orientations(self):
+        return self.__orientation_columns is not None
+
+    def __read_recording_layout(self):
+        recording = FlightRecording(self.__path)
+        capacity = recording.capacity
+        count = recording.count
+        width = recording.records.shape[1]
+        row_size = recording.records.itemsize * width
+
+        #  once the ring buffer has wrapped, the oldest record is in the row after the newest one
+        if count <= capacity:
+            self.__segments = [(HEADER_SIZE, count)]
+        else:
+            oldest = count % capacity
+            self.__segments = [(HEADER_SIZE + oldest * row_size, capacity - oldest), (HEADER_SIZE, oldest)]
+
+        fields = record_fields(recording.motor_count)
+        self.__dtype = np.dtype('<f8')
+        self.__width = width
+        self.__translation_columns = fields['translation']
+        self.__rotation_columns = fields['rotation']
+        self.__orientation_columns = fields['orientation']
+
+    def __read_npy_layout(self, fh):
+        try:
+            version = np.lib.format.read_magic(fh)
+        except ValueError:
+            raise ValueError('Command logs must be flight recordings or .npy files. ' + str(self.__path)
+                             + ' is neither.')
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fh)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fh)
+
+        if len(shape) != 2 or shape[1] not in (6, 9) or fortran_order or dtype.hasobject:
+            raise ValueError('Command log arrays must be C-ordered numeric arrays of shape (K, 6) or (K, 9). An '
+                             + 'array of shape ' + str(shape) + ' was passed instead.')
+
+        self.__segments = [(fh.tell(), shape[0])]
+        self.__dtype = dtype
+        self.__width = shape[1]
+        self.__translation_columns = slice(0, 3)
+        self.__rotation_columns = slice(3, 6)
+        self.__orientation_columns = slice(6, 9) if shape[1] == 9 else None
+
+
+#  drivetrain = SimpleDrivetrain object whose pwm values are computed
+#  log = CommandLog or path of a command log
+#  output_path = path of the .npy file to which the K x N integer array of motor pwm values is written
+#  chunk_size = maximum number of commands evaluated together
+#  force_local_oriented is a boolean value, as in SimpleDrivetrain.get_motor_vels_batch
+#    Recorded orientations are used for logs which hold them, and the drivetrain orientation otherwise
+#  returns a dictionary of the replay's samples, seconds, samples_per_second, and peak_memory, the peak resident
+#  set size of the process in bytes or None where it cannot be measured
+def replay_command_log(drivetrain, log, output_path, chunk_size=DEFAULT_CHUNK_SIZE, force_local_oriented=False):
+    if not isinstance(log, CommandLog):
+        log = CommandLog(log)
+
+    sample_count = len(log)
+    motor_count = len(drivetrain.motor_bank)
+    motor_pwms = np.empty((min(chunk_size, max(sample_count, 1)), motor_count), dtype=int)
+
+    start = time.perf_counter()
+    with open(output_path, 'wb') as fh:
+        np.lib.format.write_array_header_1_0(fh, {'descr': np.lib.format.dtype_to_descr(motor_pwms.dtype),
+                                                  'fortran_order': False,
+                                                  'shape': (sample_count, motor_count)})
+        for translations, rotations, orientations in log.chunks(chunk_size):
+            out = motor_pwms[:len(translations)]
+            drivetrain.get_motor_vels_scaled_batch(translations, rotations, orientations, force_local_oriented,
+                                                   out=out)
+            out.tofile(fh)
+    seconds = time.perf_counter() - start
+
+    return {'samples': sample_count,
+            'seconds': seconds,
+            'samples_per_second': sample_count / seconds if seconds > 0.0 else float('inf'),
+            'peak_memory': _get_peak_memory()}
+
+
+#  entry point of the simpledrivetrain-replay console script
+#  argv = optional list of command line arguments, defaults to sys.argv[1:]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a recorded command log through a drivetrain and write the '
+                                                 'resulting motor pwm values.')
+    parser.add_argument('drivetrain', help='path of the drivetrain xml file')
+    parser.add_argument('log', help='path of the command log, a flight recording or a .npy file')
+    parser.add_argument('output', help='path of the .npy file to write the K x N motor pwm values to')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='number of commands evaluated together (default: %(default)s)')
+    parser.add_argument('--local', action='store_true', help='compute local-oriented motor values')
+    args = parser.parse_args(argv)
+
+    drivetrain = SimpleDrivetrain()
+    drivetrain.load_drivetrain_from_file(args.drivetrain)
+    report = replay_command_log(drivetrain, args.log, args.output, args.chunk_size, args.local)
+
+    peak_memory = report['peak_memory']
+    sys.stdout.write('samples: %d\nseconds: %.3f\nsamples per second: %.1f\npeak memory: %s\n'
+                     % (report['samples'], report['seconds'], report['samples_per_second'],
+                        'unavailable' if peak_memory is None else '%.1f MiB' % (peak_memory / 1048576.0)))
+    return 0
+
+
+def _get_peak_memory():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+
+    #  ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_memory if sys.platform == 'darwin' else peak_memory * 1024
+
+
+if __name__ == '__main__':
+    sys.exit(main())
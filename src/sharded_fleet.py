@@ -0,0 +1,257 @@
+import multiprocessing
+import os
+import sys
+import threading
+import numpy as np
+if __package__:
+    from .drivetrain_fleet import DrivetrainFleet, calculate_orientation_matrices, mix_fleet_commands, \
+        scale_fleet_vels_to_pwm
+else:
+    from drivetrain_fleet import DrivetrainFleet, calculate_orientation_matrices, mix_fleet_commands, \
+        scale_fleet_vels_to_pwm
+
+#  values of the shared control word read by the workers at the start of every tick
+_COMMAND_FIELD_ORIENTED = 0
+_COMMAND_LOCAL_ORIENTED = 1
+_COMMAND_STOP = 2
+
+_shared_memory = None
+
+
+#  multiprocessing.shared_memory only exists from Python 3.8, so it is imported when the first sharded fleet is
+#  created rather than with this module, which keeps the rest of the package importable on older versions
+def _get_shared_memory():
+    global _shared_memory
+    if _shared_memory is None:
+        try:
+            from multiprocessing import shared_memory
+        except ImportError:
+            raise RuntimeError('Attempted to create a sharded fleet on Python ' + '.'.join(
+                str(part) for part in sys.version_info[:3]) + '. Sharded fleets require Python 3.8 or newer.')
+        _shared_memory = shared_memory
+    return _shared_memory
+
+
+#  Steps a DrivetrainFleet across a pool of worker processes. The packed motor geometry, the per-tick
+#  translation, rotation, and orientation inputs, and the motor velocity and pwm outputs all live in
+#  multiprocessing.shared_memory arrays. Each worker owns a contiguous shard of drivetrains and, once per tick,
+#  computes that shard directly in shared memory, so no per-tick data is pickled between processes; a tick
+#  costs two barrier waits on top of the computation.
+#
+#  The fleet's geometry is copied into shared memory when the ShardedDrivetrainFleet is created, so it must be
+#  recreated after the drivetrains' motors change. Motors with their own pwm scaling functions are not
+#  supported since the functions cannot be shared with the workers. Requires Python 3.8 or newer.
+class ShardedDrivetrainFleet(object):
+    def __init__(self, drivetrains, worker_count=None):
+        self.__blocks = []
+        self.__layout = []
+        self.__workers = []
+        self.__closed = False
+
+        fleet = drivetrains if isinstance(drivetrains, DrivetrainFleet) else DrivetrainFleet(drivetrains)
+        if fleet.custom_pwm_scalers:
+            raise ValueError('Attempted to shard a fleet with motors which have their own pwm scaling functions.')
+
+        if worker_count is None:
+            worker_count = os.cpu_count() or 1
+        worker_count = min(int(worker_count), len(fleet))
+        if worker_count < 1:
+            raise ValueError('A sharded fleet requires at least one drivetrain and one worker.')
+
+        self.__fleet = fleet
+
+        drivetrain_count, max_motor_count = fleet.mask.shape
+        self.__control = self.__allocate('control', (1,), np.int64)
+        self.__mixing_matrices = self.__allocate('mixing_matrices', (drivetrain_count, max_motor_count, 6), float)
+        self.__stops = self.__allocate('stops', (drivetrain_count, max_motor_count), float)
+        self.__forward_spans = self.__allocate('forward_spans', (drivetrain_count, max_motor_count), float)
+        self.__reverse_spans = self.__allocate('reverse_spans', (drivetrain_count, max_motor_count), float)
+        self.__translations = self.__allocate('translations', (drivetrain_count, 3), float)
+        self.__rotations = self.__allocate('rotations', (drivetrain_count, 3), float)
+        self.__orientations = self.__allocate('orientations', (drivetrain_count, 3), float)
+        self.__motor_vels = self.__allocate('motor_vels', (drivetrain_count, max_motor_count), float)
+        self.__motor_pwms = self.__allocate('motor_pwms', (drivetrain_count, max_motor_count), int)
+
+        self.__mixing_matrices[:] = fleet.mixing_matrices
+        self.__stops[:] = fleet.pwm_stops
+        self.__forward_spans[:] = fleet.pwm_forward_spans
+        self.__reverse_spans[:] = fleet.pwm_reverse_spans
+        self.__orientations[:] = fleet.orientations
+
+        #  every worker and the stepping process meet at the start barrier to begin a tick and at the done
+        #  barrier once every shard has been written
+        self.__start_barrier = multiprocessing.Barrier(worker_count + 1)
+        self.__done_barrier = multiprocessing.Barrier(worker_count + 1)
+
+        try:
+            bounds = np.linspace(0, drivetrain_count, worker_count + 1).astype(int)
+            for i in range(0, worker_count):
+                worker = multiprocessing.Process(target=_run_worker, daemon=True,
+                                                 args=(self.__layout, bounds[i], bounds[i + 1],
+                                                       self.__start_barrier, self.__done_barrier))
+                worker.start()
+                self.__workers.append(worker)
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self.__fleet)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    #  translations, rotations, and orientations are R x 3 arrays as in DrivetrainFleet.get_motor_vels
+    #    Each set to None keeps the values already in the shared translations, rotations, or orientations arrays,
+    #    which callers may write to directly between ticks
+    #  force_local_oriented is a boolean value, as in SimpleDrivetrain.get_motor_vels
+    #  returns the shared R x N_max array of motor pwm values, which is overwritten by the next tick
+    def step(self, translations=None, rotations=None, orientations=None, force_local_oriented=False):
+        if self.__closed:
+            raise RuntimeError('Attempted to step a sharded fleet which has been closed.')
+
+        for values, shared in ((translations, self.__translations), (rotations, self.__rotations),
+                               (orientations, self.__orientations)):
+            if values is not None:
+                shared[:] = values
+
+        self.__control[0] = _COMMAND_LOCAL_ORIENTED if force_local_oriented else _COMMAND_FIELD_ORIENTED
+        try:
+            self.__start_barrier.wait()
+            self.__done_barrier.wait()
+        except threading.BrokenBarrierError:
+            self.__start_barrier.abort()
+            self.close()
+            raise RuntimeError('A sharded fleet worker failed while computing a tick.')
+
+        return self.__motor_pwms
+
+    #  stops the workers and releases the shared memory; the shared arrays must not be used afterwards
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+
+        if self.__workers:
+            self.__control[0] = _COMMAND_STOP
+            try:
+                self.__start_barrier.wait(timeout=5.0)
+            except threading.BrokenBarrierError:
+                pass
+            for worker in self.__workers:
+                worker.join(timeout=5.0)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+        self.__workers = []
+
+        self.__control = self.__mixing_matrices = self.__stops = self.__forward_spans = self.__reverse_spans = None
+        self.__translations = self.__rotations = self.__orientations = None
+        self.__motor_vels = self.__motor_pwms = None
+
+        for block in self.__blocks:
+            #  arrays still held by callers keep their mapping alive until they are garbage collected
+            try:
+                block.close()
+            except BufferError:
+                pass
+            block.unlink()
+        self.__blocks = []
+
+    def __allocate(self, field, shape, dtype):
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        block = _get_shared_memory().SharedMemory(create=True, size=size)
+        self.__blocks.append(block)
+        self.__layout.append((field, block.name, shape, dtype.str))
+
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.fill(0)
+        return array
+
+    @property
+    def fleet(self):
+        return self.__fleet
+
+    @property
+    def worker_count(self):
+        return len(self.__workers)
+
+    #  shared R x 3 input arrays
+    @property
+    def translations(self):
+        return self.__translations
+
+    @property
+    def rotations(self):
+        return self.__rotations
+
+    @property
+    def orientations(self):
+        return self.__orientations
+
+    #  shared R x N_max output arrays of the last tick
+    @property
+    def motor_vels(self):
+        return self.__motor_vels
+
+    @property
+    def motor_pwms(self):
+        return self.__motor_pwms
+
+    @property
+    def mask(self):
+        return self.__fleet.mask
+
+
+#  entry point of a worker process; computes drivetrains [start, stop) of every tick until told to stop
+def _run_worker(layout, start, stop, start_barrier, done_barrier):
+    blocks = []
+    arrays = {}
+    for field, name, shape, dtype in layout:
+        block = _get_shared_memory().SharedMemory(name=name)
+        blocks.append(block)
+        arrays[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    control = arrays['control']
+    mixing_matrices = arrays['mixing_matrices'][start:stop]
+    stops = arrays['stops'][start:stop]
+    forward_spans = arrays['forward_spans'][start:stop]
+    reverse_spans = arrays['reverse_spans'][start:stop]
+    translations = arrays['translations'][start:stop]
+    rotations = arrays['rotations'][start:stop]
+    orientations = arrays['orientations'][start:stop]
+    motor_vels = arrays['motor_vels'][start:stop]
+    motor_pwms = arrays['motor_pwms'][start:stop]
+
+    try:
+        while True:
+            start_barrier.wait()
+            command = control[0]
+            if command == _COMMAND_STOP:
+                break
+
+            orientation_matrices = None
+            if command == _COMMAND_FIELD_ORIENTED:
+                orientation_matrices = calculate_orientation_matrices(orientations)
+            mix_fleet_commands(mixing_matrices, translations, rotations, orientation_matrices, motor_vels)
+            scale_fleet_vels_to_pwm(motor_vels, stops, forward_spans, reverse_spans, motor_pwms)
+
+            done_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except Exception:
+        #  wake the stepping process rather than leaving it waiting on a tick which will never finish
+        done_barrier.abort()
+        raise
+    finally:
+        del control, mixing_matrices, stops, forward_spans, reverse_spans, translations, rotations, orientations, \
+            motor_vels, motor_pwms, arrays
+        for block in blocks:
+            block.close()
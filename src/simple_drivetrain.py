@@ -1,17 +1,242 @@
+import _thread
+import math
+import os
+import time
+import warnings
 import numpy as np
-from motor import Motor
-import vectorutils as vutils
-from lxml import etree
+
+#  the modules import one another relative to the simpledrivetrain package when installed, and by their
+#  top-level names when imported from src, as the tests and benchmarks do
+if __package__:
+    from .motor import Motor
+    from .motor_bank import MotorBank
+    from . import vectorutils as vutils
+else:
+    from motor import Motor
+    from motor_bank import MotorBank
+    import vectorutils as vutils
+
+
+#  orientation at which field-oriented and local-oriented motor velocities coincide
+ORIENTATION_REFERENCE = np.array((0.0, 0.0, np.pi / 2.0))
+
+#  undoes the reference orientation; the reference only yaws, so this composes exactly with any attitude
+REFERENCE_MATRIX_INVERSE = vutils.rotation_matrix(-ORIENTATION_REFERENCE[0], -ORIENTATION_REFERENCE[1],
+                                                  -ORIENTATION_REFERENCE[2])
+
+#  components of ORIENTATION_REFERENCE as floats, compared against the orientation on every field-oriented call
+_REFERENCE_PITCH, _REFERENCE_ROLL, _REFERENCE_YAW = [float(angle) for angle in ORIENTATION_REFERENCE]
+
+#  compiled drivetrain snapshots are written next to the xml file they were compiled from, with this suffix
+COMPILED_SUFFIX = '.compiled.npz'
+
+#  incremented whenever the contents of compiled drivetrain snapshots change
+COMPILED_FORMAT_VERSION = 1
+
+#  xml module used to load drivetrain files, imported on first use since many processes never load a file
+_etree = None
+
+
+#  returns lxml.etree, or the standard library's xml.etree.ElementTree if lxml is not installed
+def _get_etree():
+    global _etree
+    if _etree is None:
+        try:
+            from lxml import etree
+        except ImportError:
+            import xml.etree.ElementTree as etree
+        _etree = etree
+    return _etree
+
+
+#  motor_allocation and pwm_lookup modules, imported on first use since most drivetrains never disable a motor
+#  or enable lookup tables
+_motor_allocation = None
+_pwm_lookup = None
+
+
+def _get_motor_allocation():
+    global _motor_allocation
+    if _motor_allocation is None:
+        if __package__:
+            from . import motor_allocation
+        else:
+            import motor_allocation
+        _motor_allocation = motor_allocation
+    return _motor_allocation
+
+
+def _get_pwm_lookup():
+    global _pwm_lookup
+    if _pwm_lookup is None:
+        if __package__:
+            from . import pwm_lookup
+        else:
+            import pwm_lookup
+        _pwm_lookup = pwm_lookup
+    return _pwm_lookup
+
+
+#  returns the process umask, which can only be read by replacing it
+def _get_umask():
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+#  stages of motor velocity and pwm computation timed while profiling is enabled
+PROFILING_STAGES = ('orientation', 'mixing', 'normalization', 'pwm_scaling')
+
+
+#  Motor data compiled from a single version of the motor bank. A geometry is never modified once it has been
+#  published, apart from compiling its allocation on first use: every change to the motors compiles a new
+#  geometry and replaces the drivetrain's single reference to it, so a call which read that reference computes
+#  all of its motor values from one consistent geometry whatever other threads change meanwhile.
+class _CompiledGeometry(object):
+    __slots__ = ('version', 'names', 'mixing_matrix', 'motor_matrix', 'allocation', 'pwm_scaling')
+
+    #  version = version of the motor bank the geometry was compiled from
+    #  names = tuple of the motor names, in the order of the rows of the matrices
+    #  mixing_matrix = read-only N x 6 mixing matrix of every motor
+    #  motor_matrix = mixing matrix of the enabled motors, used to compute motor velocities
+    #  allocation = MotorAllocation of the enabled motors, or None until one is needed
+    #  pwm_scaling = (stops, forward_spans, reverse_spans, custom_scalers, lookup) tuple of the motor pwm bounds
+    def __init__(self, version, names, mixing_matrix, motor_matrix, allocation, pwm_scaling):
+        self.version = version
+        self.names = names
+        self.mixing_matrix = mixing_matrix
+        self.motor_matrix = motor_matrix
+        self.allocation = allocation
+        self.pwm_scaling = pwm_scaling
+
+
+#  preallocated buffers reused by every single-command call of one thread for a given geometry, along with the
+#  terms of the field-oriented motor velocities cached between calls
+class _ScratchBuffers(object):
+    __slots__ = ('geometry', 'motor_matrix', 'pwm_scaling', 'command', 'command_translation', 'translation',
+                 'magnitudes', 'motor_vels', 'motor_pwms', 'spans', 'scaled_vels', 'positive', 'oriented_terms',
+                 'oriented_command', 'rotation_key', 'pending_rotation_key', 'yaw_basis', 'yaw_terms',
+                 'yaw_coefficients', 'yaw_key')
+
+    def __init__(self, geometry):
+        motor_count = len(geometry.motor_matrix)
+        self.geometry = geometry
+        self.motor_matrix = geometry.motor_matrix
+        self.pwm_scaling = geometry.pwm_scaling
+
+        self.command = np.zeros(6)
+        self.command_translation = self.command[:3]
+        self.translation = np.zeros(3)
+
+        #  command inputs which the cached terms were computed from
+        self.rotation_key = None
+        self.pending_rotation_key = None
+        self.yaw_key = None
+        self.oriented_terms = np.zeros((motor_count, 4), order='F')  # [M_x, M_y, M_z, M_r r]
+        self.oriented_terms[:, :3] = geometry.motor_matrix[:, :3]
+        self.oriented_command = np.array((0.0, 0.0, 0.0, 1.0))
+        self.yaw_basis = np.zeros((6, 3))
+        self.yaw_terms = np.zeros((motor_count, 3))  # [A, B, C]
+        self.yaw_coefficients = np.array((1.0, 0.0, 1.0))
+
+        self.magnitudes = np.zeros(motor_count)
+        self.motor_vels = np.zeros(motor_count)
+        self.motor_pwms = np.zeros(motor_count, dtype=int)
+        self.spans = np.zeros(motor_count)
+        self.scaled_vels = np.zeros(motor_count)
+        self.positive = np.zeros(motor_count, dtype=bool)
+
+
+#  scratch buffers of the calling thread, so that threads computing motor values concurrently never share them;
+#  _thread.local is threading.local without the cost of importing threading
+class _ThreadScratch(_thread._local):
+    buffers = None
+
+
+#  command buffers reused by every micro-batch of a command stream
+class _StreamBuffers(object):
+    __slots__ = ('translations', 'rotations', 'orientations', 'motor_pwms', 'count', 'has_orientations')
+
+    def __init__(self, batch_size):
+        self.translations = np.zeros((batch_size, 3))
+        self.rotations = np.zeros((batch_size, 3))
+        self.orientations = np.zeros((batch_size, 3))
+        self.motor_pwms = None
+        self.count = 0
+        self.has_orientations = False
+
+    def append(self, command, drivetrain):
+        orientation = command[2] if len(command) > 2 else None
+
+        self.translations[self.count] = command[0]
+        self.rotations[self.count] = command[1]
+        if orientation is not None:
+            self.orientations[self.count] = orientation
+            self.has_orientations = True
+        else:
+            self.orientations[self.count] = drivetrain.orientation
+        self.count += 1
 
 
 class SimpleDrivetrain(object):
     def __init__(self, orientation=(0.0, 0.0, np.pi / 2.0)):
-        self.__motors = None
+        self.__bank = MotorBank()
+        self.__geometry = None  # _CompiledGeometry of the current motors, compiled lazily
+        self.__thread_scratch = _ThreadScratch()
+        self.__disabled_names = frozenset()
+        self.__pwm_lookup_resolution = None
+        self.__pwm_lookup_max_error = None
+        self.__pwm_lookup_tables = {}  # pwm scaling function -> PwmLookupTable compiled from it
+        self.__reuse_buffers = False
+        self.__profile = dict((stage, [0, 0.0]) for stage in PROFILING_STAGES)  # stage -> [calls, total time]
+        self.__orientation = None
+        self.__orientation_quaternion = None
+        self.__orientation_matrix = None
+        self.__recording = None  # (FlightRecorder, names of the motors it was attached to), or None
         self.orientation = orientation
 
-    def load_drivetrain_from_file(self, filepath):
-        root = etree.parse(filepath).getroot()
+    #  filepath = path of a drivetrain xml file
+    #  use_compiled is a boolean value
+    #    If set to True, the compiled snapshot at filepath + COMPILED_SUFFIX is loaded in place of the xml file if it
+    #    was compiled from the file's current contents; otherwise the xml file is loaded and the snapshot is
+    #    rewritten, unless its directory is not writable
+    #    If set to False (default), the xml file is always loaded and no snapshot is written
+    def load_drivetrain_from_file(self, filepath, use_compiled=False):
+        with open(filepath, 'rb') as fh:
+            source = fh.read()
+
+        if use_compiled:
+            import hashlib  # imported on first use, as the xml parser is, to keep the module quick to import
+            import zipfile
+
+            compiled_path = filepath + COMPILED_SUFFIX
+            source_hash = hashlib.sha256(source).hexdigest()
+            try:
+                snapshot = self.__read_compiled(compiled_path, source_hash)
+            except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+                #  a missing, stale, or corrupt snapshot falls back to the xml file; errors adding its motors do not
+                snapshot = None
+            if snapshot is not None:
+                self.__add_compiled(*snapshot)
+                return
+
+        root = _get_etree().fromstring(source)
+        first_index = len(self.__bank)
+        orientation = self.__load_element(root)
+
+        if use_compiled:
+            try:
+                self.__save_compiled(compiled_path, first_index, orientation, source_hash)
+            except OSError:  # e.g. a read-only directory, which only costs the next load parsing the xml again
+                pass
 
+    #  element = parsed <SimpleDrivetrain> xml element, as in the files read by load_drivetrain_from_file
+    def load_drivetrain_from_element(self, element):
+        self.__load_element(element)
+
+    #  adds the element's motors and applies its orientation, which is returned, or None if it has none
+    def __load_element(self, root):
+        orientation = None
         orientation_element = root.find('orientation')
         if orientation_element is not None:
             orientation_pitch = float(orientation_element.get('pitch'))
@@ -20,144 +245,910 @@ class SimpleDrivetrain(object):
             orientation = (orientation_pitch, orientation_roll, orientation_yaw)
             self.orientation = orientation
 
+        names = []
+        inverted = []
+        positions = []
+        directions = []
+        pwm_bounds = []
         for motor_element in root.findall('motor'):
-            name = motor_element.get('name')
-
-            inverted = False
-            if motor_element.get('inverted') == 'True':
-                inverted = True
+            names.append(motor_element.get('name'))
+            inverted.append(motor_element.get('inverted') == 'True')
 
             position_element = motor_element.find('position')
-            position_x = float(position_element.get('x'))
-            position_y = float(position_element.get('y'))
-            position_z = float(position_element.get('z'))
-            position = (position_x, position_y, position_z)
+            positions.append((float(position_element.get('x')), float(position_element.get('y')),
+                              float(position_element.get('z'))))
 
             direction_element = motor_element.find('direction')
-            direction_x = float(direction_element.get('x'))
-            direction_y = float(direction_element.get('y'))
-            direction_z = float(direction_element.get('z'))
-            direction = (direction_x, direction_y, direction_z)
+            directions.append((float(direction_element.get('x')), float(direction_element.get('y')),
+                               float(direction_element.get('z'))))
 
             pwm_bounds_element = motor_element.find('pwm_bounds')
-            pwm_reverse = int(pwm_bounds_element.get('reverse'))
-            pwm_stop = int(pwm_bounds_element.get('stop'))
-            pwm_forward = int(pwm_bounds_element.get('forward'))
-            pwm_bounds = (pwm_reverse, pwm_stop, pwm_forward)
+            pwm_bounds.append((int(pwm_bounds_element.get('reverse')), int(pwm_bounds_element.get('stop')),
+                               int(pwm_bounds_element.get('forward'))))
 
-            self.add_new_motor(name, position, direction, inverted, pwm_bounds)
+        if names:
+            self.add_new_motors(names, np.reshape(positions, (len(names), 3)),
+                                np.reshape(directions, (len(names), 3)), inverted, pwm_bounds)
 
-    def add_new_motor(self, name, position, direction, inverted=False, pwm_bounds=(0, 512, 1024), pwm_scaling_func=None):
-        if self.__motors is None:
-            self.__motors = [Motor(name, position, direction, inverted, pwm_bounds, pwm_scaling_func)]
-        else:
-            self.__motors.append(Motor(name, position, direction, inverted, pwm_bounds, pwm_scaling_func))
+        return orientation
+
+    #  path = path of the compiled snapshot to write, holding the derived motor geometry, pwm bounds, orientation,
+    #  and mixing matrix so that load_compiled can restore the drivetrain without deriving them again
+    #  Motors with their own pwm scaling functions cannot be saved.
+    def save_compiled(self, path):
+        self.__save_compiled(path, 0, self.orientation, '')
+
+    #  path = path of a snapshot written by save_compiled, whose motors are added to the drivetrain
+    #  source_hash = optional sha256 hex digest of the xml file the snapshot must have been compiled from
+    #  raises a ValueError if the snapshot is from an incompatible version or was compiled from another source
+    def load_compiled(self, path, source_hash=None):
+        self.__add_compiled(*self.__read_compiled(path, source_hash))
+
+    #  returns the (header, names, motors) of the snapshot at path, as written by __save_compiled
+    def __read_compiled(self, path, source_hash):
+        #  np.load leaves a file it opened itself open if it is not a snapshot
+        with open(path, 'rb') as fh, np.load(fh, allow_pickle=False) as snapshot:
+            header = snapshot['header']
+            if header[0] != COMPILED_FORMAT_VERSION:
+                raise ValueError('Attempted to load a compiled drivetrain of format version ' + str(int(header[0]))
+                                 + ' instead of version ' + str(COMPILED_FORMAT_VERSION) + '.')
+            labels = snapshot['labels']
+            if source_hash is not None and labels[0] != source_hash:
+                raise ValueError('Attempted to load a compiled drivetrain which is out of date with its source.')
+            motors = snapshot['motors']
+        return header, labels[1:].tolist(), motors
+
+    #  adds the motors of a snapshot read by __read_compiled and restores its orientation, if it has one
+    def __add_compiled(self, header, names, motors):
+        with self.__bank.lock:
+            was_empty = len(self.__bank) == 0
+            self.__bank.extend(names, motors[:, 0:3], motors[:, 3:6], motors[:, 6] != 0, motors[:, 7:10],
+                               motors[:, 10:13])
+
+            #  a drivetrain made only of the snapshot's motors can reuse its mixing matrix as well
+            if was_empty and len(names) > 0:
+                self.__compile(motors[:, 13:19])
+        if not np.isnan(header[1]):
+            self.orientation = header[1:4]
+
+    #  saves the motors from first_index on; orientation may be None if it should not be restored on load
+    #  Every array member of an npz file costs a separate read, so the snapshot is packed into three of them:
+    #    header = (format version, pitch, roll, yaw), with a NaN orientation if there is none to restore
+    #    labels = the source hash followed by the motor names
+    #    motors = one row per motor of position (3), direction (3), inverted (1), pwm bounds (3),
+    #      angle position (3), and mixing matrix (6) columns
+    def __save_compiled(self, path, first_index, orientation, source_hash):
+        bank = self.__bank
+        with bank.lock:
+            rows = slice(first_index, len(bank))
+            if any(pwm_scaling_func is not None for pwm_scaling_func in bank.pwm_scaling_funcs[rows]):
+                raise ValueError('Attempted to save a compiled drivetrain with motors which have their own pwm '
+                                 'scaling functions.')
+
+            header = np.full(4, np.nan)
+            header[0] = COMPILED_FORMAT_VERSION
+            if orientation is not None:
+                header[1:4] = orientation
+            labels = np.array((source_hash,) + bank.names[rows], dtype=str)
+
+            motor_count = len(bank) - first_index
+            mixing_matrix = self.mixing_matrix[rows] if motor_count > 0 else np.zeros((0, 6))
+            motors = np.hstack((bank.positions[rows], bank.directions[rows],
+                                bank.inverted[rows].reshape(motor_count, 1), bank.pwm_bounds[rows],
+                                bank.angle_positions[rows], mixing_matrix))
+
+        #  the snapshot is written to a temporary file and renamed, so that processes loading it concurrently
+        #  never read a partially written snapshot; tempfile pulls in several other modules, so it is imported on
+        #  first use
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(path))
+        descriptor, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as fh:
+                np.savez(fh, header=header, labels=labels, motors=motors)
+            #  mkstemp creates files readable only by their owner, so the snapshot is given the mode open would have
+            #  created it with, letting other users sharing the directory read it
+            os.chmod(temporary_path, 0o666 & ~_get_umask())
+            os.replace(temporary_path, path)
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+
+    def add_new_motor(self, name, position, direction, inverted=False, pwm_bounds=(0, 512, 1024), pwm_scaling_func=None,
+                      pwm_scaling_vectorized=False):
+        index = self.__bank.append(name, position, direction, inverted, pwm_bounds, pwm_scaling_func,
+                                   pwm_scaling_vectorized)
+        return Motor.from_bank(self.__bank, index)
+
+    #  names = sequence of M unique motor names
+    #  positions and directions = M x 3 arrays
+    #  inverted = boolean value or array of M boolean values
+    #  pwm_bounds = (reverse, stop, forward) pwm values of every motor, or an M x 3 array of them
+    #  Adds every motor at once, which is much faster than calling add_new_motor for each of many motors.
+    def add_new_motors(self, names, positions, directions, inverted=False, pwm_bounds=(0, 512, 1024)):
+        self.__bank.append_many(names, positions, directions, inverted, pwm_bounds)
 
     def get_motor_by_index(self, index):
-        if (self.__motors is None) or not (0 <= index < len(self.__motors)):
+        if not (0 <= index < len(self.__bank)):
             raise IndexError('Attempted to access a motor with an index that is out of bounds.')
-        return self.__motors[index]
+        return Motor.from_bank(self.__bank, index)
 
     def get_motor_by_name(self, name):
-        if not (self.__motors is None):
-            for motor in self.__motors:
-                if motor.name == name:
-                    return motor
+        if name in self.__bank:
+            return Motor.from_bank(self.__bank, self.__bank.index_of(name))
+
+    def index_of(self, name):
+        return self.__bank.index_of(name)
 
     def remove_motor_by_index(self, index):
-        if (self.__motors is None) or not (0 <= index < len(self.__motors)):
-            raise IndexError('Attempted to remove a motor with an index that is out of bounds.')
-        else:
-            self.__motors.pop(index)
+        with self.__bank.lock:
+            if not (0 <= index < len(self.__bank)):
+                raise IndexError('Attempted to remove a motor with an index that is out of bounds.')
+            else:
+                self.__disabled_names = self.__disabled_names.difference((self.__bank.get_name(index),))
+                self.__bank.remove(index)
 
     def remove_motor_by_name(self, name):
-        if not (self.__motors is None):
-            for motor in self.__motors:
-                if motor.name == name:
-                    self.__motors.remove(motor)
+        with self.__bank.lock:
+            if name in self.__bank:
+                self.__disabled_names = self.__disabled_names.difference((name,))
+                self.__bank.remove(self.__bank.index_of(name))
+
+    #  name = name of a motor which should stop receiving commands, e.g. after it has failed
+    #  The motor keeps its index and configuration but always receives a velocity of 0, and commands are
+    #  redistributed over the enabled motors by a rank-one update of the allocation, as in MotorAllocation
+    def disable_motor(self, name):
+        with self.__bank.lock:
+            index = self.__bank.index_of(name)
+            allocation = self.__get_allocation().copy()
+            allocation.disable(index)
+            self.__disabled_names = self.__disabled_names.union((name,))
+            self.__publish_allocation(allocation)
+
+    #  name = name of a disabled motor which should receive commands again
+    def enable_motor(self, name):
+        with self.__bank.lock:
+            index = self.__bank.index_of(name)
+            allocation = self.__get_allocation().copy()
+            allocation.enable(index)
+            self.__disabled_names = self.__disabled_names.difference((name,))
+            self.__publish_allocation(allocation)
+
+    #  resolution = number of samples in the lookup table compiled from each motor's pwm scaling function
+    #    If set to None, pwm scaling functions are called directly for every velocity
+    #  max_error = optional largest allowed difference between a lookup table and its function, as in PwmLookupTable
+    #  Tables for the current motors are compiled immediately, raising a ValueError if max_error is exceeded;
+    #  tables for motors added later are compiled by the next call for motor pwm values
+    def use_pwm_lookup_tables(self, resolution=1025, max_error=None):
+        with self.__bank.lock:
+            self.__pwm_lookup_resolution = resolution
+            self.__pwm_lookup_max_error = max_error
+            self.__pwm_lookup_tables = {}
+            self.__geometry = None
+
+            if resolution is not None and len(self.__bank) > 0:
+                try:
+                    self.__compile()
+                except ValueError:
+                    self.use_pwm_lookup_tables(None)
+                    raise
+
+    #  compiles the motor geometry into an N x 6 matrix which maps the command vector
+    #  (x, y, z translation, x, y, z rotation) onto the motor velocities
+    def __compile_mixing_matrix(self):
+        directions = self.__bank.directions
+        angle_positions = self.__bank.angle_positions
+        sin_angles = np.sin(angle_positions)
+        cos_angles = np.cos(angle_positions)
+
+        #  projection of each motor direction onto the x, y, and z counter-clockwise rotation vectors
+        rotation_columns = np.column_stack((
+            -directions[:, 1] * sin_angles[:, 0] + directions[:, 2] * cos_angles[:, 0],
+            -directions[:, 0] * sin_angles[:, 1] + directions[:, 2] * cos_angles[:, 1],
+            -directions[:, 0] * sin_angles[:, 2] + directions[:, 1] * cos_angles[:, 2]))
+
+        #  undefined angle positions contribute no rotational velocity
+        rotation_columns[np.isnan(rotation_columns)] = 0.0
+
+        return np.hstack((directions, rotation_columns))
+
+    #  returns the geometry of the current motors, compiling and publishing a new one whenever the motors have
+    #  changed since the last call; only compiling takes the motor bank's lock
+    #  mixing_matrix = optional mixing matrix of the current motors, e.g. from a compiled snapshot
+    def __compile(self, mixing_matrix=None):
+        geometry = self.__geometry
+        if geometry is not None and geometry.version == self.__bank.version:
+            return geometry
+
+        with self.__bank.lock:
+            if len(self.__bank) == 0:
+                raise RuntimeError("Attempted to get motor velocities for a drivetrain with an empty motor list.")
+
+            geometry = self.__geometry
+            if geometry is None or geometry.version != self.__bank.version:
+                if mixing_matrix is None:
+                    mixing_matrix = self.__compile_mixing_matrix()
+                mixing_matrix = np.array(mixing_matrix, dtype=float)
+                mixing_matrix.flags.writeable = False
+
+                allocation = None
+                self.__disabled_names = self.__disabled_names.intersection(self.__bank.names)
+                if self.__disabled_names:
+                    allocation = self.__compile_allocation(mixing_matrix)
+
+                geometry = _CompiledGeometry(self.__bank.version, self.__bank.names, mixing_matrix,
+                                             mixing_matrix if allocation is None else allocation.allocation_matrix,
+                                             allocation, self.__compile_pwm_scaling())
+                self.__geometry = geometry
+            return geometry
+
+    #  returns the scratch buffers of the calling thread for the current geometry
+    def __get_scratch(self):
+        geometry = self.__geometry
+        if geometry is None or geometry.version != self.__bank.version:
+            geometry = self.__compile()
+
+        scratch = self.__thread_scratch.buffers
+        if scratch is None or scratch.geometry is not geometry:
+            scratch = self.__thread_scratch.buffers = _ScratchBuffers(geometry)
+        return scratch
+
+    def __compile_allocation(self, mixing_matrix):
+        enabled = [name not in self.__disabled_names for name in self.__bank.names]
+        return _get_motor_allocation().MotorAllocation(mixing_matrix, enabled)
+
+    def __get_allocation(self):
+        geometry = self.__compile()
+        if geometry.allocation is None:
+            with self.__bank.lock:
+                geometry = self.__compile()
+                if geometry.allocation is None:
+                    geometry.allocation = self.__compile_allocation(geometry.mixing_matrix)
+        return geometry.allocation
+
+    #  publishes a copy of the current geometry which distributes commands with allocation
+    def __publish_allocation(self, allocation):
+        geometry = self.__geometry
+        self.__geometry = _CompiledGeometry(geometry.version, geometry.names, geometry.mixing_matrix,
+                                            allocation.allocation_matrix, allocation, geometry.pwm_scaling)
+
+    #  6 x N least-squares pseudo-inverse of the enabled motors' mixing matrix, mapping motor velocities back
+    #  onto the command vector
+    def __get_pseudo_inverse(self):
+        return self.__get_allocation().pseudo_inverse
+
+    #  compiles the motor pwm bounds into per-motor stop values and forward and reverse spans, along with
+    #  the (index, function, vectorized) triples of any motors which define their own pwm scaling function,
+    #  or, when lookup tables are enabled, the indices and stacked table values of those motors
+    def __compile_pwm_scaling(self):
+        pwm_bounds = self.__bank.pwm_bounds
+        stops = pwm_bounds[:, 1].copy()
+        forward_spans = np.abs(pwm_bounds[:, 2] - pwm_bounds[:, 1])
+        reverse_spans = np.abs(pwm_bounds[:, 1] - pwm_bounds[:, 0])
+
+        pwm_scaling_funcs = self.__bank.pwm_scaling_funcs
+        pwm_scaling_vectorized = self.__bank.pwm_scaling_vectorized
+        custom_scalers = [(i, pwm_scaling_funcs[i], pwm_scaling_vectorized[i])
+                          for i in range(0, len(pwm_scaling_funcs)) if pwm_scaling_funcs[i] is not None]
+
+        lookup = None
+        if self.__pwm_lookup_resolution is not None and custom_scalers:
+            pwm_lookup = _get_pwm_lookup()
+            tables = []
+            for index, pwm_scaling_func, vectorized in custom_scalers:
+                if pwm_scaling_func not in self.__pwm_lookup_tables:
+                    self.__pwm_lookup_tables[pwm_scaling_func] = pwm_lookup.PwmLookupTable(
+                        pwm_scaling_func, self.__pwm_lookup_resolution, vectorized, self.__pwm_lookup_max_error)
+                tables.append(self.__pwm_lookup_tables[pwm_scaling_func])
+
+            lookup = (np.array([index for index, pwm_scaling_func, vectorized in custom_scalers], dtype=int),
+                      pwm_lookup.stack_lookup_tables(tables))
+            custom_scalers = []
+
+        return stops, forward_spans, reverse_spans, custom_scalers, lookup
+
+    #  pwm_scaling = pwm scaling of the geometry the motor velocities were computed from
+    #  motor_vels = array of motor velocities whose last axis is ordered by motor addition
+    #  motor_pwms = integer array of the same shape to which the pwm values are written
+    #  spans, scaled_vels, and positive are float, float, and boolean scratch arrays of the same shape
+    def __scale_vels_to_pwm(self, pwm_scaling, motor_vels, motor_pwms, spans, scaled_vels, positive):
+        stops, forward_spans, reverse_spans, custom_scalers, lookup = pwm_scaling
+
+        #  symmetric bounds have equal spans, so only the sign of the velocity selects the span
+        np.greater(motor_vels, 0.0, out=positive)
+        np.copyto(spans, reverse_spans)
+        np.copyto(spans, forward_spans, where=positive)
+        np.multiply(motor_vels, spans, out=scaled_vels)
+        np.add(scaled_vels, stops, out=scaled_vels)
+
+        #  casting truncates toward zero, as int() does
+        np.copyto(motor_pwms, scaled_vels, casting='unsafe')
+
+        for index, pwm_scaling_func, vectorized in custom_scalers:
+            motor_column = motor_vels[..., index]
+            if vectorized:
+                motor_pwms[..., index] = pwm_scaling_func(motor_column)
+            else:
+                motor_pwms[..., index] = np.reshape([pwm_scaling_func(velocity) for velocity in motor_column.ravel()],
+                                                    motor_column.shape)
+
+        #  interpolated values are rounded rather than truncated, so that they stay within max_error of the
+        #  integer pwm values of a function
+        if lookup is not None:
+            lookup_indices, lookup_values = lookup
+            motor_pwms[..., lookup_indices] = np.rint(_get_pwm_lookup().evaluate_lookup_tables(
+                lookup_values, motor_vels[..., lookup_indices]))
+
+        return motor_pwms
+
+    #  profiled counterparts of __compute_motor_vels and __scale_vels_to_pwm, which enable_profiling installs on
+    #  the instance in their place so that the unprofiled methods carry no profiling checks
+    def __compute_motor_vels_profiled(self, scratch, translation, rotation, force_local_oriented, motor_vels):
+        timer = time.perf_counter
+        profile = self.__profile
+
+        #  field-oriented commands go through the same incremental computation as unprofiled calls
+        start = timer()
+        if force_local_oriented:
+            terms = scratch.motor_matrix
+            coefficients = scratch.command
+            coefficients[0] = translation[0]
+            coefficients[1] = translation[1]
+            coefficients[2] = translation[2]
+            coefficients[3] = rotation[0]
+            coefficients[4] = rotation[1]
+            coefficients[5] = rotation[2]
+        else:
+            terms, coefficients = self.__orient_command(scratch, translation, rotation)
+        orientation_end = timer()
+
+        np.dot(terms, coefficients, out=motor_vels)
+        mixing_end = timer()
+
+        max_mag = np.abs(motor_vels, out=scratch.magnitudes).max()
+        if max_mag > 1.0:
+            np.divide(motor_vels, max_mag, out=motor_vels)
+        end = timer()
+
+        for stage, stage_time in (('orientation', orientation_end - start), ('mixing', mixing_end - orientation_end),
+                                  ('normalization', end - mixing_end)):
+            entry = profile[stage]
+            entry[0] += 1
+            entry[1] += stage_time
+
+        return motor_vels
+
+    def __scale_vels_to_pwm_profiled(self, pwm_scaling, motor_vels, motor_pwms, spans, scaled_vels, positive):
+        start = time.perf_counter()
+        SimpleDrivetrain.__scale_vels_to_pwm(self, pwm_scaling, motor_vels, motor_pwms, spans, scaled_vels, positive)
+        entry = self.__profile['pwm_scaling']
+        entry[0] += 1
+        entry[1] += time.perf_counter() - start
+        return motor_pwms
+
+    #  records the calls to and cumulative time of each of PROFILING_STAGES until disable_profiling is called
+    #  The orientation, mixing, and normalization stages are timed for single-command calls, and the pwm scaling
+    #  stage for every call which computes pwm values
+    def enable_profiling(self):
+        self.__compute_motor_vels = self.__compute_motor_vels_profiled
+        self.__scale_vels_to_pwm = self.__scale_vels_to_pwm_profiled
+
+    def disable_profiling(self):
+        self.__dict__.pop('_SimpleDrivetrain__compute_motor_vels', None)
+        self.__dict__.pop('_SimpleDrivetrain__scale_vels_to_pwm', None)
+
+    #  returns a dictionary mapping each stage to its number of calls, total time, and mean time in seconds
+    def get_profiling_snapshot(self):
+        snapshot = {}
+        for stage in PROFILING_STAGES:
+            calls, total_time = self.__profile[stage]
+            snapshot[stage] = {'calls': calls,
+                               'total_time': total_time,
+                               'mean_time': total_time / calls if calls > 0 else 0.0}
+        return snapshot
+
+    def reset_profiling(self):
+        for stage in PROFILING_STAGES:
+            self.__profile[stage] = [0, 0.0]
+
+    def __check_out(self, out, shape, label):
+        if out.shape != shape:
+            raise ValueError('The out array for ' + label + ' must be of shape ' + str(shape) + '. An array of shape '
+                             + str(out.shape) + ' was passed instead.')
+
+    #  rotation from the reference orientation to the current drivetrain orientation, computed once per
+    #  assigned orientation
+    def __get_orientation_matrix(self):
+        if self.__orientation_matrix is None:
+            orientation = self.__orientation
+            if orientation is not None:
+                self.__orientation_matrix = vutils.rotation_matrix(orientation[0] - _REFERENCE_PITCH,
+                                                                   orientation[1] - _REFERENCE_ROLL,
+                                                                   orientation[2] - _REFERENCE_YAW)
+            else:
+                self.__orientation_matrix = np.dot(REFERENCE_MATRIX_INVERSE,
+                                                   vutils.quaternion_to_matrix(self.__orientation_quaternion))
+        return self.__orientation_matrix
 
     #  translation = (x-axis translational velocity, y-axis translational velocity, z-axis translational velocity)
     #  rotation = (x-axis angular velocity, y-axis angular velocity, z-axis angular velocity)
     #  force_local_oriented is a boolean value
     #    If set to True, ignores current drivetrain orientation and calculates local-oriented motor values
     #    If set to False, uses current drivetrain orientation to calculate field-oriented motor values
-    def get_motor_vels(self, translation, rotation, force_local_oriented=False):
-        if self.__motors is None:
-            raise RuntimeError("Attempted to get motor velocities for a drivetrain with an empty motor list.")
+    #  out = optional float array of shape (N,) to which the motor velocities are written
+    def get_motor_vels(self, translation, rotation, force_local_oriented=False, out=None):
+        scratch = self.__get_scratch()
 
-        global_vector = translation
-        motor_vels = [x * 0.0 for x in range(0, len(self.__motors))]
-        orientation_reference_vector = np.array((0.0, 0.0, np.pi / 2.0))
-        orientation_difference_vector = self.orientation - orientation_reference_vector
+        if out is None:
+            out = scratch.motor_vels if self.__reuse_buffers else np.empty(len(scratch.motor_vels))
+        else:
+            self.__check_out(out, scratch.motor_vels.shape, 'motor velocities')
 
-        for i in range(0, len(self.__motors)):
-            motor_angle_pos = self.__motors[i].angle_position
-            motor_dir_local = self.__motors[i].direction
-            motor_dir_globalized = motor_dir_local
+        return self.__compute_motor_vels(scratch, translation, rotation, force_local_oriented, out)
 
-            if not force_local_oriented:
-                motor_dir_globalized = vutils.rotate_vector(motor_dir_local, orientation_difference_vector[0],
-                                                            orientation_difference_vector[1],
-                                                            orientation_difference_vector[2])
+    #  writes the motor velocities into motor_vels using only the preallocated scratch buffers
+    def __compute_motor_vels(self, scratch, translation, rotation, force_local_oriented, motor_vels):
+        if force_local_oriented:
+            command = scratch.command
+            command[0] = translation[0]
+            command[1] = translation[1]
+            command[2] = translation[2]
+            command[3] = rotation[0]
+            command[4] = rotation[1]
+            command[5] = rotation[2]
+            np.dot(scratch.motor_matrix, command, out=motor_vels)
+        else:
+            self.__compute_field_oriented_vels(scratch, translation, rotation, motor_vels)
 
-            motor_vels[i] = (np.dot(motor_dir_globalized, global_vector))
+        #  scale each motor velocity by the maximum velocity
+        max_mag = np.abs(motor_vels, out=scratch.magnitudes).max()
+        if max_mag > 1.0:
+            np.divide(motor_vels, max_mag, out=motor_vels)
 
-            #  apply any applicable rotational velocity
-            yz_angle = motor_angle_pos[0]
-            xz_angle = motor_angle_pos[1]
-            xy_angle = motor_angle_pos[2]
+        return motor_vels
 
-            if yz_angle is not None:
-                rot_vec_ccw_x = np.array([0, -np.sin(yz_angle), np.cos(yz_angle)])
-                motor_vels[i] += rotation[0] * np.dot(motor_dir_local, rot_vec_ccw_x)
+    #  writes the unscaled field-oriented motor velocities into motor_vels
+    def __compute_field_oriented_vels(self, scratch, translation, rotation, motor_vels):
+        terms, coefficients = self.__orient_command(scratch, translation, rotation)
+        return np.dot(terms, coefficients, out=motor_vels)
 
-            if xz_angle is not None:
-                rot_vec_ccw_y = np.array([-np.sin(xz_angle), 0, np.cos(xz_angle)])
-                motor_vels[i] += rotation[1] * np.dot(motor_dir_local, rot_vec_ccw_y)
+    #  The unscaled field-oriented motor velocities are M_t R^T t + M_r r, where M_t and M_r are the translational
+    #  and rotational columns of the motor matrix, R is the orientation matrix, t is the translation, and r is
+    #  the rotation. Returns a (terms, coefficients) pair whose product is those velocities. Orientations usually
+    #  change far more often than commands, so only the terms whose inputs changed since the last call are
+    #  recomputed:
+    #    M_r r does not depend on the orientation and is cached until the rotation changes
+    #    If the drivetrain only yaws by psi from the reference orientation, R^T t is
+    #    (c t_x + s t_y, c t_y - s t_x, t_z) with c = cos(psi) and s = sin(psi), so the motor velocities are
+    #    c A + s B + C for A = M_x t_x + M_y t_y, B = M_x t_y - M_y t_x, and C = M_z t_z + M_r r, which are
+    #    cached until the command changes; a new yaw then costs two scalar trigonometric functions and a
+    #    single N x 3 product
+    def __orient_command(self, scratch, translation, rotation):
+        motor_matrix = scratch.motor_matrix
+        orientation = self.__orientation
+        if orientation is not None and orientation[0] == _REFERENCE_PITCH and orientation[1] == _REFERENCE_ROLL:
+            key = (translation[0], translation[1], translation[2], rotation[0], rotation[1], rotation[2])
+            if key != scratch.yaw_key:
+                scratch.yaw_key = key
+                basis = scratch.yaw_basis
+                basis[0, 0] = key[0]
+                basis[1, 0] = key[1]
+                basis[0, 1] = key[1]
+                basis[1, 1] = -key[0]
+                basis[2:, 2] = key[2:]
+                np.dot(motor_matrix, basis, out=scratch.yaw_terms)
 
-            if xy_angle is not None:
-                rot_vec_ccw_z = np.array([-np.sin(xy_angle), np.cos(xy_angle), 0])
-                motor_vels[i] += rotation[2] * np.dot(motor_dir_local, rot_vec_ccw_z)
+            yaw = orientation[2] - _REFERENCE_YAW
+            coefficients = scratch.yaw_coefficients
+            coefficients[0] = math.cos(yaw)
+            coefficients[1] = math.sin(yaw)
+            return scratch.yaw_terms, coefficients
 
-        #  scale each motor velocity by the maximum velocity
-        mag_list = np.array(map(abs, motor_vels))
-        max_mag = mag_list.max()
-        if max_mag > 1.0:
-            motor_vels = map(lambda x: x / max_mag, motor_vels)
+        scratch.translation[0] = translation[0]
+        scratch.translation[1] = translation[1]
+        scratch.translation[2] = translation[2]
 
-        return motor_vels
+        #  projecting the translation onto the rotated motor directions is equivalent to
+        #  projecting the inversely rotated translation onto the local motor directions
+        key = (rotation[0], rotation[1], rotation[2])
+        if key == scratch.rotation_key:
+            command = scratch.oriented_command
+            np.dot(scratch.translation, self.__get_orientation_matrix(), out=command[:3])
+            return scratch.oriented_terms, command
+
+        #  a new rotation is mixed directly, which costs less than caching its term for a single call; the term
+        #  is cached on the next call, once the rotation is known to repeat
+        if key == scratch.pending_rotation_key:
+            scratch.rotation_key = key
+            np.dot(motor_matrix[:, 3:], key, out=scratch.oriented_terms[:, 3])
+            return self.__orient_command(scratch, translation, rotation)
+        scratch.pending_rotation_key = key
+
+        command = scratch.command
+        np.dot(scratch.translation, self.__get_orientation_matrix(), out=scratch.command_translation)
+        command[3] = key[0]
+        command[4] = key[1]
+        command[5] = key[2]
+        return motor_matrix, command
 
     #  translation = (x-axis translational velocity, y-axis translational velocity, z-axis translational velocity)
     #  rotation = (x-axis angular velocity, y-axis angular velocity, z-axis angular velocity)
     #  force_local_oriented is a boolean value
     #    If set to True, ignores current drivetrain orientation and calculates local-oriented motor values
     #    If set to False, uses current drivetrain orientation to calculate field-oriented motor values
-    def get_motor_vels_scaled(self, translation, rotation, force_local_oriented=False):
-        motor_vels = self.get_motor_vels(translation, rotation, force_local_oriented)
+    #  out = optional integer array of shape (N,) to which the motor pwm values are written
+    def get_motor_vels_scaled(self, translation, rotation, force_local_oriented=False, out=None):
+        scratch = self.__get_scratch()
+
+        if out is None:
+            out = scratch.motor_pwms if self.__reuse_buffers else np.empty(len(scratch.motor_pwms), dtype=int)
+        else:
+            self.__check_out(out, scratch.motor_pwms.shape, 'motor pwm values')
+
+        return self.__compute_motor_pwms(scratch, translation, rotation, force_local_oriented, out)
 
-        for i in range(0, len(self.__motors)):
-            motor_vels[i] = self.__motors[i].scale_velocity_to_pwm(motor_vels[i])
+    #  accepts the same parameters as get_motor_vels_scaled, apart from out
+    #  returns the motor pwm values in a buffer of the calling thread which its next call overwrites; unlike an
+    #  out array sized beforehand, the buffer always fits the motors the values were computed for, even when
+    #  another thread adds or removes motors, so control loops use it to keep running through motor changes
+    def _get_motor_vels_scaled_reused(self, translation, rotation, force_local_oriented=False):
+        scratch = self.__get_scratch()
+        return self.__compute_motor_pwms(scratch, translation, rotation, force_local_oriented, scratch.motor_pwms)
+
+    def __compute_motor_pwms(self, scratch, translation, rotation, force_local_oriented, out):
+        motor_vels = self.__compute_motor_vels(scratch, translation, rotation, force_local_oriented,
+                                               scratch.motor_vels)
+        motor_pwms = self.__scale_vels_to_pwm(scratch.pwm_scaling, motor_vels, out, scratch.spans,
+                                              scratch.scaled_vels, scratch.positive)
+        recording = self.__recording
+        if recording is not None:
+            if recording[1] == scratch.geometry.names:
+                recording[0].record(translation, rotation, self.orientation, motor_vels, motor_pwms)
+            else:
+                self.__detach_recorder(recording, scratch.geometry.names)
+        return motor_pwms
+
+    #  the motors were added, removed, renamed, or reordered since the recorder was attached, so its columns no
+    #  longer hold the same motors; the recorder is detached rather than failing the call which computed them
+    def __detach_recorder(self, recording, names):
+        if self.__recording is recording:
+            self.__recording = None
+        warnings.warn('Detached a flight recorder of motors ' + str(list(recording[1])) + ' from a drivetrain '
+                      + 'whose motors are now ' + str(list(names)) + '.', RuntimeWarning, stacklevel=4)
+
+    #  accepts the same parameters as get_motor_vels
+    #  returns a dictionary mapping each motor name to its motor velocity
+    def get_motor_vels_dict(self, translation, rotation, force_local_oriented=False):
+        #  the names are those of the geometry the values were computed from, whatever other threads change
+        scratch = self.__get_scratch()
+        motor_vels = self.__compute_motor_vels(scratch, translation, rotation, force_local_oriented,
+                                               scratch.motor_vels)
+        return dict(zip(scratch.geometry.names, motor_vels))
+
+    #  accepts the same parameters as get_motor_vels
+    #  returns a dictionary mapping each motor name to its motor pwm value
+    def get_motor_vels_scaled_dict(self, translation, rotation, force_local_oriented=False):
+        scratch = self.__get_scratch()
+        motor_pwms = self.__compute_motor_pwms(scratch, translation, rotation, force_local_oriented,
+                                               scratch.motor_pwms)
+        return dict(zip(scratch.geometry.names, motor_pwms))
+
+    #  translations = K x 3 array of translational velocities, one command per row
+    #  rotations = K x 3 array of angular velocities, one command per row
+    #  orientations = optional K x 3 array of (pitch, roll, yaw) drivetrain orientations, one per row
+    #    If set to None, the current drivetrain orientation is used for every row
+    #  force_local_oriented is a boolean value
+    #    If set to True, ignores drivetrain orientations and calculates local-oriented motor values
+    #    If set to False, uses drivetrain orientations to calculate field-oriented motor values
+    #  out = optional float array of shape (K, N) to which the motor velocities are written
+    #  returns a K x N array of motor velocities, each row scaled independently into [-1, 1]
+    def get_motor_vels_batch(self, translations, rotations, orientations=None, force_local_oriented=False,
+                             out=None):
+        return self.__mix_batch(self.__compile(), translations, rotations, orientations, force_local_oriented, out)
+
+    def __mix_batch(self, geometry, translations, rotations, orientations, force_local_oriented, out):
+        motor_matrix = geometry.motor_matrix
+
+        translations = self.__as_command_array(translations, 'translations')
+        rotations = self.__as_command_array(rotations, 'rotations')
+        if len(translations) != len(rotations):
+            raise ValueError('Translations and rotations must contain the same number of commands. '
+                             + str(len(translations)) + ' translations and ' + str(len(rotations))
+                             + ' rotations were passed instead.')
+
+        local_translations = translations
+        if not force_local_oriented:
+            if orientations is None:
+                local_translations = np.dot(translations, self.__get_orientation_matrix())
+            else:
+                orientation_matrices = self.__get_orientation_matrices(orientations, len(translations))
+                local_translations = np.einsum('ki,kij->kj', translations, orientation_matrices)
+
+        if out is not None:
+            self.__check_out(out, (len(translations), len(motor_matrix)), 'batched motor velocities')
+
+        commands = np.hstack((local_translations, rotations))
+        motor_vels = np.dot(commands, motor_matrix.T, out=out)
+
+        #  scale each row of motor velocities by its maximum velocity
+        max_mags = np.abs(motor_vels).max(axis=1)
+        motor_vels /= np.maximum(max_mags, 1.0)[:, np.newaxis]
 
         return motor_vels
 
+    #  accepts the same parameters as get_motor_vels_batch
+    #  out = optional integer array of shape (K, N) to which the motor pwm values are written
+    #  returns a K x N array of motor pwm values
+    def get_motor_vels_scaled_batch(self, translations, rotations, orientations=None, force_local_oriented=False,
+                                    out=None):
+        return self.__scale_batch(self.__compile(), translations, rotations, orientations, force_local_oriented, out)
+
+    def __scale_batch(self, geometry, translations, rotations, orientations, force_local_oriented, out):
+        motor_vels = self.__mix_batch(geometry, translations, rotations, orientations, force_local_oriented, None)
+
+        if out is None:
+            out = np.empty(motor_vels.shape, dtype=int)
+        else:
+            self.__check_out(out, motor_vels.shape, 'batched motor pwm values')
+
+        return self.__scale_vels_to_pwm(geometry.pwm_scaling, motor_vels, out,
+                                        np.empty(motor_vels.shape), np.empty(motor_vels.shape),
+                                        np.empty(motor_vels.shape, dtype=bool))
+
+    #  motor_vels = array of N motor velocities ordered by motor addition, e.g. measured by encoders
+    #  force_local_oriented is a boolean value
+    #    If set to True, returns the translation in the drivetrain's local frame
+    #    If set to False, uses current drivetrain orientation to return the translation in the field frame
+    #  returns a (translation, rotation) tuple of numpy arrays, the least-squares twist whose unscaled motor
+    #  velocities best match motor_vels
+    def estimate_twist(self, motor_vels, force_local_oriented=False):
+        pseudo_inverse = self.__get_pseudo_inverse()
+
+        motor_vels = np.asarray(motor_vels, dtype=float)
+        if motor_vels.shape != (pseudo_inverse.shape[1],):
+            raise ValueError('Motor velocities must be of length ' + str(pseudo_inverse.shape[1])
+                             + '. An array of shape ' + str(motor_vels.shape) + ' was passed instead.')
+
+        twist = np.dot(pseudo_inverse, motor_vels)
+        translation = twist[:3]
+        if not force_local_oriented:
+            translation = np.dot(self.__get_orientation_matrix(), translation)
+
+        return translation, twist[3:]
+
+    #  motor_vels = K x N array of motor velocities, one sample per row
+    #  orientations = optional K x 3 array of (pitch, roll, yaw) drivetrain orientations, one per row
+    #    If set to None, the current drivetrain orientation is used for every row
+    #  force_local_oriented is a boolean value, as in estimate_twist
+    #  returns a (translations, rotations) tuple of K x 3 arrays
+    def estimate_twist_batch(self, motor_vels, orientations=None, force_local_oriented=False):
+        pseudo_inverse = self.__get_pseudo_inverse()
+
+        motor_vels = np.asarray(motor_vels, dtype=float)
+        if motor_vels.ndim != 2 or motor_vels.shape[1] != pseudo_inverse.shape[1]:
+            raise ValueError('Batched motor velocities must be of shape (K, ' + str(pseudo_inverse.shape[1])
+                             + '). An array of shape ' + str(motor_vels.shape) + ' was passed instead.')
+
+        twists = np.dot(motor_vels, pseudo_inverse.T)
+        translations = twists[:, :3]
+        if not force_local_oriented:
+            if orientations is None:
+                translations = np.dot(translations, self.__get_orientation_matrix().T)
+            else:
+                orientation_matrices = self.__get_orientation_matrices(orientations, len(motor_vels))
+                translations = np.einsum('kij,kj->ki', orientation_matrices, translations)
+
+        return translations, twists[:, 3:]
+
+    #  commands = iterable or async iterable of (translation, rotation, orientation) tuples
+    #    orientation may be omitted or None to use the current drivetrain orientation
+    #  batch_size = maximum number of commands which are gathered and evaluated together
+    #    Commands are only evaluated once a full batch has been gathered or the commands are exhausted,
+    #    so live command sources should use a small batch size
+    #  force_local_oriented is a boolean value, as in get_motor_vels
+    #  yields one integer array of motor pwm values per command. The yielded arrays are rows of a single
+    #  reused buffer and are overwritten once the next batch is evaluated, so copy any frame that must be kept.
+    #  An async iterable of commands returns an async generator instead.
+    def stream(self, commands, batch_size=64, force_local_oriented=False):
+        if batch_size < 1:
+            raise ValueError('Stream batch sizes must be at least 1. A batch size of ' + str(batch_size)
+                             + ' was passed instead.')
+
+        if hasattr(commands, '__aiter__'):
+            return self.__stream_async(commands, batch_size, force_local_oriented)
+        return self.__stream(commands, batch_size, force_local_oriented)
+
+    def __stream(self, commands, batch_size, force_local_oriented):
+        buffers = _StreamBuffers(batch_size)
+
+        for command in commands:
+            buffers.append(command, self)
+            if buffers.count == batch_size:
+                for frame in self.__evaluate_stream_batch(buffers, force_local_oriented):
+                    yield frame
+
+        for frame in self.__evaluate_stream_batch(buffers, force_local_oriented):
+            yield frame
+
+    async def __stream_async(self, commands, batch_size, force_local_oriented):
+        buffers = _StreamBuffers(batch_size)
+
+        async for command in commands:
+            buffers.append(command, self)
+            if buffers.count == batch_size:
+                for frame in self.__evaluate_stream_batch(buffers, force_local_oriented):
+                    yield frame
+
+        for frame in self.__evaluate_stream_batch(buffers, force_local_oriented):
+            yield frame
+
+    #  evaluates the gathered commands and returns their rows of the reused pwm buffer
+    def __evaluate_stream_batch(self, buffers, force_local_oriented):
+        count = buffers.count
+        if count == 0:
+            return ()
+        buffers.count = 0
+
+        geometry = self.__compile()
+        motor_count = len(geometry.motor_matrix)
+        if buffers.motor_pwms is None or buffers.motor_pwms.shape[1] != motor_count:
+            buffers.motor_pwms = np.empty((len(buffers.translations), motor_count), dtype=int)
+
+        orientations = buffers.orientations[:count] if buffers.has_orientations else None
+        buffers.has_orientations = False
+
+        return self.__scale_batch(geometry, buffers.translations[:count], buffers.rotations[:count], orientations,
+                                  force_local_oriented, buffers.motor_pwms[:count])
+
+    #  returns the K x 3 x 3 rotations from the reference orientation to each of count orientations
+    def __get_orientation_matrices(self, orientations, count):
+        orientations = self.__as_command_array(orientations, 'orientations')
+        if len(orientations) != count:
+            raise ValueError('Orientations must contain one orientation per command. '
+                             + str(len(orientations)) + ' orientations were passed for '
+                             + str(count) + ' commands instead.')
+
+        orientation_differences = orientations - ORIENTATION_REFERENCE
+        return vutils.rotation_matrices(orientation_differences[:, 0], orientation_differences[:, 1],
+                                        orientation_differences[:, 2])
+
+    @staticmethod
+    def __as_command_array(commands, label):
+        commands = np.asarray(commands, dtype=float)
+        if commands.ndim != 2 or commands.shape[1] != 3:
+            raise ValueError('Batched ' + label + ' must be of shape (K, 3). An array of shape '
+                             + str(commands.shape) + ' was passed instead.')
+        return commands
+
+    #  orientation = (pitch, roll, yaw)
+    @property
+    def orientation(self):
+        if self.__orientation is None:
+            self.__orientation = vutils.matrix_to_euler(vutils.quaternion_to_matrix(self.__orientation_quaternion))
+        return self.__orientation
+
+    @orientation.setter
+    def orientation(self, value):
+        if len(value) != 3:
+            raise ValueError('Drivetrain orientations must be of length 3. An orientation of length ' + str(len(value))
+                             + ' was passed instead.')
+
+        orientation = (float(value[0]), float(value[1]), float(value[2]))
+        if orientation != self.__orientation:
+            self.__orientation = orientation
+            self.__orientation_quaternion = None
+            self.__orientation_matrix = None
+
+    #  orientation_quaternion = (w, x, y, z), e.g. read directly from an IMU
+    @property
+    def orientation_quaternion(self):
+        if self.__orientation_quaternion is None:
+            self.__orientation_quaternion = vutils.euler_to_quaternion(self.__orientation[0], self.__orientation[1],
+                                                                       self.__orientation[2])
+        return self.__orientation_quaternion
+
+    @orientation_quaternion.setter
+    def orientation_quaternion(self, value):
+        if len(value) != 4:
+            raise ValueError('Drivetrain orientation quaternions must be of length 4. A quaternion of length '
+                             + str(len(value)) + ' was passed instead.')
+
+        quaternion = (float(value[0]), float(value[1]), float(value[2]), float(value[3]))
+        if quaternion != self.__orientation_quaternion:
+            self.__orientation_quaternion = quaternion
+            self.__orientation = None
+            self.__orientation_matrix = None
+
+    #  reuse_buffers is a boolean value
+    #    If set to True, get_motor_vels and get_motor_vels_scaled return internal buffers which are overwritten
+    #    by the next call instead of allocating a new array for every call
+    #    If set to False, every call without an out array returns a newly allocated array
+    @property
+    def reuse_buffers(self):
+        return self.__reuse_buffers
+
+    @reuse_buffers.setter
+    def reuse_buffers(self, value):
+        self.__reuse_buffers = bool(value)
+
+    #  recorder = optional flight_recorder.FlightRecorder with one motor per motor of the drivetrain
+    #    If set, every call to get_motor_vels_scaled records its command, the drivetrain orientation, and the
+    #    resulting motor velocities and pwm values; set to None to stop recording
+    #    Adding, removing, renaming, or reordering motors detaches the recorder, with a RuntimeWarning, on the
+    #    next call to get_motor_vels_scaled
+    @property
+    def recorder(self):
+        recording = self.__recording
+        return recording[0] if recording is not None else None
+
+    @recorder.setter
+    def recorder(self, value):
+        if value is None:
+            self.__recording = None
+            return
+
+        names = self.__bank.names
+        if value.motor_count != len(names):
+            raise ValueError('Attempted to attach a flight recorder of ' + str(value.motor_count) + ' motors to a '
+                             + 'drivetrain of ' + str(len(names)) + ' motors.')
+        self.__recording = (value, names)
+
+    @property
+    def pwm_lookup_resolution(self):
+        return self.__pwm_lookup_resolution
+
+    @property
+    def profiling_enabled(self):
+        return '_SimpleDrivetrain__compute_motor_vels' in self.__dict__
+
     @property
     def motors(self):
-        return self.__motors
+        if len(self.__bank) == 0:
+            return None
+        return [Motor.from_bank(self.__bank, i) for i in range(0, len(self.__bank))]
+
+    @property
+    def motor_bank(self):
+        return self.__bank
 
     @motors.setter
     def motors(self, value):
         pass
 
+    @property
+    def mixing_matrix(self):
+        return self.__compile().mixing_matrix
+
+    # manual setting of the mixing matrix is discouraged
+    @mixing_matrix.setter
+    def mixing_matrix(self, value):
+        pass
+
+    #  mixing matrix with commands redistributed over the enabled motors, equal to mixing_matrix while every
+    #  motor is enabled
+    @property
+    def allocation_matrix(self):
+        return self.__compile().motor_matrix
+
+    #  names of the disabled motors by order of motor addition
+    @property
+    def disabled_motors(self):
+        return tuple(name for name in self.__bank.names if name in self.__disabled_names)
+
     def __str__(self):
         outstr = self.__repr__() + '\n'
 
-        for motor in self.__motors:
+        for motor in (self.motors or []):
             outstr += '\tMotor ' + motor.name + ':\n'
             outstr += '\t\tInverted: ' + str(motor.inverted) + '\n'
             outstr += '\t\tPosition: ' + str(motor.position) + '\n'
             outstr += '\t\tDirection: ' + str(motor.direction) + '\n'
             outstr += '\t\tPWM Bounds: ' + str(motor.pwm_bounds) + '\n'
-            if motor._Motor__pwm_scaling_func is not None:
+            if motor.pwm_scaling_func is not None:
                 outstr += '\t\tPWM Scaling Function: Defined\n'
             else:
                 outstr += '\t\tPWM Scaling Function: Undefined\n'
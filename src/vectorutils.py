@@ -1,58 +1,122 @@
+import math
 import numpy as np
 
+#  components within this distance of 0 are treated as 0 by calculate_angle_direction(s)
+ANGLE_DEAD_ZONE = 0.05
+
+
+def rotation_matrix(pitch, roll, yaw):
+    sin_p, cos_p = math.sin(pitch), math.cos(pitch)
+    sin_r, cos_r = math.sin(roll), math.cos(roll)
+    sin_y, cos_y = math.sin(yaw), math.cos(yaw)
+
+    #  pitch is applied first, then roll, then yaw: Rz(yaw) Ry(roll) Rx(pitch) multiplied out, since building
+    #  and multiplying the three matrices costs several times more for a single rotation
+    return np.array(((cos_y * cos_r, cos_y * sin_r * sin_p - sin_y * cos_p, cos_y * sin_r * cos_p + sin_y * sin_p),
+                     (sin_y * cos_r, sin_y * sin_r * sin_p + cos_y * cos_p, sin_y * sin_r * cos_p - cos_y * sin_p),
+                     (-sin_r, cos_r * sin_p, cos_r * cos_p)))
+
+
+#  pitches, rolls, and yaws are equal-length arrays; returns a K x 3 x 3 stack of rotation matrices
+def rotation_matrices(pitches, rolls, yaws):
+    sin_p, cos_p = np.sin(pitches), np.cos(pitches)
+    sin_r, cos_r = np.sin(rolls), np.cos(rolls)
+    sin_y, cos_y = np.sin(yaws), np.cos(yaws)
+
+    #  closed form of rotation_matrix(pitch, roll, yaw) evaluated element-wise
+    matrices = np.empty(np.shape(pitches) + (3, 3))
+    matrices[..., 0, 0] = cos_y * cos_r
+    matrices[..., 0, 1] = cos_y * sin_r * sin_p - sin_y * cos_p
+    matrices[..., 0, 2] = cos_y * sin_r * cos_p + sin_y * sin_p
+    matrices[..., 1, 0] = sin_y * cos_r
+    matrices[..., 1, 1] = sin_y * sin_r * sin_p + cos_y * cos_p
+    matrices[..., 1, 2] = sin_y * sin_r * cos_p - cos_y * sin_p
+    matrices[..., 2, 0] = -sin_r
+    matrices[..., 2, 1] = cos_r * sin_p
+    matrices[..., 2, 2] = cos_r * cos_p
+
+    return matrices
+
 
 def rotate_vector(vector, pitch, roll, yaw):
     vec_to_matrix = np.array([vector[0],
                               vector[1],
                               vector[2]])
-    rot_x_mat = np.array([[1.0, 0.0, 0.0],
-                          [0.0, np.cos(pitch), -np.sin(pitch)],
-                          [0.0, np.sin(pitch), np.cos(pitch)]])
-    rot_y_mat = np.array([[np.cos(roll), 0.0, np.sin(roll)],
-                          [0.0, 1.0, 0.0],
-                          [-np.sin(roll), 0.0, np.cos(roll)]])
-    rot_z_mat = np.array([[np.cos(yaw), -np.sin(yaw), 0.0],
-                          [np.sin(yaw), np.cos(yaw), 0.0],
-                          [0.0, 0.0, 1.0]])
 
     #  matrix multiplication of np.array uses np.dot
-    vec_to_matrix = np.dot(rot_x_mat, vec_to_matrix)
-    vec_to_matrix = np.dot(rot_y_mat, vec_to_matrix)
-    vec_to_matrix = np.dot(rot_z_mat, vec_to_matrix)
+    return np.dot(rotation_matrix(pitch, roll, yaw), vec_to_matrix)
+
+
+#  vectors = K x 3 array of vectors, or a single vector
+#  orientations = K x 3 array of (pitch, roll, yaw) orientations, or a single orientation
+#  returns the K x 3 array of each vector rotated as by rotate_vector; a single vector or orientation is
+#  broadcast against every row of the other
+def rotate_vectors(vectors, orientations):
+    vectors = np.asarray(vectors, dtype=float)
+    orientations = np.asarray(orientations, dtype=float)
+    matrices = rotation_matrices(orientations[..., 0], orientations[..., 1], orientations[..., 2])
+    return np.einsum('...ij,...j->...i', matrices, vectors)
+
+
+#  quaternion = (w, x, y, z), the same rotation as rotation_matrix(pitch, roll, yaw) when the quaternion
+#  is composed as yaw * roll * pitch about the z, y, and x axes respectively
+def quaternion_to_matrix(quaternion):
+    w, x, y, z = normalize(np.array(quaternion, dtype=float))
 
-    vector = np.array([vec_to_matrix[0], vec_to_matrix[1], vec_to_matrix[2]])
+    return np.array([[1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)],
+                     [2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)],
+                     [2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)]])
 
-    return vector
 
+def euler_to_quaternion(pitch, roll, yaw):
+    cos_p, sin_p = np.cos(pitch / 2.0), np.sin(pitch / 2.0)
+    cos_r, sin_r = np.cos(roll / 2.0), np.sin(roll / 2.0)
+    cos_y, sin_y = np.cos(yaw / 2.0), np.sin(yaw / 2.0)
 
+    return (cos_y * cos_r * cos_p + sin_y * sin_r * sin_p,
+            cos_y * cos_r * sin_p - sin_y * sin_r * cos_p,
+            cos_y * sin_r * cos_p + sin_y * cos_r * sin_p,
+            sin_y * cos_r * cos_p - cos_y * sin_r * sin_p)
+
+
+#  inverse of rotation_matrix, returns (pitch, roll, yaw) with roll in [-pi/2, pi/2]
+def matrix_to_euler(matrix):
+    pitch = np.arctan2(matrix[2][1], matrix[2][2])
+    roll = np.arctan2(-matrix[2][0], np.hypot(matrix[2][1], matrix[2][2]))
+    yaw = np.arctan2(matrix[1][0], matrix[0][0])
+
+    return pitch, roll, yaw
+
+
+#  horizontal and vertical = components of a single vector
+#  returns the angle of the vector in [0, 2 pi), or NaN if its direction cannot be calculated, as
+#  calculate_angle_directions does for a single vector
 def calculate_angle_direction(horizontal, vertical):
-    if horizontal < -0.05:
-        if vertical < -0.05:  # Quadrant III
-            angle_ref = np.abs(np.arctan(vertical / horizontal))
-            angle = np.pi + angle_ref
-        elif vertical > 0.05:  # Quadrant II
-            angle_ref = np.abs(np.arctan(vertical / horizontal))
-            angle = np.pi - angle_ref
-        else:
-            angle = np.pi
-    elif horizontal > 0.05:
-        if vertical < -0.05:  # Quadrant IV
-            angle_ref = np.abs(np.arctan(vertical / horizontal))
-            angle = 2 * np.pi - angle_ref
-        elif vertical > 0.05:  # Quadrant I
-            angle = np.abs(np.arctan(vertical / horizontal))
-        else:
-            angle = 0.0
-    else:
-        if vertical < -0.05:
-            angle = (3.0 * np.pi) / 2.0
-        elif vertical > 0.05:
-            angle = np.pi / 2.0
-        else:
-            angle = None
-            print('No direction can be calculated for a zero vector.')
-
-    return angle
+    return calculate_angle_directions(float(horizontal), float(vertical))
+
+
+#  horizontal and vertical = equal-length arrays of vector components, or single components
+#  returns the array of angles in [0, 2 pi) of each vector, with NaN for vectors whose direction cannot be
+#  calculated, or a single angle for single components
+def calculate_angle_directions(horizontal, vertical):
+    #  single components skip the array operations, which cost more than the angle itself
+    if isinstance(horizontal, (int, float)) and isinstance(vertical, (int, float)):
+        horizontal = horizontal if abs(horizontal) > ANGLE_DEAD_ZONE else 0.0
+        vertical = vertical if abs(vertical) > ANGLE_DEAD_ZONE else 0.0
+        if horizontal == 0.0 and vertical == 0.0:
+            return math.nan
+        return math.atan2(vertical, horizontal) % (2.0 * math.pi)
+
+    horizontal = np.asarray(horizontal, dtype=float)
+    vertical = np.asarray(vertical, dtype=float)
+
+    #  a component in the dead zone snaps the angle onto the other component's axis
+    horizontal = np.where(np.abs(horizontal) > ANGLE_DEAD_ZONE, horizontal, 0.0)
+    vertical = np.where(np.abs(vertical) > ANGLE_DEAD_ZONE, vertical, 0.0)
+
+    angles = np.mod(np.arctan2(vertical, horizontal), 2.0 * np.pi)
+    angles = np.where((horizontal == 0.0) & (vertical == 0.0), np.nan, angles)
+    return angles if angles.ndim > 0 else float(angles)
 
 
 def normalize(vector):
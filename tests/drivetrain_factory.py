@@ -0,0 +1,18 @@
+import numpy as np
+from simple_drivetrain import SimpleDrivetrain
+
+
+#  motor_counts = list of the number of motors of each drivetrain
+#  seed = seed of the random number generator, so that each test case builds the same drivetrains every run
+#  returns a list of drivetrains with random motor positions, directions, and orientations, alternating inverted
+#  motors, and pwm bounds which differ between drivetrains of different motor counts
+def make_random_drivetrains(motor_counts, seed=0):
+    rng = np.random.RandomState(seed)
+    drivetrains = []
+    for motor_count in motor_counts:
+        drivetrain = SimpleDrivetrain(orientation=rng.uniform(-np.pi, np.pi, 3))
+        for i in range(0, motor_count):
+            drivetrain.add_new_motor('motor_' + str(i), rng.uniform(0.1, 1.0, 3), rng.uniform(-1.0, 1.0, 3),
+                                     i % 2 == 0, (1000 + motor_count, 1500, 1900))
+        drivetrains.append(drivetrain)
+    return drivetrains
@@ -0,0 +1,126 @@
+import asyncio
+import time
+import unittest
+import numpy as np
+from simple_drivetrain import SimpleDrivetrain
+from control_loop import ControlLoop, AsyncControlLoop, LoopStatistics
+
+
+class TestCaseControlLoop(unittest.TestCase):
+    def __make_drivetrain(self):
+        drivetrain = SimpleDrivetrain()
+        drivetrain.add_new_motor('front_left', (-1, 1, 0), (1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('front_right', (1, 1, 0), (-1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('back_left', (-1, -1, 0), (-1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('back_right', (1, -1, 0), (1, 1, 0), False, (1000, 1500, 2000))
+        return drivetrain
+
+    def __make_commands(self, count):
+        rng = np.random.RandomState(8)
+        return [(rng.uniform(-1.0, 1.0, 3), rng.uniform(-1.0, 1.0, 3)) for i in range(0, count)]
+
+    def test_run(self):
+        drivetrain = self.__make_drivetrain()
+        commands = self.__make_commands(20)
+        inputs = iter(commands)
+        outputs = []
+
+        loop = ControlLoop(drivetrain, lambda: next(inputs), lambda pwm_values: outputs.append(pwm_values.copy()),
+                           rate=500)
+        start = time.perf_counter()
+        loop.run(20)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(20, len(outputs))
+        for command, observed in zip(commands, outputs):
+            np.testing.assert_array_equal(drivetrain.get_motor_vels_scaled(command[0], command[1]), observed)
+
+        #  20 ticks at 500 Hz start over 19 periods
+        self.assertGreaterEqual(elapsed, 19 * 0.002)
+
+        snapshot = loop.statistics.snapshot()
+        self.assertEqual(20, snapshot['ticks'])
+        self.assertEqual(20, sum(snapshot['jitter_histogram']))
+        self.assertEqual(20, sum(snapshot['compute_time_histogram']))
+        self.assertEqual(len(snapshot['histogram_edges']) + 1, len(snapshot['jitter_histogram']))
+        self.assertGreater(snapshot['compute_time']['max'], 0.0)
+
+        loop.statistics.reset()
+        self.assertEqual(0, loop.statistics.ticks)
+        self.assertEqual([0] * 8, loop.statistics.jitter_histogram)
+
+    def test_deadline_misses(self):
+        drivetrain = self.__make_drivetrain()
+        loop = ControlLoop(drivetrain, lambda: ((1, 0, 0), (0, 0, 0)), lambda pwm_values: time.sleep(0.025),
+                           rate=100)
+        loop.run(4)
+
+        self.assertEqual(4, loop.statistics.ticks)
+        self.assertEqual(4, loop.statistics.deadline_misses)
+        self.assertGreaterEqual(loop.statistics.skipped_ticks, 8)
+        self.assertEqual(4, loop.statistics.compute_time_histogram[-1])
+
+    def test_start_stop(self):
+        drivetrain = self.__make_drivetrain()
+        outputs = []
+
+        with ControlLoop(drivetrain, lambda: ((0, 1, 0), (0, 0, 0)), outputs.append, rate=1000) as loop:
+            self.assertTrue(loop.running)
+            self.assertRaises(RuntimeError, loop.start)
+            time.sleep(0.05)
+        self.assertFalse(loop.running)
+        self.assertGreater(len(outputs), 0)
+        self.assertEqual(len(outputs), loop.statistics.ticks)
+
+        def failing_input():
+            raise ValueError('sensor disconnected')
+
+        loop = ControlLoop(drivetrain, failing_input, outputs.append, rate=1000)
+        loop.start()
+        time.sleep(0.05)
+        self.assertFalse(loop.running)
+        self.assertRaises(ValueError, loop.stop)
+
+    def test_async_run(self):
+        drivetrain = self.__make_drivetrain()
+        commands = self.__make_commands(10)
+        inputs = iter(commands)
+        outputs = []
+
+        async def read_input():
+            return next(inputs)
+
+        async def write_output(pwm_values):
+            outputs.append(pwm_values.copy())
+
+        loop = AsyncControlLoop(drivetrain, read_input, write_output, rate=500)
+        asyncio.run(loop.run(10))
+
+        self.assertEqual(10, len(outputs))
+        for command, observed in zip(commands, outputs):
+            np.testing.assert_array_equal(drivetrain.get_motor_vels_scaled(command[0], command[1]), observed)
+        self.assertEqual(10, loop.statistics.ticks)
+
+        def stop_after_three(pwm_values):
+            if loop.statistics.ticks == 2:
+                loop.stop()
+
+        loop = AsyncControlLoop(drivetrain, lambda: ((1, 0, 0), (0, 0, 0)), stop_after_three, rate=1000)
+        asyncio.run(loop.run())
+        self.assertEqual(3, loop.statistics.ticks)
+
+    def test_loop_statistics(self):
+        statistics = LoopStatistics(0.01, [0.001, 0.005])
+        statistics.record(0.0005, 0.002, False)
+        statistics.record(0.002, 0.02, True, 1)
+
+        self.assertEqual([1, 1, 0], statistics.jitter_histogram)
+        self.assertEqual([0, 1, 1], statistics.compute_time_histogram)
+        self.assertEqual(1, statistics.deadline_misses)
+        self.assertEqual(1, statistics.skipped_ticks)
+        self.assertAlmostEqual(0.011, statistics.snapshot()['compute_time']['mean'])
+        self.assertRaises(ValueError, ControlLoop, None, None, None, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
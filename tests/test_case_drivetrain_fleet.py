@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from drivetrain_factory import make_random_drivetrains
+from drivetrain_fleet import DrivetrainFleet
+
+
+class TestCaseDrivetrainFleet(unittest.TestCase):
+    def test_get_motor_vels(self):
+        motor_counts = [4, 6, 1, 9]
+        drivetrains = make_random_drivetrains(motor_counts, seed=3)
+        fleet = DrivetrainFleet(drivetrains)
+
+        rng = np.random.RandomState(4)
+        translations = rng.uniform(-1.0, 1.0, (len(drivetrains), 3))
+        rotations = rng.uniform(-1.0, 1.0, (len(drivetrains), 3))
+        orientations = rng.uniform(-np.pi, np.pi, (len(drivetrains), 3))
+
+        self.assertEqual((4, 9), fleet.mask.shape)
+        for force_local_oriented in (False, True):
+            observed = fleet.get_motor_vels(translations, rotations, None, force_local_oriented)
+            observed_scaled = fleet.get_motor_vels_scaled(translations, rotations, None, force_local_oriented)
+            observed_oriented = fleet.get_motor_vels(translations, rotations, orientations, force_local_oriented)
+
+            for i in range(0, len(drivetrains)):
+                expected = drivetrains[i].get_motor_vels(translations[i], rotations[i], force_local_oriented)
+                expected_scaled = drivetrains[i].get_motor_vels_scaled(translations[i], rotations[i],
+                                                                       force_local_oriented)
+                for j in range(0, motor_counts[i]):
+                    self.assertTrue(fleet.mask[i][j])
+                    self.assertAlmostEqual(expected[j], observed[i][j])
+                    self.assertEqual(expected_scaled[j], observed_scaled[i][j])
+                for j in range(motor_counts[i], 9):
+                    self.assertFalse(fleet.mask[i][j])
+                    self.assertEqual(0.0, observed[i][j])
+                    self.assertEqual(0, observed_scaled[i][j])
+
+                drivetrains[i].orientation = orientations[i]
+                expected = drivetrains[i].get_motor_vels(translations[i], rotations[i], force_local_oriented)
+                for j in range(0, motor_counts[i]):
+                    self.assertAlmostEqual(expected[j], observed_oriented[i][j])
+
+        self.assertRaises(ValueError, fleet.get_motor_vels, translations[:2], rotations[:2])
+
+    def test_refresh(self):
+        drivetrains = make_random_drivetrains([2, 3], seed=3)
+        fleet = DrivetrainFleet(drivetrains)
+
+        drivetrains[0].add_new_motor('custom', (0.0, 1.0, 0.0), (0.0, 0.0, 1.0),
+                                     pwm_scaling_func=lambda velocity: 7)
+        fleet.refresh()
+
+        self.assertEqual([3, 3], list(fleet.motor_counts))
+        observed = fleet.get_motor_vels_scaled(np.zeros((2, 3)), np.zeros((2, 3)))
+        self.assertEqual(7, observed[0][2])
@@ -0,0 +1,132 @@
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+import numpy as np
+import simple_drivetrain
+from simple_drivetrain import SimpleDrivetrain
+from drivetrain_fleet import DrivetrainFleet
+from drivetrain_library import iter_drivetrains, iter_fleet_rows, load_drivetrain_directory
+
+
+class TestCaseDrivetrainLibrary(unittest.TestCase):
+    #  returns the xml of a drivetrain whose motors depend on seed
+    def __make_drivetrain_xml(self, seed, motor_count=5):
+        rng = np.random.RandomState(seed)
+        lines = ['<SimpleDrivetrain>',
+                 '<orientation pitch="%.17g" roll="%.17g" yaw="%.17g" />' % tuple(rng.uniform(-1.0, 1.0, 3))]
+        for i in range(0, motor_count):
+            lines.append('<motor name="motor_%d" inverted="%s">' % (i, i % 2 == 0))
+            lines.append('<position x="%.17g" y="%.17g" z="%.17g" />' % tuple(rng.uniform(0.1, 1.0, 3)))
+            lines.append('<direction x="%.17g" y="%.17g" z="%.17g" />' % tuple(rng.uniform(-1.0, 1.0, 3)))
+            lines.append('<pwm_bounds reverse="1100" stop="%d" forward="1900" />' % (1400 + seed % 200))
+            lines.append('</motor>')
+        lines.append('</SimpleDrivetrain>')
+        return '\n'.join(lines)
+
+    def __make_library(self, drivetrain_count):
+        return ('<SimpleDrivetrainLibrary>\n'
+                + '\n'.join(self.__make_drivetrain_xml(seed) for seed in range(0, drivetrain_count))
+                + '\n</SimpleDrivetrainLibrary>').encode()
+
+    def __assertDrivetrainsEqual(self, expected, observed):
+        self.assertEqual(expected.motor_bank.names, observed.motor_bank.names)
+        self.assertTrue(np.allclose(expected.orientation, observed.orientation))
+        self.assertTrue(np.allclose(expected.motor_bank.directions, observed.motor_bank.directions))
+        self.assertTrue(np.array_equal(expected.motor_bank.pwm_bounds, observed.motor_bank.pwm_bounds))
+
+    def test_iter_drivetrains(self):
+        library = self.__make_library(7)
+
+        expected_library = []
+        for seed in range(0, 7):
+            expected = SimpleDrivetrain()
+            expected.load_drivetrain_from_element(simple_drivetrain._get_etree().fromstring(
+                self.__make_drivetrain_xml(seed)))
+            expected_library.append(expected)
+
+        observed = list(iter_drivetrains(io.BytesIO(library)))
+        self.assertEqual(7, len(observed))
+        for i in range(0, 7):
+            self.__assertDrivetrainsEqual(expected_library[i], observed[i])
+
+        #  a single drivetrain file is its own root element
+        expected = SimpleDrivetrain()
+        expected.load_drivetrain_from_file('drivetrain_test.xml', use_compiled=False)
+        observed = list(iter_drivetrains('drivetrain_test.xml'))
+        self.assertEqual(1, len(observed))
+        self.__assertDrivetrainsEqual(expected, observed[0])
+
+        #  the standard library parser streams the same drivetrains
+        etree = simple_drivetrain._etree
+        simple_drivetrain._etree = None
+        try:
+            with mock.patch.dict('sys.modules', {'lxml': None, 'lxml.etree': None}):
+                observed = list(iter_drivetrains(io.BytesIO(library)))
+        finally:
+            simple_drivetrain._etree = etree
+        self.assertEqual(7, len(observed))
+        for i in range(0, 7):
+            self.__assertDrivetrainsEqual(expected_library[i], observed[i])
+
+    def test_iter_fleet_rows(self):
+        library = self.__make_library(4)
+        fleet = DrivetrainFleet(iter_drivetrains(io.BytesIO(library)))
+
+        rows = list(iter_fleet_rows(io.BytesIO(library)))
+        self.assertEqual(4, len(rows))
+        for i in range(0, 4):
+            mixing_matrix, stops, forward_spans, reverse_spans, orientation = rows[i]
+            self.assertTrue(np.allclose(fleet.mixing_matrices[i], mixing_matrix))
+            self.assertTrue(np.allclose(fleet.pwm_stops[i], stops))
+            self.assertTrue(np.allclose(fleet.pwm_forward_spans[i], forward_spans))
+            self.assertTrue(np.allclose(fleet.pwm_reverse_spans[i], reverse_spans))
+            self.assertTrue(np.allclose(fleet.orientations[i], orientation))
+
+    def test_flat_memory(self):
+        #  drivetrains are discarded as they are read, so peak memory must not grow with the file's size; the
+        #  standard library parser is used since tracemalloc does not see the allocations of lxml
+        peaks = []
+        etree = simple_drivetrain._etree
+        simple_drivetrain._etree = None
+        try:
+            with mock.patch.dict('sys.modules', {'lxml': None, 'lxml.etree': None}):
+                for drivetrain_count in (100, 800):
+                    library = io.BytesIO(self.__make_library(drivetrain_count))
+                    count = 0
+                    tracemalloc.start()
+                    try:
+                        for drivetrain in iter_drivetrains(library):
+                            count += 1
+                        peaks.append(tracemalloc.get_traced_memory()[1])
+                    finally:
+                        tracemalloc.stop()
+                    self.assertEqual(drivetrain_count, count)
+        finally:
+            simple_drivetrain._etree = etree
+
+        self.assertLess(peaks[1], 2 * peaks[0])
+
+    def test_load_drivetrain_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for seed in range(0, 6):
+                with open(os.path.join(directory, 'robot_%d.xml' % seed), 'w') as fh:
+                    fh.write(self.__make_drivetrain_xml(seed))
+            with open(os.path.join(directory, 'notes.txt'), 'w') as fh:
+                fh.write('not a drivetrain')
+
+            drivetrains = load_drivetrain_directory(directory, worker_count=3)
+            self.assertEqual([os.path.join(directory, 'robot_%d.xml' % seed) for seed in range(0, 6)],
+                             list(drivetrains))
+
+            for seed in range(0, 6):
+                filepath = os.path.join(directory, 'robot_%d.xml' % seed)
+                expected = SimpleDrivetrain()
+                expected.load_drivetrain_from_file(filepath, use_compiled=False)
+                self.__assertDrivetrainsEqual(expected, drivetrains[filepath])
+        finally:
+            shutil.rmtree(directory)
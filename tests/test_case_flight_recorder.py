@@ -0,0 +1,148 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy as np
+from simple_drivetrain import SimpleDrivetrain
+from flight_recorder import FlightRecorder, FlightRecording, HEADER_SIZE
+
+SOURCE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+class TestCaseFlightRecorder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'flight.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def __make_drivetrain(self):
+        rng = np.random.RandomState(23)
+        drivetrain = SimpleDrivetrain()
+        for i in range(0, 5):
+            drivetrain.add_new_motor('motor_' + str(i), rng.uniform(0.1, 1.0, 3), rng.uniform(-1.0, 1.0, 3),
+                                     i % 2 == 0, (1100, 1500, 1900))
+        return drivetrain
+
+    def test_record(self):
+        drivetrain = self.__make_drivetrain()
+        recorder = FlightRecorder(self.path, 5, capacity=8)
+        drivetrain.recorder = recorder
+        self.assertIs(recorder, drivetrain.recorder)
+        self.assertEqual(HEADER_SIZE + 8 * (11 + 2 * 5) * 8, os.path.getsize(self.path))
+
+        rng = np.random.RandomState(24)
+        commands = []
+        for tick in range(0, 13):
+            translation = rng.uniform(-1.0, 1.0, 3)
+            rotation = tuple(rng.uniform(-1.0, 1.0, 3))
+            drivetrain.orientation = rng.uniform(-np.pi, np.pi, 3)
+            commands.append((translation, rotation, drivetrain.orientation,
+                             drivetrain.get_motor_vels(translation, rotation),
+                             drivetrain.get_motor_vels_scaled(translation, rotation)))
+        self.assertEqual(13, recorder.count)
+
+        #  once detached, the drivetrain stops recording
+        drivetrain.recorder = None
+        drivetrain.get_motor_vels_scaled((1.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+        self.assertEqual(13, recorder.count)
+
+        recording = FlightRecording(self.path)
+        self.assertEqual(5, recording.motor_count)
+        self.assertEqual(8, recording.capacity)
+        self.assertEqual(13, recording.count)
+
+        #  only the 8 most recent records are kept, of which the oldest may be mid-overwrite by the writer, and
+        #  the snapshot orders the rest chronologically
+        snapshot = recording.snapshot()
+        np.testing.assert_array_equal(np.arange(6, 13), snapshot['sequence'])
+        self.assertTrue(np.all(np.diff(snapshot['time']) >= 0.0))
+        for i in range(0, 7):
+            translation, rotation, orientation, motor_vels, motor_pwms = commands[6 + i]
+            np.testing.assert_array_equal(translation, snapshot['translation'][i])
+            np.testing.assert_array_equal(rotation, snapshot['rotation'][i])
+            np.testing.assert_array_equal(orientation, snapshot['orientation'][i])
+            np.testing.assert_allclose(motor_vels, snapshot['motor_vels'][i])
+            np.testing.assert_array_equal(motor_pwms, snapshot['motor_pwms'][i])
+
+        #  field views read the file in place, in ring order
+        motor_pwms = recording.field('motor_pwms')
+        self.assertEqual((8, 5), motor_pwms.shape)
+        self.assertFalse(motor_pwms.flags.writeable)
+        np.testing.assert_array_equal(commands[12][4], motor_pwms[12 % 8])
+        with self.assertRaises(KeyError):
+            recording.field('motor_names')
+
+        recorder.close()
+
+    def test_concurrent_reader(self):
+        drivetrain = self.__make_drivetrain()
+        with FlightRecorder(self.path, 5, capacity=4) as recorder:
+            drivetrain.recorder = recorder
+            for tick in range(0, 3):
+                drivetrain.get_motor_vels_scaled((0.0, 1.0, 0.0), (0.0, 0.0, 0.5 * tick))
+            expected = drivetrain.get_motor_vels_scaled((0.0, 1.0, 0.0), (0.0, 0.0, 1.5))
+
+            #  a separate process sees the records through the page cache while the recorder is still open
+            environment = dict(os.environ)
+            environment['PYTHONPATH'] = SOURCE_DIRECTORY + os.pathsep + environment.get('PYTHONPATH', '')
+            code = ('from flight_recorder import FlightRecording; recording = FlightRecording(%r); '
+                    'snapshot = recording.snapshot(); print(recording.count); '
+                    'print(" ".join(str(pwm) for pwm in snapshot["motor_pwms"][-1]))' % self.path)
+            result = subprocess.run([sys.executable, '-c', code], env=environment, stdout=subprocess.PIPE,
+                                    universal_newlines=True, check=True)
+            count, motor_pwms = result.stdout.splitlines()
+            self.assertEqual(4, int(count))
+            self.assertEqual([int(pwm) for pwm in expected], [int(pwm) for pwm in motor_pwms.split()])
+
+    def test_motor_change(self):
+        drivetrain = self.__make_drivetrain()
+        with FlightRecorder(self.path, 5, capacity=8) as recorder:
+            drivetrain.recorder = recorder
+            drivetrain.get_motor_vels_scaled((0.0, 1.0, 0.0), (0.0, 0.0, 0.5))
+
+            #  the recorder's rows no longer fit, so it is detached while the call still returns every motor's value
+            drivetrain.add_new_motor('motor_5', (0.5, 0.5, 0.5), (0.0, 0.0, 1.0), False, (1100, 1500, 1900))
+            with self.assertWarns(RuntimeWarning):
+                motor_pwms = drivetrain.get_motor_vels_scaled((0.0, 1.0, 0.0), (0.0, 0.0, 0.5))
+            self.assertEqual(6, len(motor_pwms))
+            self.assertIsNone(drivetrain.recorder)
+            self.assertEqual(1, recorder.count)
+
+            drivetrain.remove_motor_by_name('motor_5')
+            drivetrain.recorder = recorder
+            drivetrain.remove_motor_by_name('motor_0')
+            with self.assertWarns(RuntimeWarning):
+                self.assertEqual(4, len(drivetrain.get_motor_vels_scaled((1.0, 0.0, 0.0), (0.0, 0.0, 0.0))))
+            self.assertIsNone(drivetrain.recorder)
+            self.assertEqual(1, recorder.count)
+
+            #  replacing a motor keeps the motor count, but moves the motors to other columns
+            drivetrain.add_new_motor('motor_0', (0.5, 0.5, 0.5), (0.0, 0.0, 1.0), False, (1100, 1500, 1900))
+            drivetrain.recorder = recorder
+            drivetrain.get_motor_vels_scaled((1.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+            self.assertEqual(2, recorder.count)
+            drivetrain.remove_motor_by_name('motor_1')
+            drivetrain.add_new_motor('motor_1', (0.5, 0.5, 0.5), (0.0, 0.0, 1.0), False, (1100, 1500, 1900))
+            with self.assertWarns(RuntimeWarning):
+                self.assertEqual(5, len(drivetrain.get_motor_vels_scaled((1.0, 0.0, 0.0), (0.0, 0.0, 0.0))))
+            self.assertIsNone(drivetrain.recorder)
+            self.assertEqual(2, recorder.count)
+
+    def test_invalid(self):
+        drivetrain = self.__make_drivetrain()
+        with FlightRecorder(self.path, 4) as recorder:
+            with self.assertRaises(ValueError):
+                drivetrain.recorder = recorder
+        self.assertIsNone(drivetrain.recorder)
+
+        with self.assertRaises(ValueError):
+            FlightRecorder(self.path, 5, capacity=0)
+
+        with open(self.path, 'wb') as fh:
+            fh.write(b'\0' * 2 * HEADER_SIZE)
+        with self.assertRaises(ValueError):
+            FlightRecording(self.path)
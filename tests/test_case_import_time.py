@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+import numpy as np
+import simple_drivetrain
+from simple_drivetrain import SimpleDrivetrain
+
+TESTS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRECTORY = os.path.join(TESTS_DIRECTORY, '..', 'src')
+PACKAGE_DIRECTORY = os.path.join(TESTS_DIRECTORY, '..', 'release', 'simpledrivetrain')
+
+#  standard library and optional modules which only some of the package's modules need
+HEAVY_MODULES = ('asyncio', 'concurrent.futures', 'multiprocessing', 'threading', 'xml.etree', 'lxml', 'hashlib',
+                 'tempfile')
+
+#  prints the sorted names of the loaded package submodules and heavy modules
+PRINT_LOADED_MODULES = ('import sys; print(sorted(name for name in sys.modules if name.startswith("simpledrivetrain.") '
+                        'or name in ' + repr(HEAVY_MODULES) + '))')
+
+
+class TestCaseImportTime(unittest.TestCase):
+    #  path = directory the code imports its modules from
+    def __run_python(self, code, path=SOURCE_DIRECTORY):
+        environment = dict(os.environ)
+        environment['PYTHONPATH'] = path + os.pathsep + environment.get('PYTHONPATH', '')
+        environment['PYTHONDONTWRITEBYTECODE'] = '1'  # the tests must not write __pycache__ into the source tree
+        return subprocess.run([sys.executable, '-c', code], env=environment,
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    def test_lazy_submodule_imports(self):
+        #  the package imports submodules on first access, so importing it loads none of them, and SimpleDrivetrain
+        #  alone does not pay for the modules which control loops, libraries, and sharded fleets import
+        result = self.__run_python('import simpledrivetrain; ' + PRINT_LOADED_MODULES, PACKAGE_DIRECTORY)
+        self.assertEqual('[]', result.stdout.strip())
+
+        result = self.__run_python('from simpledrivetrain import SimpleDrivetrain; ' + PRINT_LOADED_MODULES,
+                                   PACKAGE_DIRECTORY)
+        self.assertEqual(str(['simpledrivetrain.motor', 'simpledrivetrain.motor_bank',
+                              'simpledrivetrain.simple_drivetrain', 'simpledrivetrain.vectorutils']),
+                         result.stdout.strip())
+
+        result = self.__run_python('import simpledrivetrain; from simpledrivetrain import *; '
+                                   'print(simpledrivetrain.control_loop.ControlLoop.__name__, '
+                                   'ShardedDrivetrainFleet.__name__)', PACKAGE_DIRECTORY)
+        self.assertEqual('ControlLoop ShardedDrivetrainFleet', result.stdout.strip())
+
+    def test_lazy_xml_import(self):
+        result = self.__run_python('import sys, simple_drivetrain; '
+                                   'print(any(name.startswith(("lxml", "xml.etree")) for name in sys.modules))')
+        self.assertEqual('False', result.stdout.strip())
+
+    def test_lazy_snapshot_imports(self):
+        result = self.__run_python('import sys, simple_drivetrain; '
+                                   'print(any(name in sys.modules for name in ("hashlib", "tempfile")))')
+        self.assertEqual('False', result.stdout.strip())
+
+    def test_lazy_shared_memory_import(self):
+        #  multiprocessing.shared_memory does not exist before Python 3.8, so importing the module must not need it
+        result = self.__run_python('import sys, sharded_fleet; print("multiprocessing.shared_memory" in sys.modules)')
+        self.assertEqual('False', result.stdout.strip())
+
+    def test_element_tree_fallback(self):
+        expected = SimpleDrivetrain()
+        expected.load_drivetrain_from_file('drivetrain_test.xml', use_compiled=False)
+
+        #  a None entry in sys.modules makes importing lxml raise an ImportError
+        etree = simple_drivetrain._etree
+        simple_drivetrain._etree = None
+        try:
+            with mock.patch.dict(sys.modules, {'lxml': None, 'lxml.etree': None}):
+                observed = SimpleDrivetrain()
+                observed.load_drivetrain_from_file('drivetrain_test.xml', use_compiled=False)
+                self.assertEqual('xml.etree.ElementTree', simple_drivetrain._etree.__name__)
+        finally:
+            simple_drivetrain._etree = etree
+
+        self.assertEqual(expected.motor_bank.names, observed.motor_bank.names)
+        self.assertEqual(expected.orientation, observed.orientation)
+        np.testing.assert_array_equal(expected.mixing_matrix, observed.mixing_matrix)
+        np.testing.assert_array_equal(expected.motor_bank.pwm_bounds, observed.motor_bank.pwm_bounds)
+
+
+if __name__ == '__main__':
+    unittest.main()
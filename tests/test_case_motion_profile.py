@@ -0,0 +1,98 @@
+import unittest
+import numpy as np
+from simple_drivetrain import SimpleDrivetrain
+from motion_profile import MotionProfile, trapezoidal_profile, s_curve_profile
+
+
+class TestCaseMotionProfile(unittest.TestCase):
+    waypoints = np.array([[0, 0, 0, 0, 0, 0],
+                          [2, 1, 0, 0, 0, 1.5],
+                          [2, 1, 0, 0, 0, 1.5],
+                          [0, 3, 0, 0, 0, 0]], dtype=float)
+
+    def __check_waypoints(self, profile):
+        #  every waypoint is reached exactly
+        end = profile.positions[-1] + profile.velocities[-1] / profile.rate
+        np.testing.assert_allclose(self.waypoints[-1], end, atol=1e-9)
+        for waypoint in self.waypoints[1:-1]:
+            distances = np.abs(profile.positions - waypoint).max(axis=1)
+            self.assertLess(distances.min(), 1e-9)
+
+    def test_trapezoidal_profile(self):
+        profile = trapezoidal_profile(self.waypoints, 0.8, (2.0, 2.0, 2.0, 1.0, 1.0, 1.0), rate=1000)
+        self.__check_waypoints(profile)
+
+        self.assertEqual((len(profile), 6), profile.positions.shape)
+        self.assertAlmostEqual(len(profile) / 1000.0, profile.duration)
+        np.testing.assert_array_equal(profile.velocities[:, :3], profile.translations)
+        np.testing.assert_array_equal(profile.velocities[:, 3:], profile.rotations)
+
+        self.assertLessEqual(np.abs(profile.velocities).max(), 0.8 + 1e-9)
+        accelerations = np.abs(np.diff(profile.velocities, axis=0)).max(axis=0) * 1000
+        self.assertTrue(np.all(accelerations <= np.array((2.0, 2.0, 2.0, 1.0, 1.0, 1.0)) + 1e-6))
+
+        #  a short move never reaches its velocity limit
+        profile = trapezoidal_profile([[0, 0, 0, 0, 0, 0], [0.1, 0, 0, 0, 0, 0]], 0.8, 2.0, rate=1000)
+        self.assertAlmostEqual(np.sqrt(0.2), profile.velocities[:, 0].max(), 2)
+        self.assertAlmostEqual(0.1, profile.velocities[:, 0].sum() / 1000)
+
+    def test_s_curve_profile(self):
+        trapezoidal = trapezoidal_profile(self.waypoints, 0.8, 2.0, rate=1000)
+        profile = s_curve_profile(self.waypoints, 0.8, 2.0, 10.0, rate=1000)
+        self.__check_waypoints(profile)
+        self.assertGreater(len(profile), len(trapezoidal))
+
+        velocities = profile.velocities
+        accelerations = np.diff(velocities, axis=0) * 1000
+        jerks = np.diff(accelerations, axis=0) * 1000
+        self.assertLessEqual(np.abs(velocities).max(), 0.8 + 1e-9)
+        self.assertLessEqual(np.abs(accelerations).max(), 2.0 + 1e-6)
+
+        #  the tick-to-tick jerk estimate is only exact to within a tick at the ends of each segment
+        self.assertLessEqual(np.abs(jerks).max(), 10.0 * 1.3)
+        self.assertGreater(np.abs(np.diff(trapezoidal.velocities, axis=0) * 1000).max() * 1000,
+                           np.abs(jerks).max())
+
+    def test_get_motor_vels_scaled(self):
+        drivetrain = SimpleDrivetrain()
+        drivetrain.add_new_motor('front_left', (-1, 1, 0), (1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('front_right', (1, 1, 0), (-1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('back_left', (-1, -1, 0), (-1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('back_right', (1, -1, 0), (1, 1, 0), False, (1000, 1500, 2000))
+
+        profile = s_curve_profile(self.waypoints, 0.8, 2.0, 10.0, rate=100)
+        schedule = profile.get_motor_vels_scaled(drivetrain)
+        oriented_schedule = profile.get_motor_vels_scaled(drivetrain, track_orientation=True)
+        self.assertEqual((len(profile), 4), schedule.shape)
+
+        orientation = drivetrain.orientation
+        for tick in range(0, len(profile), 37):
+            np.testing.assert_array_equal(
+                drivetrain.get_motor_vels_scaled(profile.translations[tick], profile.rotations[tick]),
+                schedule[tick])
+
+            drivetrain.orientation = profile.orientations[tick]
+            np.testing.assert_array_equal(
+                drivetrain.get_motor_vels_scaled(profile.translations[tick], profile.rotations[tick]),
+                oriented_schedule[tick])
+            drivetrain.orientation = orientation
+
+        np.testing.assert_allclose(profile.get_motor_vels(drivetrain, True),
+                                   drivetrain.get_motor_vels_batch(profile.translations, profile.rotations,
+                                                                   None, True))
+
+    def test_invalid_profiles(self):
+        self.assertRaises(ValueError, trapezoidal_profile, [[0, 0, 0]], 1.0, 1.0)
+        self.assertRaises(ValueError, trapezoidal_profile, self.waypoints[:1], 1.0, 1.0)
+        self.assertRaises(ValueError, trapezoidal_profile, self.waypoints, 0.0, 1.0)
+        self.assertRaises(ValueError, s_curve_profile, self.waypoints, 1.0, 1.0, -1.0)
+        self.assertRaises(ValueError, trapezoidal_profile, self.waypoints, 1.0, 1.0, 0)
+
+        profile = trapezoidal_profile([self.waypoints[1], self.waypoints[1]], 1.0, 1.0)
+        self.assertTrue(isinstance(profile, MotionProfile))
+        self.assertEqual(1, len(profile))
+        np.testing.assert_array_equal(self.waypoints[1], profile.positions[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+from motor_allocation import MotorAllocation
+
+
+class TestCaseMotorAllocation(unittest.TestCase):
+    @staticmethod
+    def __expected(mixing_matrix, enabled):
+        enabled_matrix = mixing_matrix * enabled[:, np.newaxis]
+        gram = np.dot(mixing_matrix.T, mixing_matrix)
+        enabled_gram = np.dot(enabled_matrix.T, enabled_matrix)
+        return (np.dot(np.dot(enabled_matrix, np.linalg.pinv(enabled_gram)), gram),
+                np.linalg.pinv(enabled_matrix))
+
+    def test_disable_enable(self):
+        rng = np.random.RandomState(12)
+        planar = np.hstack((rng.uniform(-1.0, 1.0, (10, 5)), np.zeros((10, 1))))
+        for mixing_matrix in (rng.uniform(-1.0, 1.0, (8, 6)), planar, rng.uniform(-1.0, 1.0, (6, 6))):
+            allocation = MotorAllocation(mixing_matrix)
+            self.assertTrue(allocation.allocation_matrix is mixing_matrix)
+            np.testing.assert_allclose(np.linalg.pinv(mixing_matrix), allocation.pseudo_inverse, atol=1e-12)
+
+            enabled = np.ones(len(mixing_matrix), dtype=bool)
+            for step in range(0, 40):
+                index = rng.randint(len(mixing_matrix))
+                if enabled[index]:
+                    allocation.disable(index)
+                else:
+                    allocation.enable(index)
+                enabled[index] = not enabled[index]
+
+                expected_allocation, expected_pseudo_inverse = self.__expected(mixing_matrix, enabled)
+                np.testing.assert_array_equal(enabled, allocation.enabled)
+                np.testing.assert_allclose(expected_allocation, allocation.allocation_matrix, atol=1e-8)
+                np.testing.assert_allclose(expected_pseudo_inverse, allocation.pseudo_inverse, atol=1e-8)
+                self.assertTrue(np.all(allocation.allocation_matrix[~enabled] == 0.0))
+
+            for index in range(0, len(mixing_matrix)):
+                allocation.enable(index)
+            self.assertTrue(allocation.allocation_matrix is mixing_matrix)
+
+    def test_copy(self):
+        rng = np.random.RandomState(14)
+        mixing_matrix = rng.uniform(-1.0, 1.0, (8, 6))
+        allocation = MotorAllocation(mixing_matrix)
+        allocation.disable(2)
+        allocation_matrix = allocation.allocation_matrix
+        pseudo_inverse = allocation.pseudo_inverse
+
+        #  updating a copy leaves the original and the arrays it has published untouched
+        copied = allocation.copy()
+        copied.disable(5)
+        copied.enable(2)
+        enabled = np.ones(8, dtype=bool)
+        enabled[2] = False
+        np.testing.assert_array_equal(enabled, allocation.enabled)
+        self.assertTrue(allocation.allocation_matrix is allocation_matrix)
+        self.assertTrue(allocation.pseudo_inverse is pseudo_inverse)
+
+        expected_allocation, expected_pseudo_inverse = self.__expected(mixing_matrix, enabled)
+        np.testing.assert_allclose(expected_allocation, allocation_matrix, atol=1e-8)
+        np.testing.assert_allclose(expected_pseudo_inverse, pseudo_inverse, atol=1e-8)
+
+        enabled[2] = True
+        enabled[5] = False
+        expected_allocation, expected_pseudo_inverse = self.__expected(mixing_matrix, enabled)
+        np.testing.assert_array_equal(enabled, copied.enabled)
+        np.testing.assert_allclose(expected_allocation, copied.allocation_matrix, atol=1e-8)
+        np.testing.assert_allclose(expected_pseudo_inverse, copied.pseudo_inverse, atol=1e-8)
+
+    def test_redistribution(self):
+        rng = np.random.RandomState(13)
+        mixing_matrix = rng.uniform(-1.0, 1.0, (8, 6))
+        command = rng.uniform(-1.0, 1.0, 6)
+        allocation = MotorAllocation(mixing_matrix)
+
+        #  with spare motors, the enabled motors reproduce the full drivetrain's effect exactly
+        allocation.disable(3)
+        allocation.disable(5)
+        self.assertFalse(allocation.degraded)
+        motor_vels = np.dot(allocation.allocation_matrix, command)
+        self.assertEqual(0.0, motor_vels[3])
+        np.testing.assert_allclose(np.dot(mixing_matrix.T, np.dot(mixing_matrix, command)),
+                                   np.dot(mixing_matrix.T, motor_vels), atol=1e-10)
+
+        #  the pseudo-inverse recovers the command from the velocities of the enabled motors alone
+        measured_vels = np.dot(mixing_matrix, command)
+        measured_vels[3] = 99.0
+        np.testing.assert_allclose(command, np.dot(allocation.pseudo_inverse, measured_vels), atol=1e-10)
+
+        #  losing a direction of motion falls back to a least-squares allocation
+        allocation.disable(0)
+        allocation.disable(1)
+        allocation.disable(2)
+        self.assertTrue(allocation.degraded)
+        expected_allocation, expected_pseudo_inverse = self.__expected(mixing_matrix, allocation.enabled)
+        np.testing.assert_allclose(expected_allocation, allocation.allocation_matrix, atol=1e-10)
+
+        allocation.enable(0)
+        allocation.enable(1)
+        self.assertTrue(allocation.degraded)
+        allocation.enable(2)
+        self.assertFalse(allocation.degraded)
+
+
+if __name__ == '__main__':
+    unittest.main()
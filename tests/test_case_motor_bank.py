@@ -0,0 +1,132 @@
+import unittest
+import numpy as np
+from motor_bank import MotorBank
+from motor import Motor
+
+
+class TestCaseMotorBank(unittest.TestCase):
+    def test_append(self):
+        bank = MotorBank(1)
+        for i in range(0, 20):
+            bank.append('m' + str(i), [i, 1.0, 0.0], [0.0, 2.0, 0.0], i % 2 == 1, (1100, 1500, 1900))
+
+        self.assertEqual(20, len(bank))
+        self.assertEqual((20, 3), bank.positions.shape)
+        self.assertEqual((20, 3), bank.directions.shape)
+        self.assertEqual((20, 3), bank.pwm_bounds.shape)
+        for i in range(0, 20):
+            self.assertEqual(i, bank.index_of('m' + str(i)))
+            self.assertAlmostEqual(float(i), bank.positions[i][0])
+            self.assertAlmostEqual(-1.0 if i % 2 == 1 else 1.0, bank.directions[i][1])
+
+        self.assertRaises(ValueError, bank.append, 'm0', [0.0, 0.0, 1.0], [0.0, 0.0, 1.0])
+        self.assertRaises(ValueError, bank.append, 'm20', [0.0, 1.0], [0.0, 0.0, 1.0])
+
+        #  the stored arrays may only be changed through the bank
+        self.assertRaises(ValueError, bank.positions.__setitem__, 0, [1.0, 1.0, 1.0])
+
+    def test_extend(self):
+        bank = MotorBank(1)
+        bank.append('a', [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+
+        version = bank.version
+        positions = np.arange(12, dtype=float).reshape(4, 3)
+        directions = np.tile([0.0, 0.0, 1.0], (4, 1))
+        pwm_bounds = np.tile([1100, 1500, 1900], (4, 1))
+        first = bank.extend(['b', 'c', 'd', 'e'], positions, directions, [False, True, False, True], pwm_bounds,
+                            np.zeros((4, 3)))
+
+        self.assertEqual(1, first)
+        self.assertEqual(('a', 'b', 'c', 'd', 'e'), bank.names)
+        self.assertTrue(bank.version > version)
+        self.assertEqual(3, bank.index_of('d'))
+        self.assertTrue(np.allclose(positions, bank.positions[1:]))
+        self.assertTrue(np.allclose([False, True, False, True], bank.inverted[1:]))
+        self.assertEqual((None,) * 5, tuple(bank.pwm_scaling_funcs))
+
+        self.assertRaises(ValueError, bank.extend, ['f', 'a'], positions[:2], directions[:2], [False, False],
+                          pwm_bounds[:2], np.zeros((2, 3)))
+        self.assertRaises(ValueError, bank.extend, ['f', 'f'], positions[:2], directions[:2], [False, False],
+                          pwm_bounds[:2], np.zeros((2, 3)))
+        self.assertRaises(ValueError, bank.extend, ['f'], positions[:2], directions[:1], [False],
+                          pwm_bounds[:1], np.zeros((1, 3)))
+        self.assertEqual(5, len(bank))
+
+    def test_views(self):
+        bank = MotorBank()
+        motors = [Motor.from_bank(bank, bank.append(name, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]))
+                  for name in ('a', 'b', 'c')]
+
+        #  values read from a motor are its own, unaffected when removing another motor moves its row
+        direction = motors[1].direction
+        motors[1].pwm_bounds = (1100, 1500, 1900)
+        pwm_bounds = motors[1].pwm_bounds
+        self.assertEqual((1100, 1500, 1900), pwm_bounds)
+        self.assertIsInstance(pwm_bounds[0], int)
+
+        version = bank.version
+        motors[2].direction = [0.0, 0.0, 3.0]
+        self.assertTrue(bank.version > version)
+        self.assertAlmostEqual(1.0, bank.directions[2][2])
+
+        bank.remove(1)
+        self.assertEqual(('a', 'c'), bank.names)
+        self.assertEqual(1, motors[2].index)
+        self.assertEqual('c', motors[2].name)
+        self.assertTrue(Motor.from_bank(bank, 1) is motors[2])
+
+        #  a removed motor keeps its configuration outside of the bank
+        self.assertEqual('b', motors[1].name)
+        self.assertFalse(motors[1].bank is bank)
+        self.assertAlmostEqual(1.0, motors[1].direction[1])
+        np.testing.assert_array_equal([0.0, 1.0, 0.0], direction)
+        self.assertEqual((1100, 1500, 1900), motors[1].pwm_bounds)
+
+        motors[2].name = 'd'
+        self.assertEqual(1, bank.index_of('d'))
+        self.assertRaises(KeyError, bank.index_of, 'c')
+        self.assertRaises(ValueError, setattr, motors[2], 'name', 'a')
+
+    def test_angle_positions(self):
+        bank = MotorBank()
+        bank.append('fu', [0.0, 0.5, 0.0], [0.0, 0.0, 1.0])
+
+        observed = bank.angle_positions[0]
+        self.assertAlmostEqual(0.0, observed[0])
+        self.assertTrue(np.isnan(observed[1]))
+        self.assertAlmostEqual(np.pi / 2.0, observed[2])
+        self.assertTrue(Motor.from_bank(bank, 0).angle_position[1] is None)
+
+    def test_append_many(self):
+        rng = np.random.RandomState(6)
+        positions = rng.uniform(-1.0, 1.0, (30, 3))
+        positions[3] = [0.0, 0.01, 0.0]
+        directions = rng.uniform(-1.0, 1.0, (30, 3))
+        inverted = np.arange(30) % 3 == 0
+        names = ['m' + str(i) for i in range(0, 30)]
+
+        expected = MotorBank()
+        for i in range(0, 30):
+            expected.append(names[i], positions[i], directions[i], inverted[i], (1000, 1500, 2000))
+        observed = MotorBank()
+        self.assertEqual(0, observed.append_many(names, positions, directions, inverted, (1000, 1500, 2000)))
+
+        self.assertEqual(expected.names, observed.names)
+        self.assertTrue(np.allclose(expected.directions, observed.directions))
+        self.assertTrue(np.array_equal(expected.inverted, observed.inverted))
+        self.assertTrue(np.array_equal(expected.pwm_bounds, observed.pwm_bounds))
+        self.assertTrue(np.allclose(expected.angle_positions, observed.angle_positions, equal_nan=True))
+        self.assertTrue(np.isnan(observed.angle_positions[3][0]))
+
+        self.assertRaises(ZeroDivisionError, MotorBank().append_many, ['a'], [[1.0, 0.0, 0.0]], [[0.0, 0.0, 0.0]])
+
+        #  moving every motor at once recalculates their angle positions
+        version = observed.version
+        new_positions = rng.uniform(-1.0, 1.0, (30, 3))
+        observed.set_positions(new_positions)
+        for i in range(0, 30):
+            expected.set_position(i, new_positions[i])
+        self.assertTrue(observed.version > version)
+        self.assertTrue(np.allclose(new_positions, observed.positions))
+        self.assertTrue(np.allclose(expected.angle_positions, observed.angle_positions, equal_nan=True))
+        self.assertRaises(ValueError, observed.set_positions, new_positions[:29])
@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+from simple_drivetrain import SimpleDrivetrain
+from pwm_lookup import PwmLookupTable, stack_lookup_tables, evaluate_lookup_tables
+
+
+#  an ESC calibration curve: a cubic fit clamped to the pwm range
+def calibration_curve(velocity):
+    pwm = 1500 + 380 * velocity + 40 * velocity ** 3
+    return int(min(max(pwm, 1100), 1900))
+
+
+def calibration_curve_vectorized(velocities):
+    return np.clip(1500 + 380 * velocities + 40 * velocities ** 3, 1100, 1900).astype(int)
+
+
+class TestCasePwmLookup(unittest.TestCase):
+    def test_pwm_lookup_table(self):
+        table = PwmLookupTable(lambda velocity: 1500 + 400 * velocity, 5)
+        self.assertEqual(5, table.resolution)
+        np.testing.assert_array_equal([1100, 1300, 1500, 1700, 1900], table.values)
+        self.assertAlmostEqual(0.0, table.max_error)
+        self.assertAlmostEqual(1600.0, table(0.25))
+        self.assertAlmostEqual(1900.0, table(1.5))
+        np.testing.assert_allclose([1100, 1560, 1900], table(np.array([-1.0, 0.15, 1.0])))
+
+        table = PwmLookupTable(calibration_curve_vectorized, 1025, vectorized=True, max_error=1.0)
+        velocities = np.linspace(-1.0, 1.0, 1001)
+        expected = [calibration_curve(velocity) for velocity in velocities]
+        self.assertLessEqual(np.abs(table(velocities) - expected).max(), 1.0)
+
+        self.assertRaises(ValueError, PwmLookupTable, calibration_curve, 3, False, 0.5)
+        self.assertRaises(ValueError, PwmLookupTable, calibration_curve, 1)
+
+    def test_evaluate_lookup_tables(self):
+        tables = [PwmLookupTable(calibration_curve, 65), PwmLookupTable(lambda velocity: 1000 * velocity ** 2, 65)]
+        values = stack_lookup_tables(tables)
+        self.assertEqual((2, 65), values.shape)
+
+        velocities = np.random.RandomState(9).uniform(-1.2, 1.2, (50, 2))
+        observed = evaluate_lookup_tables(values, velocities)
+        for i in range(0, len(tables)):
+            np.testing.assert_allclose(tables[i](velocities[:, i]), observed[:, i])
+
+    def test_drivetrain_lookup_tables(self):
+        drivetrain = SimpleDrivetrain()
+        drivetrain.add_new_motor('front_left', (-1, 1, 0), (1, 1, 0), pwm_scaling_func=calibration_curve)
+        drivetrain.add_new_motor('front_right', (1, 1, 0), (-1, 1, 0), False, (1000, 1500, 2000))
+        drivetrain.add_new_motor('back_left', (-1, -1, 0), (-1, 1, 0), pwm_scaling_func=calibration_curve)
+        drivetrain.add_new_motor('back_right', (1, -1, 0), (1, 1, 0), pwm_scaling_func=calibration_curve_vectorized,
+                                 pwm_scaling_vectorized=True)
+
+        rng = np.random.RandomState(10)
+        translations = rng.uniform(-1.0, 1.0, (64, 3))
+        rotations = rng.uniform(-1.0, 1.0, (64, 3))
+        expected = drivetrain.get_motor_vels_scaled_batch(translations, rotations)
+
+        self.assertEqual(None, drivetrain.pwm_lookup_resolution)
+        drivetrain.use_pwm_lookup_tables(2049, max_error=1.0)
+        self.assertEqual(2049, drivetrain.pwm_lookup_resolution)
+
+        observed = drivetrain.get_motor_vels_scaled_batch(translations, rotations)
+        self.assertLessEqual(np.abs(observed - expected).max(), 1)
+        np.testing.assert_array_equal(expected[:, 1], observed[:, 1])
+        for i in range(0, len(translations)):
+            self.assertLessEqual(np.abs(drivetrain.get_motor_vels_scaled(translations[i], rotations[i])
+                                        - expected[i]).max(), 1)
+
+        #  motors added after enabling lookup tables are compiled on the next call
+        drivetrain.add_new_motor('up', (0, 0, 1), (0, 0, 1), pwm_scaling_func=lambda velocity: 7)
+        self.assertEqual(7, drivetrain.get_motor_vels_scaled((0, 0, 1), (0, 0, 0))[4])
+
+        #  a table which cannot meet the error bound disables lookup tables
+        self.assertRaises(ValueError, drivetrain.use_pwm_lookup_tables, 3, 0.5)
+        self.assertEqual(None, drivetrain.pwm_lookup_resolution)
+        np.testing.assert_array_equal(expected, drivetrain.get_motor_vels_scaled_batch(translations,
+                                                                                       rotations)[:, :4])
+
+    def test_drivetrain_lookup_rounding(self):
+        #  an exact table of a function with fractional values; truncating the interpolated values would be off
+        #  by up to 1, rounding them by at most 0.5
+        def linear_curve(velocity):
+            return 1500 + 400 * velocity
+
+        drivetrain = SimpleDrivetrain()
+        drivetrain.add_new_motor('front_left', (-1, 1, 0), (1, 1, 0), pwm_scaling_func=linear_curve)
+        drivetrain.add_new_motor('back_right', (1, -1, 0), (1, 1, 0), pwm_scaling_func=linear_curve)
+        drivetrain.use_pwm_lookup_tables(1025, max_error=1e-9)
+
+        rng = np.random.RandomState(11)
+        translations = rng.uniform(-1.0, 1.0, (256, 3))
+        rotations = rng.uniform(-1.0, 1.0, (256, 3))
+        expected = linear_curve(drivetrain.get_motor_vels_batch(translations, rotations))
+        observed = drivetrain.get_motor_vels_scaled_batch(translations, rotations)
+        self.assertLessEqual(np.abs(observed - expected).max(), 0.5 + 1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
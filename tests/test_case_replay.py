@@ -0,0 +1,97 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from simple_drivetrain import SimpleDrivetrain
+from flight_recorder import FlightRecorder
+from replay import CommandLog, replay_command_log, main
+
+
+class TestCaseReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.drivetrain = SimpleDrivetrain()
+        self.drivetrain.load_drivetrain_from_file('drivetrain_test.xml', use_compiled=False)
+
+        rng = np.random.RandomState(24)
+        self.commands = rng.uniform(-1.0, 1.0, (1000, 9))
+        self.commands[:, 6:] *= np.pi
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replay_npy(self):
+        for columns, dtype in ((6, float), (9, float), (9, np.float32)):
+            commands = self.commands[:, :columns].astype(dtype)
+            log_path = os.path.join(self.directory, 'log_%d.npy' % columns)
+            output_path = os.path.join(self.directory, 'pwm_%d.npy' % columns)
+            np.save(log_path, commands)
+
+            commands = commands.astype(float)
+            orientations = commands[:, 6:9] if columns == 9 else None
+            expected = self.drivetrain.get_motor_vels_scaled_batch(commands[:, :3], commands[:, 3:6], orientations)
+
+            log = CommandLog(log_path)
+            self.assertEqual(1000, len(log))
+            self.assertEqual(columns == 9, log.has_orientations)
+
+            #  a chunk size which does not divide the log exercises the final partial chunk
+            report = replay_command_log(self.drivetrain, log, output_path, chunk_size=96)
+            self.assertEqual(1000, report['samples'])
+            self.assertGreater(report['samples_per_second'], 0.0)
+            np.testing.assert_array_equal(expected, np.load(output_path))
+
+            replay_command_log(self.drivetrain, log_path, output_path, chunk_size=96, force_local_oriented=True)
+            np.testing.assert_array_equal(self.drivetrain.get_motor_vels_scaled_batch(
+                commands[:, :3], commands[:, 3:6], force_local_oriented=True), np.load(output_path))
+
+    def test_replay_recording(self):
+        recording_path = os.path.join(self.directory, 'flight.rec')
+        output_path = os.path.join(self.directory, 'pwm.npy')
+        for capacity in (1000, 2000, 384, 250):
+            with FlightRecorder(recording_path, len(self.drivetrain.motor_bank), capacity=capacity) as recorder:
+                self.drivetrain.recorder = recorder
+                expected = []
+                for command in self.commands:
+                    self.drivetrain.orientation = command[6:]
+                    expected.append(self.drivetrain.get_motor_vels_scaled(command[:3], command[3:6]).copy())
+                self.drivetrain.recorder = None
+
+            #  only the most recent records are replayed, in chronological order
+            retained = min(capacity, len(self.commands))
+            replay_command_log(self.drivetrain, recording_path, output_path, chunk_size=100)
+            np.testing.assert_array_equal(expected[-retained:], np.load(output_path))
+
+    def test_main(self):
+        log_path = os.path.join(self.directory, 'log.npy')
+        output_path = os.path.join(self.directory, 'pwm.npy')
+        np.save(log_path, self.commands)
+
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            self.assertEqual(0, main(['drivetrain_test.xml', log_path, output_path, '--chunk-size', '128']))
+        report = stdout.getvalue()
+        self.assertIn('samples: 1000', report)
+        self.assertIn('samples per second:', report)
+        self.assertIn('peak memory:', report)
+
+        expected = self.drivetrain.get_motor_vels_scaled_batch(self.commands[:, :3], self.commands[:, 3:6],
+                                                               self.commands[:, 6:])
+        np.testing.assert_array_equal(expected, np.load(output_path))
+
+    def test_invalid_log(self):
+        log_path = os.path.join(self.directory, 'log.npy')
+        np.save(log_path, self.commands[:, :4])
+        with self.assertRaises(ValueError):
+            CommandLog(log_path)
+
+        with open(log_path, 'wb') as fh:
+            fh.write(b'translation,rotation\n')
+        with self.assertRaises(ValueError):
+            CommandLog(log_path)
+
+        np.save(log_path, self.commands)
+        with self.assertRaises(ValueError):
+            list(CommandLog(log_path).chunks(0))
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from drivetrain_factory import make_random_drivetrains
+from drivetrain_fleet import DrivetrainFleet
+from sharded_fleet import ShardedDrivetrainFleet
+
+
+class TestCaseShardedFleet(unittest.TestCase):
+    def test_step(self):
+        drivetrains = make_random_drivetrains([4, 6, 1, 9, 3], seed=5)
+        fleet = DrivetrainFleet(drivetrains)
+
+        rng = np.random.RandomState(6)
+        with ShardedDrivetrainFleet(fleet, worker_count=2) as sharded_fleet:
+            self.assertEqual(2, sharded_fleet.worker_count)
+            self.assertEqual(len(drivetrains), len(sharded_fleet))
+
+            for tick in range(0, 3):
+                translations = rng.uniform(-1.0, 1.0, (len(drivetrains), 3))
+                rotations = rng.uniform(-1.0, 1.0, (len(drivetrains), 3))
+                orientations = rng.uniform(-np.pi, np.pi, (len(drivetrains), 3))
+
+                observed = sharded_fleet.step(translations, rotations, orientations)
+                np.testing.assert_array_equal(fleet.get_motor_vels_scaled(translations, rotations, orientations),
+                                              observed)
+                np.testing.assert_allclose(fleet.get_motor_vels(translations, rotations, orientations),
+                                           sharded_fleet.motor_vels)
+
+                observed = sharded_fleet.step(translations, rotations, force_local_oriented=True)
+                np.testing.assert_array_equal(fleet.get_motor_vels_scaled(translations, rotations, None, True),
+                                              observed)
+
+            #  inputs written directly to the shared arrays are used when none are passed
+            sharded_fleet.translations[:] = 0.0
+            sharded_fleet.rotations[:] = 0.0
+            np.testing.assert_array_equal(fleet.pwm_stops, sharded_fleet.step())
+
+        self.assertRaises(RuntimeError, sharded_fleet.step)
+
+    def test_custom_pwm_scaling(self):
+        drivetrains = make_random_drivetrains([2, 2], seed=5)
+        drivetrains[1].add_new_motor('custom', (1, 0, 0), (0, 1, 0), pwm_scaling_func=lambda vel: 0)
+        self.assertRaises(ValueError, ShardedDrivetrainFleet, drivetrains, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,17 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import tracemalloc
 import unittest
+from unittest import mock
 import numpy as np
 from simple_drivetrain import SimpleDrivetrain
 from motor import Motor
+from control_loop import ControlLoop
+import vectorutils as vutil
 
 
 class TestCaseSimpleDrivetrain(unittest.TestCase):
@@ -228,3 +238,710 @@ class TestCaseSimpleDrivetrain(unittest.TestCase):
                 self.__assertWithinRange(expected_direction[j], observed_direction[j], 0.01)
             for j in range(0, len(expected_pwm_bounds)):
                 self.assertEqual(expected_pwm_bounds[j], observed_pwm_bounds[j], 0.01)
+
+    def test_compiled_snapshot(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(directory, 'drivetrain.xml')
+            shutil.copyfile('drivetrain_test.xml', filepath)
+            compiled_path = filepath + '.compiled.npz'
+
+            expected = SimpleDrivetrain()
+            expected.load_drivetrain_from_file(filepath)
+            self.assertFalse(os.path.exists(compiled_path))
+
+            #  the first load compiles the snapshot and later loads use it
+            SimpleDrivetrain().load_drivetrain_from_file(filepath, use_compiled=True)
+            self.assertTrue(os.path.exists(compiled_path))
+            observed = SimpleDrivetrain()
+            observed.load_drivetrain_from_file(filepath, use_compiled=True)
+
+            self.assertEqual(expected.motor_bank.names, observed.motor_bank.names)
+            self.assertTrue(np.allclose(expected.orientation, observed.orientation))
+            self.assertTrue(np.allclose(expected.motor_bank.directions, observed.motor_bank.directions))
+            self.assertTrue(np.array_equal(expected.motor_bank.pwm_bounds, observed.motor_bank.pwm_bounds))
+            self.assertTrue(np.allclose(expected.mixing_matrix, observed.mixing_matrix))
+            self.assertTrue(np.array_equal(expected.get_motor_vels_scaled((0.2, 0.5, -0.1), (0.0, 0.3, 0.7)),
+                                           observed.get_motor_vels_scaled((0.2, 0.5, -0.1), (0.0, 0.3, 0.7))))
+
+            #  a snapshot of an edited file is stale and is recompiled
+            with open(filepath) as fh:
+                source = fh.read()
+            with open(filepath, 'w') as fh:
+                fh.write(source.replace('front_right', 'starboard_bow'))
+            observed = SimpleDrivetrain()
+            observed.load_drivetrain_from_file(filepath, use_compiled=True)
+            self.assertEqual('starboard_bow', observed.motor_bank.names[0])
+            self.assertRaises(ValueError, SimpleDrivetrain().load_compiled, compiled_path, 'stale')
+
+            #  a corrupt snapshot is recompiled, but errors adding a valid snapshot's motors are raised rather than
+            #  falling back to the xml file
+            with open(compiled_path, 'rb') as fh:
+                truncated_source = fh.read()[:100]
+            for corrupt_source in (b'', b'not a snapshot', truncated_source):
+                with open(compiled_path, 'wb') as fh:
+                    fh.write(corrupt_source)
+                observed = SimpleDrivetrain()
+                observed.load_drivetrain_from_file(filepath, use_compiled=True)
+                self.assertEqual('starboard_bow', observed.motor_bank.names[0])
+            with mock.patch('simple_drivetrain._get_etree') as get_etree:
+                self.assertRaises(ValueError, observed.load_drivetrain_from_file, filepath, True)
+                get_etree.assert_not_called()
+
+            #  snapshots are readable by everyone the umask allows, as files created by open are
+            if os.name == 'posix':
+                umask = os.umask(0o027)
+                try:
+                    os.remove(compiled_path)
+                    SimpleDrivetrain().load_drivetrain_from_file(filepath, use_compiled=True)
+                finally:
+                    os.umask(umask)
+                self.assertEqual(0o640, os.stat(compiled_path).st_mode & 0o777)
+
+            #  a snapshot which cannot be written does not stop the file loading
+            os.remove(compiled_path)
+            with mock.patch('tempfile.mkstemp', side_effect=PermissionError):
+                observed = SimpleDrivetrain()
+                observed.load_drivetrain_from_file(filepath, use_compiled=True)
+            self.assertEqual('starboard_bow', observed.motor_bank.names[0])
+            self.assertFalse(os.path.exists(compiled_path))
+
+            #  explicitly saved snapshots hold the whole drivetrain
+            saved_path = os.path.join(directory, 'saved.npz')
+            expected.add_new_motor('extra', (0.0, 0.0, 1.0), (1.0, 0.0, 0.0))
+            expected.save_compiled(saved_path)
+            observed = SimpleDrivetrain()
+            observed.load_compiled(saved_path)
+            self.assertEqual(expected.motor_bank.names, observed.motor_bank.names)
+            self.assertTrue(np.allclose(expected.mixing_matrix, observed.mixing_matrix))
+
+            expected.add_new_motor('scaled', (0.0, 0.0, -1.0), (1.0, 0.0, 0.0), False, (1100, 1500, 1900),
+                                   lambda velocity: 1500)
+            self.assertRaises(ValueError, expected.save_compiled, saved_path)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_incremental_field_oriented(self):
+        rng = np.random.RandomState(8)
+        bot = SimpleDrivetrain()
+        for i in range(0, 7):
+            bot.add_new_motor('m' + str(i), rng.uniform(-1.0, 1.0, 3), rng.uniform(-1.0, 1.0, 3), i % 2 == 0)
+        bot.reuse_buffers = True
+
+        #  orientations change every tick and commands every few ticks, yawing only or tilted, with a motor
+        #  disabled partway through; every result must match a batch computed from scratch
+        ticks = 60
+        orientations = np.zeros((ticks, 3))
+        orientations[:, 2] = rng.uniform(-np.pi, np.pi, ticks)
+        orientations[20:40, 0] = 0.3
+        orientations[30:40, 1] = -0.2
+        translations = np.repeat(rng.uniform(-1.0, 1.0, (ticks // 5, 3)), 5, axis=0)
+        rotations = np.repeat(rng.uniform(-1.0, 1.0, (ticks // 5, 3)), 5, axis=0)
+        rotations[25:30] = rotations[20]
+        translations[25:30] = rng.uniform(-1.0, 1.0, (5, 3))
+
+        for disabled in (False, True):
+            if disabled:
+                bot.disable_motor('m3')
+            expected = bot.get_motor_vels_batch(translations, rotations, orientations)
+            for i in range(0, ticks):
+                bot.orientation = orientations[i]
+                observed = bot.get_motor_vels(translations[i], rotations[i])
+                for j in range(0, len(observed)):
+                    self.assertAlmostEqual(expected[i][j], observed[j])
+
+        #  orientations set as quaternions use the full rotation
+        bot.orientation_quaternion = vutil.euler_to_quaternion(0.0, 0.0, 1.0)
+        expected = bot.get_motor_vels_batch(translations[:1], rotations[:1], [bot.orientation])
+        observed = bot.get_motor_vels(translations[0], rotations[0])
+        for j in range(0, len(observed)):
+            self.assertAlmostEqual(expected[0][j], observed[j])
+
+    def test_mixing_matrix_invalidation(self):
+        norm_const = np.sqrt(2.0) / 2.0
+        const_rot = (0.0, 0.0, 0.0)
+        translation = (norm_const, norm_const, 0.0)
+
+        bot = SimpleDrivetrain()
+        bot.add_new_motor('fl', [-norm_const, norm_const, 0.0], [norm_const, norm_const, 0.0])
+        observed = bot.get_motor_vels(translation, const_rot, True)
+        self.assertAlmostEqual(1.0, observed[0])
+
+        bot.get_motor_by_name('fl').inverted = True
+        observed = bot.get_motor_vels(translation, const_rot, True)
+        self.assertAlmostEqual(-1.0, observed[0])
+
+        bot.get_motor_by_name('fl').direction = [0.0, 0.0, 1.0]
+        observed = bot.get_motor_vels(translation, const_rot, True)
+        self.assertAlmostEqual(0.0, observed[0])
+
+        bot.add_new_motor('fu', [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])
+        observed = bot.get_motor_vels((0.0, 0.0, 1.0), const_rot, True)
+        self.assertEqual(2, len(observed))
+        self.assertEqual((2, 6), bot.mixing_matrix.shape)
+
+        bot.remove_motor_by_name('fl')
+        observed = bot.get_motor_vels((0.0, 0.0, 1.0), const_rot, True)
+        self.assertEqual(1, len(observed))
+        self.assertAlmostEqual(1.0, observed[0])
+
+    def test_get_motor_vels_batch(self):
+        testbot = SimpleDrivetrain()
+        testbot.load_drivetrain_from_file('drivetrain_test.xml')
+
+        rng = np.random.RandomState(0)
+        translations = rng.uniform(-1.0, 1.0, (32, 3))
+        rotations = rng.uniform(-1.0, 1.0, (32, 3))
+        orientations = rng.uniform(-np.pi, np.pi, (32, 3))
+        testbot.orientation = (0.1, -0.2, 0.3)
+
+        observed_current = testbot.get_motor_vels_batch(translations, rotations)
+        observed_local = testbot.get_motor_vels_batch(translations, rotations, orientations, True)
+        observed_field = testbot.get_motor_vels_batch(translations, rotations, orientations)
+        observed_scaled = testbot.get_motor_vels_scaled_batch(translations, rotations)
+
+        self.assertEqual((32, 6), observed_field.shape)
+        for i in range(0, len(translations)):
+            expected = testbot.get_motor_vels(translations[i], rotations[i])
+            expected_scaled = testbot.get_motor_vels_scaled(translations[i], rotations[i])
+            expected_local = testbot.get_motor_vels(translations[i], rotations[i], True)
+            for j in range(0, len(expected)):
+                self.assertAlmostEqual(expected[j], observed_current[i][j])
+                self.assertAlmostEqual(expected_local[j], observed_local[i][j])
+                self.assertEqual(expected_scaled[j], observed_scaled[i][j])
+
+        for i in range(0, len(translations)):
+            testbot.orientation = orientations[i]
+            expected = testbot.get_motor_vels(translations[i], rotations[i])
+            for j in range(0, len(expected)):
+                self.assertAlmostEqual(expected[j], observed_field[i][j])
+
+        self.assertRaises(ValueError, testbot.get_motor_vels_batch, translations, rotations[:4])
+        self.assertRaises(ValueError, testbot.get_motor_vels_batch, translations[0], rotations[0])
+
+    def test_estimate_twist(self):
+        testbot = SimpleDrivetrain()
+        testbot.load_drivetrain_from_file('drivetrain_test.xml')
+        testbot.orientation = (0.1, -0.2, 0.3)
+
+        #  the test drivetrain cannot roll, and small twists are not scaled, so the twists are recoverable
+        rng = np.random.RandomState(11)
+        translations = rng.uniform(-0.2, 0.2, (16, 3))
+        rotations = rng.uniform(-0.2, 0.2, (16, 3))
+        rotations[:, 1] = 0.0
+        orientations = rng.uniform(-np.pi, np.pi, (16, 3))
+
+        motor_vels = testbot.get_motor_vels_batch(translations, rotations)
+        for i in range(0, len(translations)):
+            translation, rotation = testbot.estimate_twist(motor_vels[i])
+            np.testing.assert_allclose(translations[i], translation, atol=1e-12)
+            np.testing.assert_allclose(rotations[i], rotation, atol=1e-12)
+
+        observed_translations, observed_rotations = testbot.estimate_twist_batch(motor_vels)
+        np.testing.assert_allclose(translations, observed_translations, atol=1e-12)
+        np.testing.assert_allclose(rotations, observed_rotations, atol=1e-12)
+
+        motor_vels = testbot.get_motor_vels_batch(translations, rotations, None, True)
+        observed_translations, observed_rotations = testbot.estimate_twist_batch(motor_vels, None, True)
+        np.testing.assert_allclose(translations, observed_translations, atol=1e-12)
+        np.testing.assert_allclose(translations[0], testbot.estimate_twist(motor_vels[0], True)[0], atol=1e-12)
+
+        motor_vels = testbot.get_motor_vels_batch(translations, rotations, orientations)
+        observed_translations, observed_rotations = testbot.estimate_twist_batch(motor_vels, orientations)
+        np.testing.assert_allclose(translations, observed_translations, atol=1e-12)
+        np.testing.assert_allclose(rotations, observed_rotations, atol=1e-12)
+
+        #  the cached pseudo-inverse is recompiled once the motors change
+        testbot.remove_motor_by_index(0)
+        motor_vels = testbot.get_motor_vels(translations[0], rotations[0])
+        expected = np.dot(np.linalg.pinv(testbot.mixing_matrix), motor_vels)
+        np.testing.assert_allclose(expected[3:], testbot.estimate_twist(motor_vels)[1], atol=1e-12)
+
+        self.assertRaises(ValueError, testbot.estimate_twist, np.zeros(6))
+        self.assertRaises(ValueError, testbot.estimate_twist_batch, np.zeros(5))
+
+    def test_disable_motor(self):
+        testbot = SimpleDrivetrain()
+        rng = np.random.RandomState(14)
+        for i in range(0, 8):
+            testbot.add_new_motor('thruster_' + str(i), rng.uniform(-1.0, 1.0, 3), rng.uniform(-1.0, 1.0, 3), False,
+                                  (1100, 1500, 1900))
+
+        translation = (0.1, -0.05, 0.08)
+        rotation = (0.02, 0.0, -0.07)
+        expected = testbot.get_motor_vels(translation, rotation)
+        mixing_matrix = testbot.mixing_matrix
+
+        testbot.disable_motor('thruster_2')
+        self.assertEqual(('thruster_2',), testbot.disabled_motors)
+        self.assertEqual(8, len(testbot.motors))
+
+        #  the remaining motors reproduce the effect of every motor on the drivetrain
+        observed = testbot.get_motor_vels(translation, rotation)
+        self.assertEqual(0.0, observed[2])
+        self.assertEqual(1500, testbot.get_motor_vels_scaled(translation, rotation)[2])
+        np.testing.assert_allclose(np.dot(mixing_matrix.T, expected), np.dot(mixing_matrix.T, observed), atol=1e-12)
+        np.testing.assert_allclose(observed, testbot.get_motor_vels_batch([translation], [rotation])[0])
+
+        #  twist estimates ignore the disabled motor's velocity
+        measured_vels = expected.copy()
+        measured_vels[2] = 99.0
+        estimated_translation, estimated_rotation = testbot.estimate_twist(measured_vels)
+        np.testing.assert_allclose(translation, estimated_translation, atol=1e-12)
+        np.testing.assert_allclose(rotation, estimated_rotation, atol=1e-12)
+
+        #  disabled motors stay disabled when the motors change
+        testbot.add_new_motor('thruster_8', (0, 0, 1), (0, 0, 1))
+        self.assertEqual(0.0, testbot.get_motor_vels(translation, rotation)[2])
+        testbot.remove_motor_by_name('thruster_8')
+
+        testbot.enable_motor('thruster_2')
+        self.assertEqual((), testbot.disabled_motors)
+        np.testing.assert_array_equal(expected, testbot.get_motor_vels(translation, rotation))
+        np.testing.assert_array_equal(mixing_matrix, testbot.allocation_matrix)
+
+        self.assertRaises(KeyError, testbot.disable_motor, 'thruster_9')
+
+    def test_profiling(self):
+        testbot = SimpleDrivetrain()
+        testbot.load_drivetrain_from_file('drivetrain_test.xml')
+
+        rng = np.random.RandomState(15)
+        translations = rng.uniform(-1.0, 1.0, (10, 3))
+        rotations = rng.uniform(-1.0, 1.0, (10, 3))
+        expected = testbot.get_motor_vels_scaled_batch(translations, rotations)
+
+        self.assertFalse(testbot.profiling_enabled)
+        testbot.enable_profiling()
+        self.assertTrue(testbot.profiling_enabled)
+        for i in range(0, len(translations)):
+            np.testing.assert_array_equal(expected[i], testbot.get_motor_vels_scaled(translations[i], rotations[i]))
+            testbot.get_motor_vels(translations[i], rotations[i], True)
+
+        snapshot = testbot.get_profiling_snapshot()
+        self.assertEqual(20, snapshot['orientation']['calls'])
+        self.assertEqual(20, snapshot['mixing']['calls'])
+        self.assertEqual(20, snapshot['normalization']['calls'])
+        self.assertEqual(10, snapshot['pwm_scaling']['calls'])
+        for stage in snapshot:
+            self.assertGreater(snapshot[stage]['total_time'], 0.0)
+            self.assertAlmostEqual(snapshot[stage]['total_time'] / snapshot[stage]['calls'],
+                                   snapshot[stage]['mean_time'])
+
+        testbot.get_motor_vels_scaled_batch(translations, rotations)
+        self.assertEqual(11, testbot.get_profiling_snapshot()['pwm_scaling']['calls'])
+
+        testbot.disable_profiling()
+        self.assertFalse(testbot.profiling_enabled)
+        testbot.get_motor_vels_scaled(translations[0], rotations[0])
+        self.assertEqual(snapshot['mixing']['calls'], testbot.get_profiling_snapshot()['mixing']['calls'])
+
+        testbot.reset_profiling()
+        snapshot = testbot.get_profiling_snapshot()
+        self.assertEqual(0, snapshot['pwm_scaling']['calls'])
+        self.assertEqual(0.0, snapshot['pwm_scaling']['mean_time'])
+
+        #  field-oriented commands are profiled through the same incremental computation as unprofiled ones
+        reference = SimpleDrivetrain()
+        reference.load_drivetrain_from_file('drivetrain_test.xml')
+        testbot.enable_profiling()
+        orient_command = SimpleDrivetrain._SimpleDrivetrain__orient_command
+        with mock.patch.object(SimpleDrivetrain, '_SimpleDrivetrain__orient_command', autospec=True,
+                               side_effect=orient_command) as patched:
+            for yaw in np.linspace(-np.pi, np.pi, 8):
+                testbot.orientation = reference.orientation = (0.0, 0.0, yaw)
+                np.testing.assert_allclose(reference.get_motor_vels(translations[0], rotations[0]),
+                                           testbot.get_motor_vels(translations[0], rotations[0]))
+        self.assertEqual(16, patched.call_count)
+        self.assertEqual(8, testbot.get_profiling_snapshot()['orientation']['calls'])
+
+    def test_get_motor_vels_scaled_vectorized(self):
+        asymmetric_bounds = (1000, 1500, 1700)
+
+        bot = SimpleDrivetrain()
+        bot.add_new_motor('x', [1.0, 0.0, 0.0], [1.0, 0.0, 0.0], False, asymmetric_bounds)
+        bot.add_new_motor('custom', [0.0, 1.0, 0.0], [1.0, 0.0, 0.0], False, asymmetric_bounds,
+                          lambda velocity: int(10 * velocity))
+        bot.add_new_motor('custom_vectorized', [0.0, -1.0, 0.0], [1.0, 0.0, 0.0], False, asymmetric_bounds,
+                          lambda velocities: np.round(100 * velocities), True)
+
+        translations = [[-0.5, 0.0, 0.0], [0.0, 0.0, 0.0], [0.5, 0.0, 0.0]]
+        rotations = [[0.0, 0.0, 0.0] for x in range(0, 3)]
+        expected = [[1250, -5, -50],
+                    [1500, 0, 0],
+                    [1600, 5, 50]]
+
+        observed_batch = bot.get_motor_vels_scaled_batch(translations, rotations, force_local_oriented=True)
+        self.assertTrue(np.issubdtype(observed_batch.dtype, np.integer))
+        for i in range(0, len(translations)):
+            observed = bot.get_motor_vels_scaled(translations[i], rotations[i], True)
+            self.assertTrue(np.issubdtype(observed.dtype, np.integer))
+            for j in range(0, len(expected[i])):
+                self.assertEqual(expected[i][j], observed[j])
+                self.assertEqual(expected[i][j], observed_batch[i][j])
+                self.assertEqual(bot.motors[j].scale_velocity_to_pwm(bot.get_motor_vels(translations[i],
+                                                                                       rotations[i], True)[j]),
+                                 observed[j])
+
+        bot.get_motor_by_name('x').pwm_bounds = (1100, 1500, 1900)
+        observed = bot.get_motor_vels_scaled(translations[0], rotations[0], True)
+        self.assertEqual(1300, observed[0])
+
+    def test_orientation_quaternion(self):
+        testbot = SimpleDrivetrain()
+        testbot.load_drivetrain_from_file('drivetrain_test.xml')
+
+        translation = (0.3, -0.4, 0.2)
+        rotation = (0.1, 0.0, -0.2)
+        orientation = (0.2, -0.1, 2.0)
+        quaternion = vutil.euler_to_quaternion(orientation[0], orientation[1], orientation[2])
+
+        testbot.orientation = orientation
+        expected = testbot.get_motor_vels(translation, rotation)
+
+        testbot.orientation_quaternion = quaternion
+        observed = testbot.get_motor_vels(translation, rotation)
+        for i in range(0, len(expected)):
+            self.assertAlmostEqual(expected[i], observed[i])
+        for i in range(0, len(orientation)):
+            self.assertAlmostEqual(orientation[i], testbot.orientation[i])
+
+        testbot.orientation = (0.0, 0.0, np.pi / 2.0)
+        observed = testbot.get_motor_vels(translation, rotation)
+        expected = testbot.get_motor_vels(translation, rotation, True)
+        for i in range(0, len(expected)):
+            self.assertAlmostEqual(expected[i], observed[i])
+
+        self.assertRaises(ValueError, setattr, testbot, 'orientation', (0.0, 0.0))
+        self.assertRaises(ValueError, setattr, testbot, 'orientation_quaternion', (1.0, 0.0, 0.0))
+
+    def test_motor_name_index(self):
+        testbot = SimpleDrivetrain()
+        testbot.load_drivetrain_from_file('drivetrain_test.xml')
+
+        expected_names = ['front_right', 'front_left', 'back_left', 'back_right', 'front_ascent', 'back_ascent']
+        for i in range(0, len(expected_names)):
+            self.assertEqual(i, testbot.index_of(expected_names[i]))
+            self.assertTrue(testbot.get_motor_by_name(expected_names[i]) is testbot.get_motor_by_index(i))
+
+        self.assertRaises(ValueError, testbot.add_new_motor, 'front_left', (0, 0, 1), (0, 0, 1))
+
+        testbot.remove_motor_by_name('front_left')
+        testbot.remove_motor_by_index(2)
+        expected_names = ['front_right', 'back_left', 'front_ascent', 'back_ascent']
+        for i in range(0, len(expected_names)):
+            self.assertEqual(i, testbot.index_of(expected_names[i]))
+            self.assertEqual(expected_names[i], testbot.get_motor_by_index(i).name)
+        self.assertTrue(testbot.get_motor_by_name('front_left') is None)
+        self.assertRaises(KeyError, testbot.index_of, 'back_right')
+
+        translation = (0.0, 0.5, 0.5)
+        rotation = (0.0, 0.0, 0.2)
+        expected = testbot.get_motor_vels(translation, rotation)
+        expected_scaled = testbot.get_motor_vels_scaled(translation, rotation)
+        observed = testbot.get_motor_vels_dict(translation, rotation)
+        observed_scaled = testbot.get_motor_vels_scaled_dict(translation, rotation)
+        self.assertEqual(expected_names, list(observed.keys()))
+        for i in range(0, len(expected_names)):
+            self.assertAlmostEqual(expected[i], observed[expected_names[i]])
+            self.assertEqual(expected_scaled[i], observed_scaled[expected_names[i]])
+
+    def test_zero_allocation(self):
+        motor_count = 1024
+        rng = np.random.RandomState(0)
+        testbot = SimpleDrivetrain()
+        for i in range(0, motor_count):
+            testbot.add_new_motor('motor_' + str(i), rng.uniform(0.1, 1.0, 3), rng.uniform(-1.0, 1.0, 3), False,
+                                  (1100, 1500, 1900))
+
+        translation = (0.3, -0.5, 0.2)
+        rotation = (0.0, 0.1, -0.4)
+        out_vels = np.empty(motor_count)
+        out_pwms = np.empty(motor_count, dtype=int)
+
+        def tick():
+            testbot.get_motor_vels(translation, rotation, False, out_vels)
+            testbot.get_motor_vels_scaled(translation, rotation, False, out_pwms)
+            testbot.get_motor_vels_scaled(translation, rotation, True, out_pwms)
+
+        expected_vels = testbot.get_motor_vels(translation, rotation)
+        expected_pwms = testbot.get_motor_vels_scaled(translation, rotation)
+
+        tracemalloc.start()
+        try:
+            for i in range(0, 10):
+                tick()
+
+            baseline_memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            for i in range(0, 1000):
+                tick()
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        #  a single temporary array of motor values would take 8 bytes per motor
+        self.assertTrue(peak_memory - baseline_memory < 4 * motor_count)
+        self.assertTrue(current_memory - baseline_memory < 4 * motor_count)
+
+        testbot.get_motor_vels_scaled(translation, rotation, False, out_pwms)
+        for i in range(0, motor_count):
+            self.assertAlmostEqual(expected_vels[i], out_vels[i])
+            self.assertEqual(expected_pwms[i], out_pwms[i])
+
+        self.assertRaises(ValueError, testbot.get_motor_vels, translation, rotation, False, np.empty(3))
+
+        testbot.reuse_buffers = True
+        observed = testbot.get_motor_vels(translation, rotation)
+        self.assertTrue(observed is testbot.get_motor_vels(translation, rotation))
+
+    def test_stream(self):
+        testbot = SimpleDrivetrain()
+        testbot.load_drivetrain_from_file('drivetrain_test.xml')
+        testbot.orientation = (0.0, 0.1, 1.0)
+
+        rng = np.random.RandomState(2)
+        translations = rng.uniform(-1.0, 1.0, (50, 3))
+        rotations = rng.uniform(-1.0, 1.0, (50, 3))
+        orientations = rng.uniform(-np.pi, np.pi, (50, 3))
+        commands = [(translations[i], rotations[i], orientations[i] if i % 3 == 0 else None)
+                    for i in range(0, len(translations))]
+
+        expected = []
+        for i in range(0, len(commands)):
+            testbot.orientation = orientations[i] if i % 3 == 0 else (0.0, 0.1, 1.0)
+            expected.append(testbot.get_motor_vels_scaled(translations[i], rotations[i]))
+        testbot.orientation = (0.0, 0.1, 1.0)
+
+        observed = [frame.copy() for frame in testbot.stream(iter(commands), batch_size=8)]
+
+        async def command_source():
+            for command in commands:
+                yield command
+
+        async def collect():
+            return [frame.copy() async for frame in testbot.stream(command_source(), batch_size=16)]
+
+        observed_async = asyncio.run(collect())
+
+        self.assertEqual(len(expected), len(observed))
+        self.assertEqual(len(expected), len(observed_async))
+        for i in range(0, len(expected)):
+            for j in range(0, len(expected[i])):
+                self.assertEqual(expected[i][j], observed[i][j])
+                self.assertEqual(expected[i][j], observed_async[i][j])
+
+        #  frames of a batch share one reused buffer
+        frames = testbot.stream(iter(commands), batch_size=4)
+        first_frame = next(frames)
+        for i in range(0, 4):
+            next(frames)
+        self.assertFalse(np.array_equal(expected[0], first_frame))
+
+        self.assertRaises(ValueError, testbot.stream, commands, 0)
+
+    def __make_hot_swap_drivetrain(self, with_auxiliary=False, front_left_pwm_bounds=(1100, 1500, 1900)):
+        drivetrain = SimpleDrivetrain(orientation=(0.1, -0.2, 0.7))
+        drivetrain.add_new_motor('front_left', (-1, 1, 0), (1, 1, 0), False, front_left_pwm_bounds)
+        drivetrain.add_new_motor('front_right', (1, 1, 0), (-1, 1, 0), False, (1100, 1500, 1900))
+        drivetrain.add_new_motor('back_left', (-1, -1, 0), (-1, 1, 0), False, (1100, 1500, 1900))
+        drivetrain.add_new_motor('back_right', (1, -1, 0), (1, 1, 0), False, (1100, 1500, 1900))
+        if with_auxiliary:
+            drivetrain.add_new_motor('auxiliary', (0, 0.5, 0.2), (0, 0, 1), False, (1100, 1500, 1900))
+        return drivetrain
+
+    def test_concurrent_hot_swap(self):
+        translation = (0.3, -0.5, 0.4)
+        rotation = (0.1, 0.2, -0.6)
+
+        #  every reading must be the motor values of one complete configuration, never a mix of two
+        expected = set()
+        for with_auxiliary, front_left_pwm_bounds in ((False, (1100, 1500, 1900)), (True, (1100, 1500, 1900)),
+                                                      (False, (1000, 1450, 2000))):
+            reference = self.__make_hot_swap_drivetrain(with_auxiliary, front_left_pwm_bounds)
+            for force_local_oriented in (False, True):
+                expected.add(tuple(reference.get_motor_vels_scaled(translation, rotation, force_local_oriented)))
+
+        drivetrain = self.__make_hot_swap_drivetrain()
+        drivetrain.reuse_buffers = True
+        stop = threading.Event()
+        errors = []
+        reads = [0, 0, 0]
+
+        def read(reader):
+            try:
+                while not stop.is_set():
+                    observed = tuple(drivetrain.get_motor_vels_scaled(translation, rotation, reader == 0))
+                    if observed not in expected:
+                        errors.append(observed)
+                        return
+                    reads[reader] += 1
+            except Exception as error:
+                errors.append(error)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        readers = [threading.Thread(target=read, args=(reader,)) for reader in range(0, len(reads))]
+        try:
+            for reader in readers:
+                reader.start()
+
+            #  the motors keep changing until every reader has read at least once, however the readers are scheduled
+            front_left = drivetrain.get_motor_by_name('front_left')
+            cycle = 0
+            while (cycle < 200 or 0 in reads) and not errors:
+                cycle += 1
+                drivetrain.add_new_motor('auxiliary', (0, 0.5, 0.2), (0, 0, 1), False, (1100, 1500, 1900))
+                drivetrain.remove_motor_by_name('auxiliary')
+                front_left.pwm_bounds = (1000, 1450, 2000)
+                front_left.pwm_bounds = (1100, 1500, 1900)
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+            sys.setswitchinterval(switch_interval)
+
+        self.assertEqual([], errors)
+        for reader_reads in reads:
+            self.assertGreater(reader_reads, 0)
+
+    def test_concurrent_hot_swap_dict_and_loop(self):
+        translation = (0.3, -0.5, 0.4)
+        rotation = (0.1, 0.2, -0.6)
+
+        #  every dictionary must pair the names and values of one configuration, and every tick of the loop must
+        #  output the values of one configuration
+        expected_dicts = {}
+        expected_ticks = set()
+        for with_auxiliary in (False, True):
+            reference = self.__make_hot_swap_drivetrain(with_auxiliary)
+            expected_dicts[(False,) + reference.motor_bank.names] = reference.get_motor_vels(translation, rotation)
+            expected_dicts[(True,) + reference.motor_bank.names] = reference.get_motor_vels_scaled(translation,
+                                                                                                  rotation)
+            expected_ticks.add(tuple(reference.get_motor_vels_scaled(translation, rotation)))
+
+        drivetrain = self.__make_hot_swap_drivetrain()
+        stop = threading.Event()
+        errors = []
+        ticks = []
+
+        def read(scaled):
+            get_dict = drivetrain.get_motor_vels_scaled_dict if scaled else drivetrain.get_motor_vels_dict
+            try:
+                while not stop.is_set():
+                    observed = get_dict(translation, rotation)
+                    key = (scaled,) + tuple(observed)
+                    if key not in expected_dicts or not np.allclose(expected_dicts[key], list(observed.values())):
+                        errors.append(observed)
+                        return
+            except Exception as error:
+                errors.append(error)
+
+        def output(pwm_values):
+            observed = tuple(pwm_values)
+            if observed not in expected_ticks:
+                errors.append(observed)
+            ticks.append(observed)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        readers = [threading.Thread(target=read, args=(scaled,)) for scaled in (False, True)]
+        loop = ControlLoop(drivetrain, lambda: (translation, rotation), output, rate=2000)
+        try:
+            for reader in readers:
+                reader.start()
+
+            #  stopping the loop re-raises any exception which ended it
+            with loop:
+                cycle = 0
+                while (cycle < 200 or not ticks) and not errors:
+                    cycle += 1
+                    drivetrain.add_new_motor('auxiliary', (0, 0.5, 0.2), (0, 0, 1), False, (1100, 1500, 1900))
+                    drivetrain.remove_motor_by_name('auxiliary')
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.join()
+            sys.setswitchinterval(switch_interval)
+
+        self.assertEqual([], errors)
+        self.assertGreater(len(ticks), 0)
+
+    def test_hot_swap_mid_call(self):
+        translation = (0.3, -0.5, 0.4)
+        rotation = (0.1, 0.2, -0.6)
+        expected = self.__make_hot_swap_drivetrain(True).get_motor_vels_scaled_dict(translation, rotation)
+        reference = self.__make_hot_swap_drivetrain(True)
+        reference.remove_motor_by_name('front_left')
+        expected_removed = reference.get_motor_vels_scaled_dict(translation, rotation)
+
+        #  another thread removing a motor at the worst moment of a call is simulated by removing it from within
+        #  the call, before the call has read the drivetrain's geometry or once it has
+        def remove_front_left(drivetrain, method):
+            def wrapper(*args):
+                if 'front_left' in drivetrain.motor_bank.names:
+                    drivetrain.remove_motor_by_name('front_left')
+                return method(*args)
+            return wrapper
+
+        for name, removed_first in (('_SimpleDrivetrain__get_scratch', True),
+                                    ('_SimpleDrivetrain__compute_motor_vels', False)):
+            drivetrain = self.__make_hot_swap_drivetrain(True)
+            method = getattr(SimpleDrivetrain, name)
+            with mock.patch.object(SimpleDrivetrain, name, autospec=True,
+                                   side_effect=remove_front_left(drivetrain, method)):
+                self.assertEqual(expected_removed if removed_first else expected,
+                                 drivetrain.get_motor_vels_scaled_dict(translation, rotation))
+
+        drivetrain = self.__make_hot_swap_drivetrain(True)
+        ticks = []
+        loop = ControlLoop(drivetrain, lambda: (translation, rotation), lambda pwm_values: ticks.append(
+            tuple(pwm_values)), rate=1000)
+        loop.run(1)
+        get_scratch = SimpleDrivetrain._SimpleDrivetrain__get_scratch
+        with mock.patch.object(SimpleDrivetrain, '_SimpleDrivetrain__get_scratch', autospec=True,
+                               side_effect=remove_front_left(drivetrain, get_scratch)):
+            loop.run(2)
+        self.assertEqual([tuple(expected.values())] + [tuple(expected_removed.values())] * 2, ticks)
+
+    def test_lock_free_reads(self):
+        class CountingLock(object):
+            def __init__(self, lock):
+                self.lock = lock
+                self.acquisitions = 0
+
+            def __enter__(self):
+                self.acquisitions += 1
+                return self.lock.__enter__()
+
+            def __exit__(self, exc_type, exc_value, traceback):
+                return self.lock.__exit__(exc_type, exc_value, traceback)
+
+        drivetrain = self.__make_hot_swap_drivetrain()
+        bank = drivetrain.motor_bank
+        lock = CountingLock(bank.lock)
+        bank._MotorBank__lock = lock
+
+        #  only compiling the changed motors takes the motor bank's lock; computing motor values never does
+        drivetrain.get_motor_vels_scaled((0.3, -0.5, 0.4), (0.1, 0.2, -0.6))
+        compile_acquisitions = lock.acquisitions
+        self.assertGreater(compile_acquisitions, 0)
+        for i in range(0, 100):
+            drivetrain.get_motor_vels_scaled((0.3, -0.5, 0.4), (0.1, 0.2, -0.6))
+            drivetrain.get_motor_vels((0.3, -0.5, 0.4), (0.1, 0.2, -0.6), force_local_oriented=True)
+        self.assertEqual(compile_acquisitions, lock.acquisitions)
+
+        drivetrain.get_motor_by_name('front_left').pwm_bounds = (1000, 1450, 2000)
+        drivetrain.get_motor_vels_scaled((0.3, -0.5, 0.4), (0.1, 0.2, -0.6))
+        self.assertGreater(lock.acquisitions, compile_acquisitions)
+
+        #  each thread computes motor values in its own buffers
+        observed = {}
+        thread = threading.Thread(target=lambda: observed.update(
+            other=drivetrain.get_motor_vels_scaled((0.3, -0.5, 0.4), (0.1, 0.2, -0.6))))
+        drivetrain.reuse_buffers = True
+        thread.start()
+        thread.join()
+        self.assertFalse(observed['other'] is drivetrain.get_motor_vels_scaled((0.3, -0.5, 0.4), (0.1, 0.2, -0.6)))
+        self.assertTrue(np.array_equal(observed['other'],
+                                       drivetrain.get_motor_vels_scaled((0.3, -0.5, 0.4), (0.1, 0.2, -0.6))))
@@ -35,6 +35,37 @@ class TestCaseVectorUtils(unittest.TestCase):
             for j in range(0, len(expected)):
                 self.assertAlmostEqual(observed[j], expected[j])
 
+    def test_rotate_vectors(self):
+        rng = np.random.RandomState(5)
+        vectors = rng.uniform(-1.0, 1.0, (20, 3))
+        orientations = rng.uniform(-np.pi, np.pi, (20, 3))
+
+        observed = vutil.rotate_vectors(vectors, orientations)
+        observed_shared = vutil.rotate_vectors(vectors, orientations[0])
+        self.assertEqual((20, 3), observed.shape)
+        for i in range(0, len(vectors)):
+            expected = vutil.rotate_vector(vectors[i], orientations[i][0], orientations[i][1], orientations[i][2])
+            expected_shared = vutil.rotate_vector(vectors[i], orientations[0][0], orientations[0][1],
+                                                  orientations[0][2])
+            for j in range(0, 3):
+                self.assertAlmostEqual(expected[j], observed[i][j])
+                self.assertAlmostEqual(expected_shared[j], observed_shared[i][j])
+
+    def test_calculate_angle_directions(self):
+        #  every quadrant, both axes, and both sides of the dead zone
+        horizontal = [1.0, -1.0, -1.0, 1.0, 0.5, -0.5, 0.02, 0.02, 0.05, 0.06, 0.0, -0.04]
+        vertical = [1.0, 1.0, -1.0, -1.0, 0.03, -0.03, 0.7, -0.7, 0.05, -0.06, 0.0, 0.01]
+
+        expected = np.pi * np.array([0.25, 0.75, 1.25, 1.75, 0.0, 1.0, 0.5, 1.5, np.nan, 1.75, np.nan, np.nan])
+
+        observed = vutil.calculate_angle_directions(horizontal, vertical)
+        self.assertEqual((len(horizontal),), observed.shape)
+        np.testing.assert_allclose(expected, observed)
+        for i in range(0, len(horizontal)):
+            #  single vectors give the same angles, including NaN, whichever function they are passed to
+            np.testing.assert_allclose(expected[i], vutil.calculate_angle_direction(horizontal[i], vertical[i]))
+            np.testing.assert_allclose(expected[i], vutil.calculate_angle_directions(horizontal[i], vertical[i]))
+
     def test_normalize(self):
         test_inputs = (np.array([0, 0, 5]),
                        np.array([5, 5, 5]))
@@ -47,3 +78,21 @@ class TestCaseVectorUtils(unittest.TestCase):
 
             for j in range(0, len(expected)):
                 self.assertAlmostEqual(expected[j], observed[j])
+
+    def test_quaternion_conversions(self):
+        test_inputs = ((0.0, 0.0, 0.0),
+                       (0.3, -0.2, 1.1),
+                       (-1.2, 0.7, -2.5))
+
+        for i in range(0, len(test_inputs)):
+            pitch, roll, yaw = test_inputs[i]
+            expected = vutil.rotation_matrix(pitch, roll, yaw)
+            observed = vutil.quaternion_to_matrix(vutil.euler_to_quaternion(pitch, roll, yaw))
+
+            for j in range(0, 3):
+                for k in range(0, 3):
+                    self.assertAlmostEqual(expected[j][k], observed[j][k])
+
+            observed_euler = vutil.matrix_to_euler(expected)
+            for j in range(0, 3):
+                self.assertAlmostEqual(test_inputs[i][j], observed_euler[j])
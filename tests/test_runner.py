@@ -2,12 +2,45 @@ import unittest
 from test_case_simple_drivetrain import TestCaseSimpleDrivetrain
 from test_case_motor import TestCaseMotor
 from test_case_vectorutils import TestCaseVectorUtils
+from test_case_motor_bank import TestCaseMotorBank
+from test_case_drivetrain_fleet import TestCaseDrivetrainFleet
+from test_case_sharded_fleet import TestCaseShardedFleet
+from test_case_control_loop import TestCaseControlLoop
+from test_case_motion_profile import TestCaseMotionProfile
+from test_case_pwm_lookup import TestCasePwmLookup
+from test_case_motor_allocation import TestCaseMotorAllocation
+from test_case_import_time import TestCaseImportTime
+from test_case_drivetrain_library import TestCaseDrivetrainLibrary
+from test_case_flight_recorder import TestCaseFlightRecorder
+from test_case_replay import TestCaseReplay
 
 if __name__ == '__main__':
     test_case_motor_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseMotor)
     test_case_simple_drivetrain_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseSimpleDrivetrain)
     test_case_vectorutils_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseVectorUtils)
+    test_case_motor_bank_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseMotorBank)
+    test_case_drivetrain_fleet_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseDrivetrainFleet)
+    test_case_sharded_fleet_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseShardedFleet)
+    test_case_control_loop_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseControlLoop)
+    test_case_motion_profile_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseMotionProfile)
+    test_case_pwm_lookup_suite = unittest.TestLoader().loadTestsFromTestCase(TestCasePwmLookup)
+    test_case_motor_allocation_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseMotorAllocation)
+    test_case_import_time_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseImportTime)
+    test_case_drivetrain_library_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseDrivetrainLibrary)
+    test_case_flight_recorder_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseFlightRecorder)
+    test_case_replay_suite = unittest.TestLoader().loadTestsFromTestCase(TestCaseReplay)
 
     unittest.TextTestRunner(verbosity=2).run(test_case_vectorutils_suite)
     unittest.TextTestRunner(verbosity=2).run(test_case_motor_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_motor_bank_suite)
     unittest.TextTestRunner(verbosity=2).run(test_case_simple_drivetrain_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_drivetrain_fleet_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_sharded_fleet_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_control_loop_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_motion_profile_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_pwm_lookup_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_motor_allocation_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_import_time_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_drivetrain_library_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_flight_recorder_suite)
+    unittest.TextTestRunner(verbosity=2).run(test_case_replay_suite)